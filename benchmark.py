@@ -0,0 +1,778 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the habit wallpaper pipeline.
+
+Usage: python benchmark.py <benchmark> [options]
+Run with --help to list the available benchmarks.
+"""
+import argparse
+import contextlib
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+
+def timed(func, repeat=3):
+    """Run func repeat times and return (best time in seconds, last result)"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def synthetic_logs(habits, days, fill=0.6, seed=0):
+    """Sparse (log_dates, log_values, default_value) tuples ending today"""
+    rng = random.Random(seed)
+    today = date.today()
+    data = []
+    for _ in range(habits):
+        log_dates = []
+        log_values = []
+        for offset in range(days - 1, -1, -1):
+            if offset == days - 1 or rng.random() < fill:
+                log_dates.append((today - timedelta(days=offset)).strftime('%Y-%m-%d'))
+                log_values.append(rng.randint(0, 1))
+        data.append((log_dates, log_values, 0))
+    return data
+
+
+def legacy_densify(log_dates, log_values, default_value, end_date):
+    """The per-day loop previously used by the plotting code"""
+    logs = dict(zip(log_dates, log_values))
+    current = date.fromisoformat(min(logs.keys()))
+    dates = []
+    values = []
+    while current <= end_date:
+        dates.append(current)
+        value = logs.get(current.strftime('%Y-%m-%d'))
+        values.append(value if value is not None else default_value)
+        current += timedelta(days=1)
+    return dates, values
+
+
+def bench_densify(args):
+    from densify import densify
+
+    data = synthetic_logs(args.habits, args.years * 365)
+    today = date.today()
+
+    legacy_time, legacy = timed(lambda: [
+        legacy_densify(d, v, default, today) for d, v, default in data
+    ])
+    vector_time, vector = timed(lambda: [
+        densify(d, v, default, end=today) for d, v, default in data
+    ])
+
+    # Both engines must produce the same dense series
+    for (_, old_values), (_, new_values) in zip(legacy, vector):
+        assert list(new_values) == old_values
+
+    print(f"densify: {args.habits} habits x {args.years} years")
+    print(f"  per-day loop: {legacy_time * 1000:9.1f} ms")
+    print(f"  vectorized:   {vector_time * 1000:9.1f} ms")
+    print(f"  speedup:      {legacy_time / vector_time:9.1f}x")
+
+
+def synthetic_series(habits, days):
+    """HabitSeries objects with alternating boolean and numeric habits"""
+    from habit_repository import HabitSeries
+
+    series = []
+    for i, (log_dates, log_values, default) in enumerate(synthetic_logs(habits, days)):
+        habit_type = 'boolean' if i % 2 == 0 else 'numeric'
+        habit = HabitSeries(i + 1, f'Habit {i + 1}', habit_type, 1, default)
+        habit.log_dates = log_dates
+        habit.log_values = log_values
+        series.append(habit)
+    return series
+
+
+def wallpaper_figure(generator, series):
+    """The wallpaper figure as WallpaperGenerator lays it out"""
+    return generator.create_figure(series)
+
+
+@contextlib.contextmanager
+def scratch_generator(**kwargs):
+    """A WallpaperGenerator without a database, working in a temporary directory"""
+    from wallpaper_generator import WallpaperGenerator
+
+    class NoDatabase:
+        conn = None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            yield WallpaperGenerator(NoDatabase(), **kwargs)
+        finally:
+            os.chdir(cwd)
+
+
+def legacy_save(generator, fig, path):
+    """savefig, then reopen, resize and re-save with PIL, as update_wallpaper used to"""
+    from PIL import Image
+
+    fig.savefig(path, dpi=generator.dpi, bbox_inches=None, facecolor='#1E1E1E',
+                edgecolor='none', pad_inches=0)
+    img = Image.open(path)
+    if img.size != (generator.width, generator.height):
+        img = img.resize((generator.width, generator.height), Image.Resampling.LANCZOS)
+    img = img.convert('RGBA')
+    img.save(path)
+
+
+def bench_pipeline(args):
+    with scratch_generator() as generator:
+        series = synthetic_series(args.habits, args.days)
+        path = os.path.abspath('wallpaper.png')
+
+        legacy_time, _ = timed(
+            lambda: legacy_save(generator, wallpaper_figure(generator, series), path))
+        legacy_bytes = os.path.getsize(path)
+
+        direct_time, _ = timed(
+            lambda: generator.render_image(wallpaper_figure(generator, series)).save(path, 'PNG'))
+        direct_bytes = os.path.getsize(path)
+
+        figure_time, _ = timed(lambda: wallpaper_figure(generator, series))
+
+    print(f"wallpaper pipeline: {generator.width}x{generator.height}, "
+          f"{args.habits} habits x {args.days} days")
+    print(f"  building the figure (both paths): {figure_time * 1000:7.1f} ms")
+    print(f"  savefig + reopen + re-save:       {legacy_time * 1000:7.1f} ms  ({legacy_bytes} bytes)")
+    print(f"  Agg buffer + single encode:       {direct_time * 1000:7.1f} ms  ({direct_bytes} bytes)")
+
+
+def bench_layout(args):
+    from layout_cache import LayoutCache
+
+    with scratch_generator() as generator:
+        series = synthetic_series(args.habits, args.days)
+
+        def cold():
+            generator.layout_cache = LayoutCache()
+            return wallpaper_figure(generator, series)
+
+        cold_time, cold_fig = timed(cold)
+        warm_time, warm_fig = timed(lambda: wallpaper_figure(generator, series))
+
+        # A reused layout must place everything exactly where tight_layout did
+        identical = (generator.render_image(cold_fig).tobytes() ==
+                     generator.render_image(warm_fig).tobytes())
+
+    print(f"layout: {generator.width}x{generator.height}, {args.habits} habits x {args.days} days")
+    print(f"  figure with tight_layout:   {cold_time * 1000:7.1f} ms")
+    print(f"  figure with cached layout:  {warm_time * 1000:7.1f} ms")
+    print(f"  identical pixels:           {identical}")
+    if not identical:
+        return 1
+
+
+def bench_lod(args):
+    """Wallpaper render time as history grows, with and without downsampling"""
+    import plot_utils
+
+    downsample = plot_utils.downsample_minmax
+    full_detail = lambda days, values, max_points: (days, values)
+
+    with scratch_generator() as generator:
+        print(f"lod: {generator.width}x{generator.height}, {args.habits} habits")
+        print(f"  {'days':>6}  {'full detail':>12}  {'downsampled':>12}")
+        for days in args.days:
+            series = synthetic_series(args.habits, days)
+            timings = []
+            for func in (full_detail, downsample):
+                plot_utils.downsample_minmax = func
+                try:
+                    best, _ = timed(lambda: generator.render_image(wallpaper_figure(generator, series)),
+                                    repeat=args.repeat)
+                finally:
+                    plot_utils.downsample_minmax = downsample
+                timings.append(best)
+            print(f"  {days:6d}  {timings[0] * 1000:9.1f} ms  {timings[1] * 1000:9.1f} ms")
+
+
+def image_difference(a, b, scale=4):
+    """
+    (mean absolute difference, fraction of clearly different pixels) between
+    two same-sized images, compared at 1/scale size so antialiasing and
+    one-pixel offsets do not count as differences
+    """
+    import numpy as np
+    from PIL import Image
+
+    size = (a.width // scale, a.height // scale)
+    a = np.asarray(a.convert('RGB').resize(size, Image.Resampling.BOX), dtype=np.int16)
+    b = np.asarray(b.convert('RGB').resize(size, Image.Resampling.BOX), dtype=np.int16)
+    diff = np.abs(a - b).max(axis=2)
+    return diff.mean(), (diff > 48).mean()
+
+
+def bench_renderers(args):
+    """Render time of the matplotlib and Pillow renderers, and how closely they match"""
+    from fast_renderer import PillowRenderer
+
+    with scratch_generator() as generator:
+        pillow = PillowRenderer(generator.width, generator.height, generator.dpi,
+                                generator.padding_percent)
+        print(f"renderers: {generator.width}x{generator.height}, {args.habits} habits")
+        print(f"  {'days':>6}  {'matplotlib':>11}  {'pillow':>9}  {'mean diff':>9}  {'differing':>9}")
+        worst = 0
+        for days in args.days:
+            series = synthetic_series(args.habits, days)
+            mpl_time, mpl_img = timed(
+                lambda: generator.render_image(wallpaper_figure(generator, series)),
+                repeat=args.repeat)
+            pil_time, pil_img = timed(lambda: pillow.render(series), repeat=args.repeat)
+            mean_diff, differing = image_difference(mpl_img, pil_img)
+            worst = max(worst, differing)
+            print(f"  {days:6d}  {mpl_time * 1000:8.1f} ms  {pil_time * 1000:6.1f} ms  "
+                  f"{mean_diff:9.2f}  {differing:8.2%}")
+            if args.save:
+                os.makedirs(args.save, exist_ok=True)
+                mpl_img.save(os.path.join(args.save, f'matplotlib-{days}.png'))
+                pil_img.save(os.path.join(args.save, f'pillow-{days}.png'))
+
+    # Both draw the same chart, so only text rendering and antialiasing
+    # should tell them apart
+    if worst > args.max_differing:
+        print(f"  parity check failed: {worst:.2%} of pixels differ "
+              f"(limit {args.max_differing:.2%})")
+        return 1
+
+
+def bench_tiles(args):
+    """Combined wallpaper against the tiled layout, cold, cached and after one habit changes"""
+    from tile_cache import TileCache
+
+    with scratch_generator(layout='tiles') as generator:
+        series = synthetic_series(args.habits, args.days)
+        combined_time, _ = timed(lambda: generator.render_image(wallpaper_figure(generator, series)))
+
+        def cold():
+            generator.tile_cache = TileCache(f'tiles-{time.perf_counter_ns()}')
+            return generator.render_tiles(series)
+
+        cold_time, _ = timed(cold)
+        cached_time, _ = timed(lambda: generator.render_tiles(series))
+
+        def one_changed():
+            # A new value for the first habit's last log, as after a typical
+            # edit; each run uses a value not seen before
+            habit = series[0]
+            habit.log_values[-1] += 1
+            return generator.render_tiles(series)
+
+        changed_time, _ = timed(one_changed)
+
+    print(f"tiles: {generator.width}x{generator.height}, {args.habits} habits x {args.days} days")
+    print(f"  combined plot:             {combined_time * 1000:7.1f} ms")
+    print(f"  tiles, none cached:        {cold_time * 1000:7.1f} ms")
+    print(f"  tiles, all cached:         {cached_time * 1000:7.1f} ms")
+    print(f"  tiles, one habit changed:  {changed_time * 1000:7.1f} ms")
+
+
+def bench_encoders(args):
+    from wallpaper_encoders import get_encoder
+
+    with scratch_generator() as generator:
+        series = synthetic_series(args.habits, args.days)
+        img = generator.render_image(wallpaper_figure(generator, series))
+
+    print(f"encoders: {generator.width}x{generator.height}, {args.habits} habits x {args.days} days")
+    for spec in args.formats:
+        encoder = get_encoder(spec)
+        best, _ = timed(lambda: encoder.encode(img))
+        print(f"  {encoder.spec:16} {best * 1000:8.1f} ms  {encoder.last_stats.size:9d} bytes")
+
+
+def bench_threads(args):
+    """
+    Render several different wallpapers one after another, then all at once
+    on a thread pool, and check every threaded render matches its serial one
+    pixel for pixel and that global matplotlib settings were left alone.
+    """
+    import hashlib
+    import matplotlib
+    from concurrent.futures import ThreadPoolExecutor
+
+    def render(generator, series):
+        return hashlib.sha256(generator.render_image(wallpaper_figure(generator, series)).tobytes()).hexdigest()
+
+    with scratch_generator() as generator:
+        # Different habit counts give every job a different image
+        jobs = [synthetic_series(args.habits + i, args.days) for i in range(args.jobs)]
+        rc_before = dict(matplotlib.rcParams)
+
+        serial_time, serial = timed(lambda: [render(generator, series) for series in jobs], repeat=1)
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            threaded_time, threaded = timed(
+                lambda: list(pool.map(lambda series: render(generator, series), jobs)), repeat=1)
+
+        rc_changed = sorted(key for key, value in matplotlib.rcParams.items()
+                            if rc_before.get(key) != value)
+
+    mismatches = [i for i, (a, b) in enumerate(zip(serial, threaded)) if a != b]
+    print(f"threads: {args.jobs} wallpapers on {args.threads} threads, "
+          f"{args.habits}+ habits x {args.days} days")
+    print(f"  serial:   {serial_time * 1000:8.1f} ms")
+    print(f"  threaded: {threaded_time * 1000:8.1f} ms")
+    print(f"  distinct images:        {len(set(serial))}/{len(serial)}")
+    print(f"  threaded != serial:     {mismatches or 'none'}")
+    print(f"  rcParams changed:       {rc_changed or 'none'}")
+    if mismatches or rc_changed:
+        print("FAILED: rendering is not thread-safe")
+        return 1
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else float('nan')
+
+
+def populate_database(conn, habits, days):
+    """Fill a fresh database with synthetic habits and logs"""
+    import database
+
+    database.migrate(conn)
+    for i, (log_dates, log_values, default) in enumerate(synthetic_logs(habits, days)):
+        habit_id = conn.execute(
+            "INSERT INTO habits (name, type, target_value, default_value) VALUES (?, ?, ?, ?)",
+            (f'Habit {i + 1}', 'boolean', 1, default)).lastrowid
+        conn.executemany("INSERT INTO habit_logs (habit_id, value, date) VALUES (?, ?, ?)",
+                         [(habit_id, value, log_date) for log_date, value in zip(log_dates, log_values)])
+    conn.commit()
+
+
+def run_concurrent_load(open_connection, habits, days, duration):
+    """
+    One thread edits single cells like the GUI does (write + commit),
+    while another repeatedly loads every series like a wallpaper render.
+    Returns (write latencies, read latencies) in seconds.
+    """
+    from habit_repository import HabitRepository
+
+    stop = threading.Event()
+    write_latencies = []
+    read_latencies = []
+    today = date.today()
+
+    def writer():
+        conn = open_connection()
+        rng = random.Random(1)
+        while not stop.is_set():
+            habit_id = rng.randint(1, habits)
+            log_date = (today - timedelta(days=rng.randrange(days))).strftime('%Y-%m-%d')
+            start = time.perf_counter()
+            cursor = conn.execute("UPDATE habit_logs SET value = ? WHERE habit_id = ? AND date = ?",
+                                  (rng.randint(0, 1), habit_id, log_date))
+            if cursor.rowcount == 0:
+                conn.execute("INSERT INTO habit_logs (habit_id, value, date) VALUES (?, ?, ?)",
+                             (habit_id, 1, log_date))
+            conn.commit()
+            write_latencies.append(time.perf_counter() - start)
+            time.sleep(0.005)
+        conn.close()
+
+    def reader():
+        conn = open_connection()
+        repository = HabitRepository(conn)
+        while not stop.is_set():
+            start = time.perf_counter()
+            repository.load_all_series()
+            read_latencies.append(time.perf_counter() - start)
+        conn.close()
+
+    threads = [threading.Thread(target=writer), threading.Thread(target=reader)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return write_latencies, read_latencies
+
+
+def bench_sqlite(args):
+    import sqlite3
+    import database
+
+    def default_connection(path):
+        return lambda: sqlite3.connect(path)
+
+    def tuned_connection(path):
+        return lambda: database.connect(path)
+
+    print(f"sqlite: {args.habits} habits x {args.days} days, "
+          f"GUI edits concurrent with wallpaper reads for {args.duration}s")
+    for label, make_factory, journal_mode in [('default', default_connection, 'DELETE'),
+                                              ('tuned', tuned_connection, 'WAL')]:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'habits.db')
+            conn = sqlite3.connect(path)
+            conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+            populate_database(conn, args.habits, args.days)
+            conn.close()
+
+            writes, reads = run_concurrent_load(make_factory(path), args.habits, args.days,
+                                                args.duration)
+
+        print(f"  {label:8} writes: {len(writes):5d}  p50 {percentile(writes, 0.5) * 1000:7.2f} ms"
+              f"  p95 {percentile(writes, 0.95) * 1000:7.2f} ms")
+        print(f"  {'':8} reads:  {len(reads):5d}  p50 {percentile(reads, 0.5) * 1000:7.2f} ms"
+              f"  p95 {percentile(reads, 0.95) * 1000:7.2f} ms")
+
+
+def drop_triggers(conn, suffix):
+    """Drop the habit_logs triggers whose name ends in suffix"""
+    for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'habit_logs'").fetchall():
+        if name.endswith(suffix):
+            conn.execute(f"DROP TRIGGER {name}")
+
+
+def bench_journal(args):
+    """Write cost of the change journal triggers, and reading changes against reloading"""
+    import database
+    from change_journal import changes_since, current_token
+    from habit_repository import HabitRepository
+
+    today = date.today()
+    rng = random.Random(1)
+
+    def edits():
+        # Batches like the GUI's write-behind flushes, over recent days
+        return [(rng.randint(1, args.habits), today - timedelta(days=rng.randrange(30)), rng.random())
+                for _ in range(args.batch)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = database.connect(os.path.join(tmp, 'habits.db'))
+        populate_database(conn, args.habits, args.days)
+        drop_triggers(conn, '_rollups')  # Measured by the rollups benchmark
+        conn.execute("DROP TABLE habit_stats")  # Updated on write; measured by the stats benchmark
+
+        with_journal, _ = timed(lambda: database.upsert_logs(conn, edits()), repeat=args.repeat)
+
+        token = current_token(conn)
+        database.upsert_logs(conn, edits())
+        read_changes, changes = timed(lambda: changes_since(conn, token))
+        reload_time, _ = timed(lambda: HabitRepository(conn).load_all_series())
+
+        drop_triggers(conn, '_journal')
+        without_journal, _ = timed(lambda: database.upsert_logs(conn, edits()), repeat=args.repeat)
+        conn.close()
+
+    print(f"journal: {args.habits} habits x {args.days} days, batches of {args.batch} edits")
+    print(f"  upsert batch without journal:  {without_journal * 1000:7.2f} ms")
+    print(f"  upsert batch with journal:     {with_journal * 1000:7.2f} ms")
+    print(f"  changes_since one batch:       {read_changes * 1000:7.2f} ms  "
+          f"({len(changes.habit_ids)} habits changed)")
+    print(f"  reloading every series:        {reload_time * 1000:7.2f} ms")
+
+
+def bench_matrix(args):
+    """Dense series from the logs against slices of the habit matrix"""
+    import database
+    from habit_matrix import HabitMatrix
+    from habit_repository import HabitRepository
+
+    def dense_series(repository):
+        return [habit.densify(end=date.today()) for habit in repository.load_all_series()]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = database.connect(os.path.join(tmp, 'habits.db'))
+        populate_database(conn, args.habits, args.days)
+
+        from_logs, _ = timed(lambda: dense_series(HabitRepository(conn)))
+        matrix = HabitMatrix.for_database(conn)
+        rebuild_time, _ = timed(matrix.rebuild)
+        repository = HabitRepository(conn, use_matrix=True)
+        from_matrix, _ = timed(lambda: dense_series(repository))
+
+        rng = random.Random(2)
+
+        def edit_and_refresh():
+            database.upsert_logs(conn, [(rng.randint(1, args.habits),
+                                         date.today() - timedelta(days=rng.randrange(args.days)),
+                                         rng.random())])
+            matrix.refresh()
+
+        refresh_time, _ = timed(edit_and_refresh)
+        size = os.path.getsize(matrix.data_path)
+        conn.close()
+
+    print(f"matrix: {args.habits} habits x {args.days} days ({size // 1024} KB on disk)")
+    print(f"  series from logs:            {from_logs * 1000:7.2f} ms")
+    print(f"  series from the matrix:      {from_matrix * 1000:7.2f} ms")
+    print(f"  rebuild the matrix:          {rebuild_time * 1000:7.2f} ms")
+    print(f"  one edit + refresh:          {refresh_time * 1000:7.2f} ms  (includes the write)")
+
+
+def bench_stats(args):
+    """Habit stats from the summary table against computing them from every habit's history"""
+    import database
+    from habit_repository import HabitRepository
+    from habit_stats import HabitStatsTable, compute_stats
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = database.connect(os.path.join(tmp, 'habits.db'))
+        populate_database(conn, args.habits, args.days)
+        repository = HabitRepository(conn, use_matrix=True)
+        table = HabitStatsTable(conn, repository)
+
+        scan_time, _ = timed(lambda: compute_stats(repository.load_all_series()))
+        # Fill the table as the first write after an upgrade would
+        fill_time, _ = timed(lambda: (table.update(), conn.commit()), repeat=1)
+        current_time, _ = timed(table.load)
+
+        rng = random.Random(3)
+
+        def edit():
+            database.upsert_logs(conn, [(rng.randint(1, args.habits),
+                                         date.today() - timedelta(days=rng.randrange(args.days)),
+                                         rng.random())])
+
+        write_time, _ = timed(edit)
+        conn.execute("UPDATE habit_stats SET as_of = '2000-01-01'")
+        conn.commit()
+        new_day_time, _ = timed(table.load, repeat=1)
+        conn.close()
+
+    print(f"stats: {args.habits} habits x {args.days} days")
+    print(f"  compute from all history:    {scan_time * 1000:7.2f} ms")
+    print(f"  fill the table:              {fill_time * 1000:7.2f} ms  (once, on the first write)")
+    print(f"  read the current table:      {current_time * 1000:7.2f} ms")
+    print(f"  one write with its stats:    {write_time * 1000:7.2f} ms")
+    print(f"  read on a new day:           {new_day_time * 1000:7.2f} ms  (computed, not stored)")
+
+
+def bench_rollups(args):
+    """Write cost of the rollup triggers, and reading rollups against aggregating logs"""
+    import database
+    from habit_rollups import load_rollups
+
+    today = date.today()
+    rng = random.Random(4)
+
+    def edits():
+        return [(rng.randint(1, args.habits), today - timedelta(days=rng.randrange(30)), rng.random())
+                for _ in range(args.batch)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = database.connect(os.path.join(tmp, 'habits.db'))
+        populate_database(conn, args.habits, args.days)
+        conn.execute("DROP TABLE habit_stats")  # Updated on write; measured by the stats benchmark
+
+        def aggregate(period, habit_id=None):
+            where = 'habit_id = ?' if habit_id is not None else '1'
+            params = (habit_id,) if habit_id is not None else ()
+            return conn.execute(database.rollup_query(period, where), params).fetchall()
+
+        weeks = len(load_rollups(conn, 1, 'week'))
+        aggregate_one, _ = timed(lambda: aggregate('week', 1))
+        read_one, _ = timed(lambda: load_rollups(conn, 1, 'week'))
+        aggregate_all, _ = timed(lambda: aggregate('month'))
+        read_all, _ = timed(lambda: conn.execute("SELECT * FROM habit_log_months").fetchall())
+        rebuild_time, _ = timed(lambda: database.rebuild_rollups(conn), repeat=1)
+        conn.commit()
+
+        with_rollups, _ = timed(lambda: database.upsert_logs(conn, edits()), repeat=args.repeat)
+        drop_triggers(conn, '_rollups')
+        without_rollups, _ = timed(lambda: database.upsert_logs(conn, edits()), repeat=args.repeat)
+        conn.close()
+
+    print(f"rollups: {args.habits} habits x {args.days} days, batches of {args.batch} edits")
+    print(f"  one habit by week, aggregated:   {aggregate_one * 1000:7.2f} ms")
+    print(f"  one habit by week, rollup:       {read_one * 1000:7.2f} ms  ({weeks} rows)")
+    print(f"  all habits by month, aggregated: {aggregate_all * 1000:7.2f} ms")
+    print(f"  all habits by month, rollup:     {read_all * 1000:7.2f} ms")
+    print(f"  rebuild both tables:             {rebuild_time * 1000:7.2f} ms")
+    print(f"  upsert batch without rollups:    {without_rollups * 1000:7.2f} ms")
+    print(f"  upsert batch with rollups:       {with_rollups * 1000:7.2f} ms")
+
+
+UPDATE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'update_wallpaper.py')
+
+# Modules an update_wallpaper.py run must not import unless it renders
+RENDER_ONLY_MODULES = ('matplotlib', 'PIL', 'numpy')
+
+
+def import_profile(stderr):
+    """
+    Total import time in seconds and the set of top-level packages
+    imported, from the output of python -X importtime
+    """
+    total = 0
+    packages = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        packages.add(name.strip().split('.')[0])
+        # Nesting is shown by indentation; only count outermost imports
+        if not name[1:].startswith(' '):
+            total += int(cumulative)
+    return total / 1e6, packages
+
+
+def profile_update_wallpaper(directory, repeat):
+    """Best (wall time, import time) and imported packages over repeat runs"""
+    env = dict(os.environ, ENV='prod')
+    best_wall = best_imports = float('inf')
+    packages = set()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', UPDATE_SCRIPT], cwd=directory,
+                                env=env, capture_output=True, text=True, check=True)
+        best_wall = min(best_wall, time.perf_counter() - start)
+        imports, run_packages = import_profile(result.stderr)
+        best_imports = min(best_imports, imports)
+        packages |= run_packages
+    return best_wall, best_imports, packages
+
+
+def bench_startup(args):
+    """
+    Startup cost of update_wallpaper.py on its early-exit paths, which is
+    what most cron runs take. Fails if a run goes over the import budget or
+    loads a rendering dependency.
+    """
+    import database
+
+    failed = False
+    print(f"startup: update_wallpaper.py, best of {args.repeat}, "
+          f"import budget {args.budget_ms:.0f} ms")
+
+    for label, habits in [('no habits', 0), ('cache hit', args.habits)]:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = database.connect(os.path.join(tmp, 'habits.db'))
+            populate_database(conn, habits, args.days)
+            conn.close()
+            if habits:
+                # Render once so the timed runs find it in the cache
+                subprocess.run([sys.executable, UPDATE_SCRIPT, '--force'], cwd=tmp,
+                               env=dict(os.environ, ENV='prod'), check=True,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+            wall, imports, packages = profile_update_wallpaper(tmp, args.repeat)
+
+        loaded = sorted(packages.intersection(RENDER_ONLY_MODULES))
+        over_budget = imports * 1000 > args.budget_ms
+        failed = failed or over_budget or bool(loaded)
+        print(f"  {label:10} wall {wall * 1000:7.1f} ms  imports {imports * 1000:7.1f} ms"
+              f"{'  OVER BUDGET' if over_budget else ''}"
+              f"  render modules: {', '.join(loaded) or 'none'}")
+
+    if failed:
+        print("FAILED: startup budget exceeded")
+        return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    densify_parser = subparsers.add_parser('densify', help='Dense daily series from sparse logs')
+    densify_parser.add_argument('--habits', type=int, default=200)
+    densify_parser.add_argument('--years', type=int, default=10)
+    densify_parser.set_defaults(func=bench_densify)
+
+    pipeline_parser = subparsers.add_parser('pipeline', help='Wallpaper render and encode path')
+    pipeline_parser.add_argument('--habits', type=int, default=7)
+    pipeline_parser.add_argument('--days', type=int, default=30)
+    pipeline_parser.set_defaults(func=bench_pipeline)
+
+    layout_parser = subparsers.add_parser('layout', help='Wallpaper figure with and without the layout cache')
+    layout_parser.add_argument('--habits', type=int, default=7)
+    layout_parser.add_argument('--days', type=int, default=30)
+    layout_parser.set_defaults(func=bench_layout)
+
+    lod_parser = subparsers.add_parser('lod', help='Render time for growing histories')
+    lod_parser.add_argument('--habits', type=int, default=7)
+    lod_parser.add_argument('--repeat', type=int, default=2)
+    lod_parser.add_argument('days', nargs='*', type=int, default=[30, 365, 1825, 3650, 7300])
+    lod_parser.set_defaults(func=bench_lod)
+
+    renderers_parser = subparsers.add_parser('renderers', help='matplotlib and Pillow renderers: speed and parity')
+    renderers_parser.add_argument('--habits', type=int, default=7)
+    renderers_parser.add_argument('--repeat', type=int, default=2)
+    renderers_parser.add_argument('--max-differing', type=float, default=0.02,
+                                  help='Largest allowed fraction of differing pixels')
+    renderers_parser.add_argument('--save', metavar='DIR', help='Also save both renders here')
+    renderers_parser.add_argument('days', nargs='*', type=int, default=[30, 365, 3650])
+    renderers_parser.set_defaults(func=bench_renderers)
+
+    tiles_parser = subparsers.add_parser('tiles', help='Tiled layout with and without cached tiles')
+    tiles_parser.add_argument('--habits', type=int, default=7)
+    tiles_parser.add_argument('--days', type=int, default=365)
+    tiles_parser.set_defaults(func=bench_tiles)
+
+    encoders_parser = subparsers.add_parser('encoders', help='Encode time and size per output format')
+    encoders_parser.add_argument('--habits', type=int, default=7)
+    encoders_parser.add_argument('--days', type=int, default=30)
+    encoders_parser.add_argument('formats', nargs='*',
+                                 default=['png', 'png:1', 'png-palette:64', 'png-palette:16',
+                                          'webp:90', 'webp:100', 'jpeg:90'])
+    encoders_parser.set_defaults(func=bench_encoders)
+
+    threads_parser = subparsers.add_parser('threads', help='Concurrent renders match serial ones')
+    threads_parser.add_argument('--habits', type=int, default=5)
+    threads_parser.add_argument('--days', type=int, default=30)
+    threads_parser.add_argument('--jobs', type=int, default=8)
+    threads_parser.add_argument('--threads', type=int, default=4)
+    threads_parser.set_defaults(func=bench_threads)
+
+    journal_parser = subparsers.add_parser('journal', help='Change journal write cost and read speed')
+    journal_parser.add_argument('--habits', type=int, default=50)
+    journal_parser.add_argument('--days', type=int, default=365)
+    journal_parser.add_argument('--batch', type=int, default=20)
+    journal_parser.add_argument('--repeat', type=int, default=20)
+    journal_parser.set_defaults(func=bench_journal)
+
+    matrix_parser = subparsers.add_parser('matrix', help='Series from logs against the habit matrix')
+    matrix_parser.add_argument('--habits', type=int, default=50)
+    matrix_parser.add_argument('--days', type=int, default=3650)
+    matrix_parser.set_defaults(func=bench_matrix)
+
+    stats_parser = subparsers.add_parser('stats', help='Habit stats from the summary table against a full scan')
+    stats_parser.add_argument('--habits', type=int, default=50)
+    stats_parser.add_argument('--days', type=int, default=3650)
+    stats_parser.set_defaults(func=bench_stats)
+
+
+    rollups_parser = subparsers.add_parser('rollups', help='Rollup trigger cost and reads against aggregation')
+    rollups_parser.add_argument('--habits', type=int, default=50)
+    rollups_parser.add_argument('--days', type=int, default=3650)
+    rollups_parser.add_argument('--batch', type=int, default=20, help='Edits per transaction')
+    rollups_parser.add_argument('--repeat', type=int, default=20)
+    rollups_parser.set_defaults(func=bench_rollups)
+
+    startup_parser = subparsers.add_parser('startup', help='update_wallpaper.py import time budget')
+    startup_parser.add_argument('--habits', type=int, default=7)
+    startup_parser.add_argument('--days', type=int, default=30)
+    startup_parser.add_argument('--repeat', type=int, default=5)
+    startup_parser.add_argument('--budget-ms', type=float, default=100)
+    startup_parser.set_defaults(func=bench_startup)
+
+    sqlite_parser = subparsers.add_parser('sqlite', help='Read/write latency under concurrent load')
+    sqlite_parser.add_argument('--habits', type=int, default=50)
+    sqlite_parser.add_argument('--days', type=int, default=365)
+    sqlite_parser.add_argument('--duration', type=float, default=3)
+    sqlite_parser.set_defaults(func=bench_sqlite)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
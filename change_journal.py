@@ -0,0 +1,82 @@
+import sqlite3
+from database import date_from_db
+
+
+class ChangeSet:
+    """
+    What changed in habits and habit_logs after a change token.
+
+    token is the token to pass next time. habits holds the ids of habits
+    whose own row was added, edited or deleted; logs maps habit ids to the
+    (first, last) dates of their logs that were written or deleted.
+    full_reload is set when the changes cannot be known, because no token
+    was given or the journal was pruned past it; then everything must be
+    reloaded.
+    """
+
+    def __init__(self, token, full_reload=False):
+        self.token = token
+        self.full_reload = full_reload
+        self.habits = set()
+        self.logs = {}
+
+    def __bool__(self):
+        return self.full_reload or bool(self.habits) or bool(self.logs)
+
+    @property
+    def habit_ids(self):
+        """Every habit with a change of any kind"""
+        return self.habits | set(self.logs)
+
+    def add_log_dates(self, habit_id, first, last):
+        if habit_id in self.logs:
+            old_first, old_last = self.logs[habit_id]
+            first, last = min(first, old_first), max(last, old_last)
+        self.logs[habit_id] = (first, last)
+
+
+def current_token(conn):
+    """
+    Sequence number of the latest change, or None if the database has no
+    change journal yet (it was never migrated)
+    """
+    try:
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+    except sqlite3.OperationalError:
+        return None  # Not even sqlite_sequence exists yet
+    if row is not None:
+        return row[0]
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'changes'").fetchone()
+    return 0 if exists else None
+
+
+def changes_since(conn, token):
+    """ChangeSet of everything recorded after token, a value from an earlier call or None"""
+    latest = current_token(conn)
+    if latest is None:
+        return ChangeSet(None, full_reload=True)
+    if token is None or token > latest:
+        # No earlier state, or the database was recreated since
+        return ChangeSet(latest, full_reload=True)
+    if token == latest:
+        return ChangeSet(latest)
+
+    oldest = conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+    if oldest is None or oldest > token + 1:
+        return ChangeSet(latest, full_reload=True)  # Pruned past token
+
+    changes = ChangeSet(latest)
+    # Dates are grouped by their stored type, since text and integer dates
+    # do not order against each other, and compared once converted
+    for habit_id, first, last, habit_changed in conn.execute("""
+        SELECT habit_id, MIN(date), MAX(date), MAX(date IS NULL)
+        FROM changes
+        WHERE seq > ? AND seq <= ?
+        GROUP BY habit_id, typeof(date)
+    """, (token, latest)):
+        if habit_changed:
+            changes.habits.add(habit_id)
+        if first is not None:
+            changes.add_log_dates(habit_id, date_from_db(first), date_from_db(last))
+    return changes
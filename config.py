@@ -1,8 +1,13 @@
 import os
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+# Load environment variables from the .env file next to this module, whatever
+# the working directory. Variables already set in the environment win, so a
+# single run can still override a setting. python-dotenv is slow to import,
+# so it is only loaded when there is a file to read.
+DOTENV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+if os.path.exists(DOTENV_PATH):
+    from dotenv import load_dotenv
+    load_dotenv(DOTENV_PATH, override=False)
 
 # Get environment (default to 'prod')
 ENV = os.getenv('ENV', 'prod')
@@ -11,4 +16,23 @@ ENV = os.getenv('ENV', 'prod')
 DB_NAME = 'habits_test.db' if ENV == 'test' else 'habits.db'
 
 # Flag to determine if tables should be reset
-RESET_TABLES = ENV == 'test' 
\ No newline at end of file
+RESET_TABLES = ENV == 'test' 
+
+# How habit_logs.date is stored: 'text' (ISO dates) or 'epoch_day' (integer
+# days since 1970-01-01). Existing logs are converted on startup when this changes.
+DATE_STORAGE = os.getenv('DATE_STORAGE', 'text')
+
+# Wallpaper output format, e.g. 'png', 'png:1', 'png-palette:64', 'webp:90', 'jpeg:90'
+WALLPAPER_FORMAT = os.getenv('WALLPAPER_FORMAT', 'png')
+
+# Wallpaper renderer: 'matplotlib' (default) or 'pillow', which draws the same
+# chart directly with Pillow in a fraction of the time, without antialiased lines
+WALLPAPER_RENDERER = os.getenv('WALLPAPER_RENDERER', 'matplotlib')
+
+# Wallpaper layout: 'combined' (default), one plot of every habit, or 'tiles',
+# a grid with one small plot per habit where only changed habits are re-rendered
+WALLPAPER_LAYOUT = os.getenv('WALLPAPER_LAYOUT', 'combined')
+
+# Read plotted values from the dense habit x day snapshot kept next to the
+# database (habits.db.matrix.npy) instead of querying logs. Set to 0 to disable.
+HABIT_MATRIX = os.getenv('HABIT_MATRIX', '1') != '0'
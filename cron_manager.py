@@ -2,16 +2,19 @@ import os
 import sys
 from crontab import CronTab
 import getpass
+import wallpaper_daemon
 
 class CronManager:
     def __init__(self):
         self.user = getpass.getuser()
         self.cron = CronTab(user=self.user)
         self.job_comment = 'habit_wallpaper_update'
+        self.daemon_comment = 'habit_wallpaper_daemon'
         
         # Get paths
         self.project_dir = os.path.dirname(os.path.abspath(__file__))
         self.script_path = os.path.join(self.project_dir, 'update_wallpaper.py')
+        self.daemon_path = os.path.join(self.project_dir, 'wallpaper_daemon.py')
         self.venv_python = sys.executable
         
         # Make script executable
@@ -29,7 +32,7 @@ class CronManager:
                            comment=self.job_comment)
         
         # Set environment
-        job.env['PYTHONPATH'] = self.project_dir
+        self._set_environment(job)
         
         # Set schedule using proper cron syntax
         if minutes == 1:
@@ -43,14 +46,49 @@ class CronManager:
         
         self.cron.write()
     
+    def install_daemon(self):
+        """Run the wallpaper daemon instead of a periodic update job"""
+        # Remove existing jobs and stop any running daemon, which returns
+        # once it has exited, so the new one below can take the lock
+        self.remove_job()
+        
+        # The cron entry only supervises: it restarts the daemon if it is
+        # not running (e.g. after a reboot) and otherwise exits immediately
+        command = f'cd {self.project_dir} && {self.venv_python} {self.daemon_path} --ensure'
+        
+        job = self.cron.new(command=command,
+                           comment=self.daemon_comment)
+        self._set_environment(job)
+        job.setall('* * * * *')
+        
+        self.cron.write()
+        
+        # Start it right away rather than waiting for the next cron tick
+        wallpaper_daemon.ensure_running()
+    
+    def _set_environment(self, job):
+        # Settings are not copied into the crontab: every run reads .env, so
+        # later changes to it reach the job without re-creating it
+        job.env['PYTHONPATH'] = self.project_dir
+    
     def remove_job(self):
-        """Remove the wallpaper update cron job"""
+        """Remove the wallpaper update cron job and stop the daemon"""
         self.cron.remove_all(comment=self.job_comment)
+        self.cron.remove_all(comment=self.daemon_comment)
         self.cron.write()
+        wallpaper_daemon.stop()
     
     def is_job_active(self):
-        """Check if wallpaper update job exists"""
-        return any(job.comment == self.job_comment for job in self.cron)
+        """Check if wallpaper update job or daemon supervisor exists"""
+        return any(job.comment in (self.job_comment, self.daemon_comment) for job in self.cron)
+    
+    def is_daemon_installed(self):
+        """Check if the daemon supervisor job exists"""
+        return any(job.comment == self.daemon_comment for job in self.cron)
+    
+    def is_daemon_running(self):
+        """Check if the wallpaper daemon process is alive"""
+        return wallpaper_daemon.running_pid() is not None
     
     def get_current_frequency(self):
         """Get current update frequency in minutes"""
@@ -1,15 +1,94 @@
 import sqlite3
-from config import DB_NAME, RESET_TABLES
+from datetime import date, datetime, timedelta
+from config import DB_NAME, RESET_TABLES, DATE_STORAGE
 
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    if RESET_TABLES:
-        # Drop existing tables only in test environment
-        c.execute("DROP TABLE IF EXISTS habit_logs")
-        c.execute("DROP TABLE IF EXISTS habits")
-    
+DATE_STORAGE_MODES = ('text', 'epoch_day')
+
+EPOCH = date(1970, 1, 1)
+
+# Julian day number of 1970-01-01, for converting epoch days in SQL
+JULIAN_EPOCH = 2440587.5
+
+# habit_logs.date as days since 1970-01-01, whichever way it is stored
+LOG_DAY = f"""
+    CASE WHEN typeof(date) = 'integer' THEN date
+         ELSE CAST(julianday(date) - {JULIAN_EPOCH} AS INTEGER) END
+"""
+
+# Connection settings shared by the GUI, the wallpaper job and the CLI
+PRAGMAS = [
+    ('journal_mode', 'WAL'),      # Readers and the writer no longer block each other
+    ('synchronous', 'NORMAL'),    # Safe with WAL; fsync at checkpoints, not every commit
+    ('cache_size', -16000),       # 16 MB page cache
+    ('mmap_size', 268435456),     # Read pages through a 256 MB memory map
+    ('temp_store', 'MEMORY'),
+    ('busy_timeout', 5000),       # Wait up to 5s for a lock instead of failing
+    # Rows removed by REPLACE conflict resolution fire delete triggers, so the
+    # journal and rollups see them like any other delete
+    ('recursive_triggers', 'ON'),
+]
+
+# Prepared statements are cached per connection, keyed by SQL text.
+# All queries use bound parameters, so the set of distinct statements is small.
+STATEMENT_CACHE_SIZE = 256
+
+def connect(path=None):
+    """Open a connection to the habits database with the performance profile applied"""
+    conn = sqlite3.connect(path or DB_NAME, cached_statements=STATEMENT_CACHE_SIZE)
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+def date_storage_mode(conn):
+    """
+    How this database stores habit_logs.date, as recorded in its settings.
+    Every writer follows it whatever its own DATE_STORAGE, so one database
+    never holds dates in both forms; DATE_STORAGE only decides the mode of a
+    database that has none recorded yet, and what init_db converts to.
+    """
+    try:
+        row = conn.execute("SELECT value FROM settings WHERE key = 'date_storage'").fetchone()
+    except sqlite3.OperationalError:
+        row = None  # Not migrated yet
+    return row[0] if row else DATE_STORAGE
+
+def date_to_db(value, mode):
+    """
+    Convert a date, datetime or ISO date string to the stored form of
+    habit_logs.date in the given mode, from date_storage_mode()
+    """
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    elif isinstance(value, datetime):
+        value = value.date()
+    if mode == 'epoch_day':
+        return (value - EPOCH).days
+    return value.isoformat()
+
+def date_from_db(value):
+    """Convert a stored habit_logs.date (ISO text or epoch day) back to a date"""
+    if isinstance(value, int):
+        return EPOCH + timedelta(days=value)
+    return date.fromisoformat(value)
+
+def upsert_logs(conn, logs):
+    """
+    Write many (habit_id, log_date, value) logs in a single transaction,
+    replacing any existing log for the same habit and day, together with
+    the stats of the habits written
+    """
+    from habit_stats import HabitStatsTable  # Imports this module
+
+    mode = date_storage_mode(conn)
+    with conn:
+        conn.executemany("""
+            INSERT INTO habit_logs (habit_id, value, date)
+            VALUES (?, ?, ?)
+            ON CONFLICT (habit_id, date) DO UPDATE SET value = excluded.value
+        """, [(habit_id, value, date_to_db(log_date, mode)) for habit_id, log_date, value in logs])
+        HabitStatsTable(conn).update()
+
+def _create_tables(c):
     # Create habits table with default_value
     c.execute('''
         CREATE TABLE IF NOT EXISTS habits (
@@ -21,7 +100,7 @@ def init_db():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
-    
+
     # Create logs table with unique constraint
     c.execute('''
         CREATE TABLE IF NOT EXISTS habit_logs (
@@ -33,16 +112,386 @@ def init_db():
             UNIQUE(habit_id, date)  -- Ensure one log per habit per day
         )
     ''')
-    
-    # Clean up any duplicate entries
+
+def _remove_duplicate_logs(c):
+    # Databases created before the UNIQUE constraint may hold duplicates
     c.execute("""
-        DELETE FROM habit_logs 
+        DELETE FROM habit_logs
         WHERE rowid NOT IN (
             SELECT MIN(rowid)
             FROM habit_logs
             GROUP BY habit_id, date
         )
     """)
-    
-    conn.commit()
-    conn.close() 
\ No newline at end of file
+
+def _add_covering_log_index(c):
+    # Lets (habit_id, date) lookups and per-habit range scans read values
+    # straight from the index without touching the table
+    c.execute("""
+        CREATE INDEX IF NOT EXISTS idx_habit_logs_habit_date_value
+        ON habit_logs (habit_id, date, value)
+    """)
+
+# How many changes the journal keeps; consumers further behind reload everything
+JOURNAL_KEEP = 10000
+
+def _add_change_journal(c):
+    # Every write to habits and habit_logs appends the habit and, for logs,
+    # the date to an ever-increasing sequence, so readers can ask what
+    # changed since they last looked. Habit rows are recorded with a NULL date.
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            habit_id INTEGER,
+            date DATE
+        )
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS habits_insert_journal AFTER INSERT ON habits
+        BEGIN
+            INSERT INTO changes (habit_id) VALUES (NEW.id);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS habits_update_journal AFTER UPDATE ON habits
+        BEGIN
+            INSERT INTO changes (habit_id) SELECT OLD.id UNION SELECT NEW.id;
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS habits_delete_journal AFTER DELETE ON habits
+        BEGIN
+            INSERT INTO changes (habit_id) VALUES (OLD.id);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS habit_logs_insert_journal AFTER INSERT ON habit_logs
+        BEGIN
+            INSERT INTO changes (habit_id, date) VALUES (NEW.habit_id, NEW.date);
+        END
+    """)
+    # Upserts that rewrite the same value are not changes
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS habit_logs_update_journal AFTER UPDATE ON habit_logs
+        WHEN OLD.value IS NOT NEW.value OR OLD.date IS NOT NEW.date
+             OR OLD.habit_id IS NOT NEW.habit_id
+        BEGIN
+            INSERT INTO changes (habit_id, date)
+            SELECT OLD.habit_id, OLD.date UNION SELECT NEW.habit_id, NEW.date;
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS habit_logs_delete_journal AFTER DELETE ON habit_logs
+        BEGIN
+            INSERT INTO changes (habit_id, date) VALUES (OLD.habit_id, OLD.date);
+        END
+    """)
+    # Every thousand changes, drop those older than the last JOURNAL_KEEP
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS changes_prune AFTER INSERT ON changes
+        WHEN NEW.seq % 1000 = 0
+        BEGIN
+            DELETE FROM changes WHERE seq <= NEW.seq - {JOURNAL_KEEP};
+        END
+    """)
+
+def _add_habit_stats(c):
+    # Streaks, completion rates and averages per habit, updated by every
+    # writer through habit_stats.HabitStatsTable.update(). The rate and
+    # mean columns are one per window in habit_stats.WINDOWS.
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS habit_stats (
+            habit_id INTEGER PRIMARY KEY,
+            as_of DATE NOT NULL,
+            token INTEGER NOT NULL,
+            current_streak INTEGER NOT NULL,
+            longest_streak INTEGER NOT NULL,
+            rate_7 REAL,
+            rate_30 REAL,
+            rate_90 REAL,
+            mean_7 REAL,
+            mean_30 REAL,
+            mean_90 REAL
+        )
+    """)
+
+# Per-habit rollup tables and the start of their periods, from a Julian day
+# number: the Monday of the ISO week, and the first day of the month
+ROLLUP_TABLES = {
+    'week': ('habit_log_weeks', "date({day}, '-6 days', 'weekday 1')"),
+    'month': ('habit_log_months', "date({day}, 'start of month')"),
+}
+
+def _julian_day(column):
+    # habit_logs.date as a Julian day number, whichever way it is stored
+    return (f"(CASE WHEN typeof({column}) = 'integer' THEN {column} + {JULIAN_EPOCH} "
+            f"ELSE julianday({column}) END)")
+
+def _period_start(period, column):
+    return ROLLUP_TABLES[period][1].format(day=_julian_day(column))
+
+# Value a log must reach to count as a completion, from a habits row: the
+# target, or 1 (yes) for Yes/No habits without one. NULL for numeric habits
+# without a target, where any value above zero counts. The same rule as
+# habit_stats uses.
+_GOAL = "COALESCE(NULLIF(target_value, 0), CASE WHEN type = 'boolean' THEN 1 END)"
+
+def _completed(value, goal):
+    return f"COALESCE({value} >= {goal}, {value} > 0, 0)"
+
+def rollup_query(period, where='1'):
+    """
+    SELECT aggregating habit_logs into (habit_id, period_start, total, count,
+    completions) rows of the given period, as the rollup tables hold them
+    """
+    return f"""
+        SELECT habit_id, {_period_start(period, 'date')} AS period_start,
+               SUM(value), COUNT(value), SUM({_completed('value', _GOAL)})
+        FROM habit_logs LEFT JOIN habits ON habits.id = habit_id
+        WHERE value IS NOT NULL AND {where}
+        GROUP BY habit_id, period_start
+    """
+
+def rebuild_rollups(conn):
+    """Refill the rollup tables from habit_logs; runs in the caller's transaction"""
+    for period, (table, _) in ROLLUP_TABLES.items():
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"""
+            INSERT INTO {table} (habit_id, period_start, total, count, completions)
+            {rollup_query(period)}
+        """)
+
+def _rollup_delta(period, habit_id, log_date, value, sign):
+    # Add (sign '') or remove (sign '-') one log's value in its period's row
+    table = ROLLUP_TABLES[period][0]
+    goal = f"(SELECT {_GOAL} FROM habits WHERE id = {habit_id})"
+    return f"""
+        INSERT INTO {table} (habit_id, period_start, total, count, completions)
+        SELECT {habit_id}, {_period_start(period, log_date)}, {sign}{value}, {sign}1,
+               {sign}{_completed(value, goal)}
+        WHERE {value} IS NOT NULL
+        ON CONFLICT (habit_id, period_start) DO UPDATE SET
+            total = total + excluded.total,
+            count = count + excluded.count,
+            completions = completions + excluded.completions;
+    """
+
+def _rollup_cleanup(period, habit_id, log_date):
+    # Periods whose last value was removed
+    table = ROLLUP_TABLES[period][0]
+    return f"""
+        DELETE FROM {table}
+        WHERE habit_id = {habit_id} AND period_start = {_period_start(period, log_date)}
+              AND count <= 0;
+    """
+
+def _add_rollups(c):
+    # Sum, count and completions of each habit's logged values per ISO week
+    # and per month, kept current by triggers, so long-range views read a
+    # row per period instead of every log. Logs without a value are left
+    # out, and the mean is total / count.
+    for table, _ in ROLLUP_TABLES.values():
+        c.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                habit_id INTEGER NOT NULL,
+                period_start DATE NOT NULL,
+                total REAL NOT NULL,
+                count INTEGER NOT NULL,
+                completions INTEGER NOT NULL,
+                PRIMARY KEY (habit_id, period_start)
+            ) WITHOUT ROWID
+        """)
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS habit_logs_insert_rollups AFTER INSERT ON habit_logs
+        WHEN NEW.value IS NOT NULL
+        BEGIN
+            {''.join(_rollup_delta(period, 'NEW.habit_id', 'NEW.date', 'NEW.value', '')
+                     for period in ROLLUP_TABLES)}
+        END
+    """)
+    # Converting date storage rewrites dates without moving them to another day
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS habit_logs_update_rollups AFTER UPDATE ON habit_logs
+        WHEN OLD.value IS NOT NEW.value OR OLD.habit_id IS NOT NEW.habit_id
+             OR {_julian_day('OLD.date')} IS NOT {_julian_day('NEW.date')}
+        BEGIN
+            {''.join(_rollup_delta(period, 'OLD.habit_id', 'OLD.date', 'OLD.value', '-')
+                     for period in ROLLUP_TABLES)}
+            {''.join(_rollup_delta(period, 'NEW.habit_id', 'NEW.date', 'NEW.value', '')
+                     for period in ROLLUP_TABLES)}
+            {''.join(_rollup_cleanup(period, 'OLD.habit_id', 'OLD.date')
+                     for period in ROLLUP_TABLES)}
+        END
+    """)
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS habit_logs_delete_rollups AFTER DELETE ON habit_logs
+        WHEN OLD.value IS NOT NULL
+        BEGIN
+            {''.join(_rollup_delta(period, 'OLD.habit_id', 'OLD.date', 'OLD.value', '-')
+                     for period in ROLLUP_TABLES)}
+            {''.join(_rollup_cleanup(period, 'OLD.habit_id', 'OLD.date')
+                     for period in ROLLUP_TABLES)}
+        END
+    """)
+    # A new target or type changes which logs count as completions
+    recount = ''.join(f"""
+            DELETE FROM {table} WHERE habit_id = NEW.id;
+            INSERT INTO {table} (habit_id, period_start, total, count, completions)
+            {rollup_query(period, 'habit_id = NEW.id')};"""
+                      for period, (table, _) in ROLLUP_TABLES.items())
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS habits_update_rollups AFTER UPDATE OF target_value, type ON habits
+        WHEN OLD.target_value IS NOT NEW.target_value OR OLD.type IS NOT NEW.type
+        BEGIN
+            {recount}
+        END
+    """)
+    rebuild_rollups(c)
+
+def _add_settings(c):
+    # Settings every process must agree on, whatever its environment. The
+    # date storage mode starts as the form most existing logs are in.
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value
+        )
+    """)
+    row = c.execute("""
+        SELECT typeof(date) FROM habit_logs
+        GROUP BY typeof(date) ORDER BY COUNT(*) DESC LIMIT 1
+    """).fetchone()
+    mode = DATE_STORAGE if row is None else 'epoch_day' if row[0] == 'integer' else 'text'
+    c.execute("INSERT OR IGNORE INTO settings (key, value) VALUES ('date_storage', ?)", (mode,))
+
+# Schema migrations, applied in order. PRAGMA user_version records how many
+# have run, so each one runs exactly once per database. Only ever append to
+# this list; never reorder or change a migration that has shipped.
+MIGRATIONS = [
+    _create_tables,
+    _remove_duplicate_logs,
+    _add_covering_log_index,
+    _add_change_journal,
+    _add_habit_stats,
+    _add_rollups,
+    _add_settings,
+]
+
+def migrate(conn):
+    """Apply any pending migrations, each in its own transaction"""
+    while True:
+        # Take the write lock before re-reading the version, so concurrent
+        # starts cannot apply the same migration twice
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= len(MIGRATIONS):
+                conn.rollback()
+                return
+            MIGRATIONS[version](conn)
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+def convert_date_storage(conn, mode):
+    """
+    Rewrite habit_logs.date into the given storage mode in one transaction,
+    and record it as the database's mode.
+    Integer epoch days keep the (habit_id, date) indexes smaller and let
+    readers skip date parsing; 'text' converts back to ISO dates.
+    When a habit has a log for the same day in both forms, which writers
+    from before the mode was recorded could leave, the later one (the
+    higher id) is kept.
+    """
+    if mode not in DATE_STORAGE_MODES:
+        raise ValueError(f"Unknown DATE_STORAGE '{mode}'. "
+                         f"Choose from: {', '.join(DATE_STORAGE_MODES)}")
+
+    # The same day in the other form, for finding duplicates through the index
+    other_form = f"""
+        CASE WHEN typeof(older.date) = 'integer' THEN date(older.date + {JULIAN_EPOCH})
+             ELSE CAST(julianday(older.date) - {JULIAN_EPOCH} AS INTEGER) END
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(f"""
+            DELETE FROM habit_logs WHERE id IN (
+                SELECT older.id FROM habit_logs AS older
+                JOIN habit_logs AS newer
+                  ON newer.habit_id = older.habit_id AND newer.date = {other_form}
+                WHERE newer.id > older.id
+            )
+        """)
+        if mode == 'epoch_day':
+            conn.execute(f"""
+                UPDATE habit_logs
+                SET date = CAST(julianday(date) - {JULIAN_EPOCH} AS INTEGER)
+                WHERE typeof(date) = 'text'
+            """)
+        else:
+            conn.execute(f"""
+                UPDATE habit_logs
+                SET date = date(date + {JULIAN_EPOCH})
+                WHERE typeof(date) = 'integer'
+            """)
+        conn.executemany("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                         [('date_storage', mode), ('dates_verified', mode)])
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+def ensure_date_storage(conn, mode=None):
+    """
+    Convert habit_logs.date to mode, by default the database's recorded
+    mode, unless it is already recorded and every log is stored that way.
+    Returns True if a conversion ran.
+
+    Once the logs are known to be in one form, which convert_date_storage
+    or the first check records as 'dates_verified', writers keep them that
+    way, so this costs a settings lookup rather than a scan of the logs.
+    """
+    settings = dict(conn.execute(
+        "SELECT key, value FROM settings WHERE key IN ('date_storage', 'dates_verified')"))
+    recorded = settings.get('date_storage', DATE_STORAGE)
+    mode = mode or recorded
+    if recorded == mode and settings.get('dates_verified') == mode:
+        return False
+
+    # Logs from before the mode was recorded may be in either form
+    stored_type = 'integer' if mode == 'epoch_day' else 'text'
+    mixed = conn.execute("SELECT 1 FROM habit_logs WHERE typeof(date) != ? LIMIT 1",
+                         (stored_type,)).fetchone()
+    if recorded == mode and not mixed:
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('dates_verified', ?)",
+                         (mode,))
+        return False
+    convert_date_storage(conn, mode)
+    return True
+
+def init_db():
+    conn = connect()
+    try:
+        if RESET_TABLES:
+            # Drop existing tables only in test environment
+            for table, _ in ROLLUP_TABLES.values():
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute("DROP TABLE IF EXISTS settings")
+            conn.execute("DROP TABLE IF EXISTS habit_stats")
+            conn.execute("DROP TABLE IF EXISTS changes")
+            conn.execute("DROP TABLE IF EXISTS habit_logs")
+            conn.execute("DROP TABLE IF EXISTS habits")
+            conn.execute("PRAGMA user_version = 0")
+
+        # Common case: already up to date, which costs a single pragma read
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < len(MIGRATIONS):
+            migrate(conn)
+
+        # Switch to the configured mode, also repairing logs in mixed forms
+        ensure_date_storage(conn, DATE_STORAGE)
+    finally:
+        conn.close()
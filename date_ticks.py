@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+from dateutil.relativedelta import relativedelta
+
+# Date label spacing by the number of days on the x axis, keeping about 31
+# labels or fewer. Shared by the matplotlib and Pillow renderers.
+
+
+def tick_spec(days_shown):
+    """(unit, interval, strftime format) for an axis spanning days_shown days"""
+    if days_shown < 63:
+        return 'day', 2, '%Y-%m-%d'
+    if days_shown < 31 * 7:
+        return 'week', 1, '%Y-%m-%d'
+    if days_shown < 31 * 30:
+        return 'month', 1, '%Y-%m'
+    if days_shown < 31 * 91:
+        return 'month', 3, '%Y-%m'
+    years = days_shown // 365
+    return 'year', max(1, -(-years // 31)), '%Y'
+
+
+def tick_dates(start, end, unit, interval):
+    """Dates from start to end (inclusive) where a label goes"""
+    if unit == 'day':
+        # matplotlib counts days from as far before the axis as the axis is
+        # long, so labels land on the same days in both renderers
+        anchor = start - relativedelta(end, start)
+        days = (anchor + timedelta(days=i) for i in range(0, (end - anchor).days + 1, interval))
+        return [day for day in days if day >= start]
+    if unit == 'week':
+        first = start + timedelta(days=-start.weekday() % 7)  # Next Monday
+        return [first + timedelta(weeks=i) for i in range((end - first).days // 7 + 1)]
+
+    # First day of every interval-th month, or January of every interval-th year
+    months = interval if unit == 'month' else 12 * interval
+    dates = []
+    year, month = start.year, 1
+    while True:
+        day = date(year, month, 1)
+        if day > end:
+            return dates
+        if day >= start and (year * 12 + month - 1) % months == 0:
+            dates.append(day)
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
@@ -0,0 +1,77 @@
+import numpy as np
+from datetime import date
+
+
+def to_days(dates):
+    """
+    Convert ISO date strings, date objects or integer days since
+    1970-01-01 to a datetime64[D] array
+    """
+    return np.asarray(dates, dtype='datetime64[D]')
+
+
+def densify(log_dates, log_values, default_value, start=None, end=None):
+    """
+    Turn sparse logs into one value per day from start to end (inclusive).
+    Days without a log, or with a NULL value, get default_value.
+    start defaults to the first log and end to today.
+    Returns (days, values) as datetime64[D] and float64 arrays.
+    """
+    log_days = to_days(log_dates)
+    log_values = np.asarray(log_values, dtype=np.float64)
+
+    if start is None:
+        if not len(log_days):
+            return to_days([]), np.empty(0, dtype=np.float64)
+        start = log_days.min()
+    start = np.datetime64(start, 'D')
+    end = np.datetime64(date.today() if end is None else end, 'D')
+
+    length = int((end - start).astype(np.int64)) + 1
+    if length <= 0:
+        return to_days([]), np.empty(0, dtype=np.float64)
+
+    days = start + np.arange(length)
+    values = np.full(length, default_value if default_value is not None else np.nan,
+                     dtype=np.float64)
+
+    # Scatter logged values at their integer day offsets, ignoring
+    # logs outside the window and NULL values
+    offsets = (log_days - start).astype(np.int64)
+    mask = (offsets >= 0) & (offsets < length) & ~np.isnan(log_values)
+    values[offsets[mask]] = log_values[mask]
+
+    return days, values
+
+
+def window(days, values, default_value, start=None, end=None):
+    """
+    The part of an already dense series from start to end, as densify()
+    would return it for the same logs: days before the series or after it
+    get default_value. Returns views of the inputs when the window lies
+    within them, so nothing is copied.
+    """
+    if start is None:
+        if not len(days):
+            return to_days([]), np.empty(0, dtype=np.float64)
+        start = days[0]
+    start = np.datetime64(start, 'D')
+    end = np.datetime64(date.today() if end is None else end, 'D')
+
+    length = int((end - start).astype(np.int64)) + 1
+    if length <= 0:
+        return to_days([]), np.empty(0, dtype=np.float64)
+
+    offset = int((start - days[0]).astype(np.int64)) if len(days) else 0
+    if len(days) and offset >= 0 and offset + length <= len(days):
+        return days[offset:offset + length], values[offset:offset + length]
+
+    # Partly outside the series: pad with the default value
+    window_days = start + np.arange(length)
+    window_values = np.full(length, default_value if default_value is not None else np.nan,
+                            dtype=np.float64)
+    if len(days):
+        lo, hi = max(offset, 0), min(offset + length, len(days))
+        if lo < hi:
+            window_values[lo - offset:hi - offset] = values[lo:hi]
+    return window_days, window_values
@@ -0,0 +1,35 @@
+import numpy as np
+
+
+def downsample_minmax(days, values, max_points):
+    """
+    Reduce a dense series to at most about max_points points while keeping
+    its shape: the days are split into equal buckets and each bucket keeps
+    its lowest and highest value, so no spike or dip disappears.
+    NaN values (days without a value) are only kept if a whole bucket is NaN.
+    Returns (days, values) unchanged when they already fit.
+    """
+    length = len(values)
+    if length <= max_points or max_points < 4:
+        return days, values
+
+    # Two points per bucket
+    bucket_size = -(-length // (max_points // 2))
+    buckets = -(-length // bucket_size)
+
+    # Pad the last bucket so the series reshapes into equal rows; padding
+    # and NaN values are never picked as a minimum or maximum
+    padding = buckets * bucket_size - length
+    for_min = np.concatenate([values, np.full(padding, np.inf)])
+    for_max = np.concatenate([values, np.full(padding, -np.inf)])
+    for_min[np.isnan(for_min)] = np.inf
+    for_max[np.isnan(for_max)] = -np.inf
+
+    starts = np.arange(buckets) * bucket_size
+    minima = starts + for_min.reshape(buckets, bucket_size).argmin(axis=1)
+    maxima = starts + for_max.reshape(buckets, bucket_size).argmax(axis=1)
+
+    # Always keep both ends, so the line spans the same date range
+    keep = np.unique(np.concatenate([minima, maxima, [0, length - 1]]))
+    keep = keep[keep < length]
+    return days[keep], values[keep]
@@ -0,0 +1,35 @@
+import time
+from collections import Counter, deque
+
+
+class EditStats:
+    """
+    Instrumentation for GUI edits: how many times each handler fired and how
+    long each edit took from saving the value to finishing the redraw.
+    """
+
+    def __init__(self, history=100):
+        self.handler_calls = Counter()
+        self.durations = deque(maxlen=history)
+        self._started = None
+
+    def count(self, handler_name):
+        self.handler_calls[handler_name] += 1
+
+    def start_edit(self):
+        self._started = time.perf_counter()
+
+    def finish_edit(self):
+        if self._started is not None:
+            self.durations.append(time.perf_counter() - self._started)
+            self._started = None
+
+    def summary(self):
+        """One-line description for the status bar"""
+        if not self.durations:
+            return 'No edits yet'
+        last = self.durations[-1] * 1000
+        average = sum(self.durations) / len(self.durations) * 1000
+        handlers = ', '.join(f'{name}: {calls}' for name, calls in sorted(self.handler_calls.items()))
+        return (f'Edits: {len(self.durations)} | last {last:.1f} ms, avg {average:.1f} ms '
+                f'| handler calls: {handlers}')
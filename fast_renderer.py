@@ -0,0 +1,426 @@
+"""
+Draws the wallpaper chart straight into an image with Pillow instead of
+matplotlib. It follows the layout and theme of create_habit_progress_plot:
+step lines for Yes/No habits, lines for numeric ones, dashed targets, and
+a legend to the right of the plot. Lines are not antialiased, which is the
+main visible difference from the matplotlib renderer.
+"""
+import importlib.util
+import math
+import os
+from datetime import date
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+import theme
+from date_ticks import tick_spec, tick_dates
+from downsample import downsample_minmax
+
+EPOCH = date(1970, 1, 1)
+
+# Font sizes in points, as in plot_utils and the wallpaper legend
+TITLE_SIZE = 16
+LABEL_SIZE = 12
+TICK_SIZE = 10
+LEGEND_SIZE = 12
+
+# matplotlib's defaults for the pieces the chart uses, in points
+TICK_LENGTH = 3.5
+TICK_WIDTH = 0.8
+TICK_PAD = 3.5
+LABEL_PAD = 4
+TITLE_PAD = 20
+SPINE_WIDTH = 0.8
+GRID_WIDTH = 0.5
+GRID_ALPHA = 0.08
+MARKER_EDGE_WIDTH = 1.0
+LAYOUT_PAD = 1.08 * 10     # tight_layout's padding
+Y_MARGIN = 0.05            # Fraction of the data range added above and below
+DASH = (3.7, 1.6)          # '--' pattern, in multiples of the line width
+X_LABEL_ROTATION = 30
+MIN_PLOT_WIDTH = 0.2       # Fraction of the image kept for the plot when the legend is too wide
+
+# Legend geometry in multiples of the legend font size
+LEGEND_BORDER_PAD = 0.4
+LEGEND_HANDLE_LENGTH = 2.0
+LEGEND_HANDLE_PAD = 0.8
+LEGEND_LABEL_SPACING = 0.5
+LEGEND_ANCHOR = 1.02       # Left edge of the legend, in axes widths
+LEGEND_FRAME_ALPHA = 0.8
+LEGEND_SHADOW_OFFSET = 2   # Points
+
+
+def find_font():
+    """
+    Path of DejaVu Sans, the font matplotlib uses, from matplotlib's own
+    data directory if it is installed (without importing it), else by name
+    """
+    spec = importlib.util.find_spec('matplotlib')
+    if spec and spec.submodule_search_locations:
+        path = os.path.join(spec.submodule_search_locations[0],
+                            'mpl-data', 'fonts', 'ttf', 'DejaVuSans.ttf')
+        if os.path.exists(path):
+            return path
+    return 'DejaVuSans.ttf'
+
+
+def rgba(color, alpha=1.0):
+    """Hex or matplotlib grayscale ('0.8') color as an RGBA tuple"""
+    if color.startswith('#'):
+        rgb = tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+    elif color == 'black':
+        rgb = (0, 0, 0)
+    elif color == 'white':
+        rgb = (255, 255, 255)
+    else:
+        level = round(float(color) * 255)
+        rgb = (level, level, level)
+    return rgb + (round(alpha * 255),)
+
+
+def blend(color, background, alpha):
+    """Opaque color of color drawn with alpha over background"""
+    return tuple(round(c * alpha + b * (1 - alpha)) for c, b in zip(color[:3], background[:3])) + (255,)
+
+
+def nice_ticks(low, high):
+    """Round tick values covering low..high, and the decimals to show"""
+    raw = (high - low) / 8
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw)
+    first = math.ceil(low / step - 1e-9)
+    last = math.floor(high / step + 1e-9)
+    decimals = max(0, -math.floor(math.log10(step) + 1e-9))
+    if step * 10 ** decimals % 1:
+        decimals += 1  # e.g. 2.5 or 0.25
+    return [i * step for i in range(first, last + 1)], decimals
+
+
+def step_vertices(x, y):
+    """Vertices of a step line with steps halfway between points (where='mid')"""
+    mids = (x[:-1] + x[1:]) / 2
+    xs = np.empty(2 * len(x))
+    ys = np.empty(2 * len(x))
+    xs[0], xs[-1] = x[0], x[-1]
+    xs[1:-1:2] = mids
+    xs[2:-1:2] = mids
+    ys[0::2] = y
+    ys[1::2] = y
+    return xs, ys
+
+
+def finite_runs(xs, ys):
+    """Split a line at NaN values into runs of (x, y) points"""
+    finite = np.isfinite(ys)
+    runs = []
+    start = None
+    for i, ok in enumerate(finite.tolist() + [False]):
+        if ok and start is None:
+            start = i
+        elif not ok and start is not None:
+            runs.append(list(zip(xs[start:i].tolist(), ys[start:i].tolist())))
+            start = None
+    return runs
+
+
+class PillowRenderer:
+    """Renders habit series to an RGBA image of the given size"""
+
+    name = 'pillow'
+
+    def __init__(self, width, height, dpi, padding_percent):
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self.padding_percent = padding_percent
+        font_path = find_font()
+        self.fonts = {}
+        for size in {TITLE_SIZE, LABEL_SIZE, TICK_SIZE, LEGEND_SIZE}:
+            try:
+                self.fonts[size] = ImageFont.truetype(font_path, round(self.px(size)))
+            except OSError:
+                self.fonts[size] = ImageFont.load_default()
+
+    def px(self, points):
+        return points * self.dpi / 72
+
+    def text_size(self, text, size):
+        """
+        Width of the glyphs and height of the font, which is how matplotlib
+        measures text, so labels take up the same room in both renderers
+        """
+        left, _, right, _ = self.fonts[size].getbbox(text)
+        return right - left, self.px(size)
+
+    def descent(self, size):
+        return self.fonts[size].getmetrics()[1]
+
+    def render(self, series):
+        # Draw on an RGB image: only then does ImageDraw blend translucent
+        # colors with what is underneath instead of replacing it
+        img = Image.new('RGB', (self.width, self.height), rgba(theme.BACKGROUND)[:3])
+        draw = ImageDraw.Draw(img, 'RGBA')
+
+        lines, legend_entries = self._prepare(series)
+
+        # X range: every day from the earliest log to today. plot_utils asks
+        # for half a day of room on each side, but subtracting it from a date
+        # is a no-op, so the axis ends exactly on those days
+        end = date.today()
+        start = min([habit.start_date for habit in series if habit.start_date] + [end])
+        x_min = (start - EPOCH).days
+        x_max = max((end - EPOCH).days, x_min + 1)
+        unit, interval, fmt = tick_spec((end - start).days + 1)
+        x_ticks = [((day - EPOCH).days, day.strftime(fmt))
+                   for day in tick_dates(start, end, unit, interval)]
+
+        y_low, y_high = self._y_range(lines)
+        y_ticks, decimals = nice_ticks(y_low, y_high)
+        y_ticks = [(y, f'{y:.{decimals}f}') for y in y_ticks]
+
+        box = self._layout(x_ticks, y_ticks, legend_entries)
+        left, top, right, bottom = box
+
+        def to_x(x):
+            return left + (np.asarray(x, dtype=np.float64) - x_min) / (x_max - x_min) * (right - left)
+
+        def to_y(y):
+            return bottom - (np.asarray(y, dtype=np.float64) - y_low) / (y_high - y_low) * (bottom - top)
+
+        self._draw_grid(draw, box, to_x([x for x, _ in x_ticks]), to_y([y for y, _ in y_ticks]))
+        # Each habit's line, then its target, in the order matplotlib draws them
+        for xs, ys, color, step, marker, target in lines:
+            self._draw_line(img, draw, box, to_x(xs), to_y(ys), color, step, marker)
+            if target is not None and top <= float(to_y(target)) <= bottom:
+                self._draw_dashed(draw, left, right, float(to_y(target)),
+                                  rgba(color, theme.TARGET_ALPHA), self.px(theme.TARGET_WIDTH))
+        self._draw_axes(img, draw, box, x_ticks, to_x([x for x, _ in x_ticks]),
+                        y_ticks, to_y([y for y, _ in y_ticks]))
+        self._draw_legend(img, draw, box, legend_entries)
+        return img.convert('RGBA')
+
+    def _prepare(self, series):
+        """Per-habit points, target lines and legend entries, like create_habit_progress_plot"""
+        max_points = int(self.width / self.px(theme.LINE_WIDTH))
+        marker_pixels = self.px(theme.MARKER_SIZE)
+        lines = []
+        legend_entries = []
+        end = date.today()
+        for i, habit in enumerate(series):
+            if habit.start_date is None:
+                continue
+            color = theme.habit_color(i)
+            days, values = habit.densify(end=end)
+            if len(days) == 0:
+                continue  # Every log is after today
+            days, values = downsample_minmax(days, values, max_points)
+            marker = self.width / len(days) >= theme.MARKER_SPACING * marker_pixels
+            step = habit.habit_type == 'boolean'
+            target = None
+            if habit.target_value:
+                offset = i * theme.TARGET_OFFSET if step else 0
+                target = habit.target_value + offset
+            lines.append((days.astype(np.int64), values, color, step, marker, target))
+            legend_entries.append((habit.legend_label(), color, False, marker))
+            if target is not None:
+                legend_entries.append((f'{habit.name} (Target)', color, True, False))
+        return lines, legend_entries
+
+    def _y_range(self, lines):
+        """
+        Y axis limits as matplotlib autoscales them: all values plus a margin.
+        axhline only widens the range for a target outside the limits at the
+        time it is added, so a target can end up in the margin.
+        """
+        def with_margin(low, high):
+            if low == high:
+                low, high = low - 0.5, high + 0.5
+            margin = (high - low) * Y_MARGIN
+            return low - margin, high + margin
+
+        low, high = math.inf, -math.inf
+        for _, ys, *_, target in lines:
+            finite = ys[np.isfinite(ys)]
+            if len(finite):
+                low, high = min(low, finite.min()), max(high, finite.max())
+            if target is not None:
+                bounds = with_margin(low, high) if low <= high else (0, 1)
+                if not bounds[0] <= target <= bounds[1]:
+                    low, high = min(low, target), max(high, target)
+        if low > high:
+            return 0, 1
+        return with_margin(float(low), float(high))
+
+    def _layout(self, x_ticks, y_ticks, legend_entries):
+        """Plot area (left, top, right, bottom) that fits labels and legend in the safe area"""
+        pad = self.px(LAYOUT_PAD)
+        safe_left = 0.02 * self.width + pad
+        safe_right = 0.92 * self.width - pad
+        safe_top = self.padding_percent * self.height + pad
+        safe_bottom = (1 - self.padding_percent) * self.height - pad
+
+        tick_space = self.px(TICK_LENGTH + TICK_PAD)
+        y_label_width = max((self.text_size(label, TICK_SIZE)[0] for _, label in y_ticks), default=0)
+        left = (safe_left + self.text_size('Value', LABEL_SIZE)[1] + self.px(LABEL_PAD)
+                + y_label_width + tick_space)
+
+        # Rotated date labels hang below the axis
+        angle = math.radians(X_LABEL_ROTATION)
+        x_label_height = max((w * math.sin(angle) + h * math.cos(angle)
+                              for w, h in (self.text_size(label, TICK_SIZE) for _, label in x_ticks)),
+                             default=0)
+        bottom = (safe_bottom - self.text_size('Date', LABEL_SIZE)[1] - self.px(LABEL_PAD)
+                  - x_label_height - tick_space)
+        # The title's baseline sits TITLE_PAD above the plot, its descent inside the pad
+        top = (safe_top + self.text_size('Habit Progress', TITLE_SIZE)[1] - self.descent(TITLE_SIZE)
+               + self.px(TITLE_PAD))
+
+        # The legend starts just right of the plot and must end inside the safe area
+        legend_width = self._legend_size(legend_entries)[0]
+        right = (safe_right - legend_width + (LEGEND_ANCHOR - 1) * left) / LEGEND_ANCHOR
+        # A legend too wide to fit runs off the edge instead, as it does when
+        # tight_layout gives up in matplotlib, rather than leaving no plot
+        right = max(right, left + MIN_PLOT_WIDTH * self.width)
+        return left, top, right, bottom
+
+    def _draw_grid(self, draw, box, x_pixels, y_pixels):
+        left, top, right, bottom = box
+        color = rgba(theme.TEXT, GRID_ALPHA)
+        width = max(1, round(self.px(GRID_WIDTH)))
+        for x in x_pixels.tolist():
+            draw.line([(x, top), (x, bottom)], fill=color, width=width)
+        for y in y_pixels.tolist():
+            draw.line([(left, y), (right, y)], fill=color, width=width)
+
+    def _draw_line(self, img, draw, box, xs, ys, color, step, marker):
+        left, top, right, bottom = box
+        width = max(1, round(self.px(theme.LINE_WIDTH)))
+        line_xs, line_ys = step_vertices(xs, ys) if step else (xs, ys)
+
+        # Draw the whole line into a mask first, so overlapping segments
+        # do not add up their transparency, and clip it to the plot area
+        mask = Image.new('L', (math.ceil(right - left), math.ceil(bottom - top)), 0)
+        mask_draw = ImageDraw.Draw(mask)
+        for run in finite_runs(line_xs - round(left), line_ys - round(top)):
+            if len(run) > 1:
+                mask_draw.line(run, fill=round(theme.LINE_ALPHA * 255), width=width, joint='curve')
+        self._paste_mask(img, mask, rgba(color), (left, top))
+
+        if marker:
+            radius = self.px(theme.MARKER_SIZE) / 2
+            fill = blend(rgba(theme.BACKGROUND), rgba(color), theme.LINE_ALPHA)
+            outline = rgba(color, theme.LINE_ALPHA)
+            edge = max(1, round(self.px(MARKER_EDGE_WIDTH)))
+            for x, y in zip(xs.tolist(), ys.tolist()):
+                if math.isfinite(y):
+                    draw.ellipse([x - radius, y - radius, x + radius, y + radius],
+                                 fill=fill, outline=outline, width=edge)
+
+    def _draw_dashed(self, draw, x_start, x_end, y, color, line_width):
+        dash, gap = (length * line_width for length in DASH)
+        width = max(1, round(line_width))
+        x = x_start
+        while x < x_end:
+            draw.line([(x, y), (min(x + dash, x_end), y)], fill=color, width=width)
+            x += dash + gap
+
+    def _draw_axes(self, img, draw, box, x_ticks, x_pixels, y_ticks, y_pixels):
+        left, top, right, bottom = box
+        text = rgba(theme.TEXT)
+        tick_length = self.px(TICK_LENGTH)
+        tick_width = max(1, round(self.px(TICK_WIDTH)))
+        label_offset = tick_length + self.px(TICK_PAD)
+
+        # Spines
+        draw.rectangle([left, top, right, bottom], outline=rgba(theme.BORDER),
+                       width=max(1, round(self.px(SPINE_WIDTH))))
+
+        # Y ticks, labels right-aligned against the ticks
+        for (_, label), y in zip(y_ticks, y_pixels.tolist()):
+            draw.line([(left - tick_length, y), (left, y)], fill=text, width=tick_width)
+            draw.text((left - label_offset, y), label, font=self.fonts[TICK_SIZE], fill=text, anchor='rm')
+
+        # X ticks, labels rotated with their right end under the tick
+        label_bottom = bottom
+        for (_, label), x in zip(x_ticks, x_pixels.tolist()):
+            draw.line([(x, bottom), (x, bottom + tick_length)], fill=text, width=tick_width)
+            rotated = self._rotated_text(label, TICK_SIZE, X_LABEL_ROTATION)
+            self._paste_mask(img, rotated, text, (x - rotated.width, bottom + label_offset))
+            label_bottom = max(label_bottom, bottom + label_offset + rotated.height)
+
+        # Axis labels and title
+        center = (left + right) / 2
+        draw.text((center, label_bottom + self.px(LABEL_PAD)), 'Date',
+                  font=self.fonts[LABEL_SIZE], fill=text, anchor='mt')
+        y_label = self._rotated_text('Value', LABEL_SIZE, 90)
+        y_label_right = left - label_offset - max(
+            (self.text_size(label, TICK_SIZE)[0] for _, label in y_ticks), default=0) - self.px(LABEL_PAD)
+        self._paste_mask(img, y_label, text, (y_label_right - y_label.width,
+                                              (top + bottom - y_label.height) / 2))
+        draw.text((center, top - self.px(TITLE_PAD)), 'Habit Progress',
+                  font=self.fonts[TITLE_SIZE], fill=text, anchor='ms')
+
+    def _paste_mask(self, img, mask, color, position):
+        """Fill color through mask with its top left corner at position"""
+        # Pasting a solid image is faster than pasting a bare color
+        solid = Image.new(img.mode, mask.size, color[:3])
+        img.paste(solid, (round(position[0]), round(position[1])), mask)
+
+    def _rotated_text(self, text, size, degrees):
+        """Text as an 'L' mask of text_size() rotated counterclockwise by degrees"""
+        font = self.fonts[size]
+        width, height = self.text_size(text, size)
+        mask = Image.new('L', (width, round(height)), 0)
+        ImageDraw.Draw(mask).text((-font.getbbox(text)[0], round(height) - self.descent(size)),
+                                  text, font=font, fill=255, anchor='ls')
+        return mask.rotate(degrees, resample=Image.Resampling.BICUBIC, expand=True)
+
+    def _legend_size(self, entries):
+        em = self.px(LEGEND_SIZE)
+        text_width = max((self.text_size(label, LEGEND_SIZE)[0] for label, *_ in entries), default=0)
+        width = em * (2 * LEGEND_BORDER_PAD + LEGEND_HANDLE_LENGTH + LEGEND_HANDLE_PAD) + text_width
+        height = em * (2 * LEGEND_BORDER_PAD + len(entries)
+                       + max(0, len(entries) - 1) * LEGEND_LABEL_SPACING)
+        return width, height
+
+    def _draw_legend(self, img, draw, box, entries):
+        if not entries:
+            return
+        left, top, right, bottom = box
+        em = self.px(LEGEND_SIZE)
+        width, height = self._legend_size(entries)
+        x = right + (LEGEND_ANCHOR - 1) * (right - left)
+        y = (top + bottom - height) / 2
+        radius = round(em * LEGEND_BORDER_PAD)
+        background = rgba(theme.BACKGROUND)
+
+        # Drop shadow, then the rounded frame
+        shadow = self.px(LEGEND_SHADOW_OFFSET)
+        draw.rounded_rectangle([x + shadow, y + shadow, x + width + shadow, y + height + shadow],
+                               radius=radius, fill=(0, 0, 0, 128))
+        draw.rounded_rectangle([x, y, x + width, y + height], radius=radius,
+                               fill=blend(rgba(theme.LEGEND_FACE), background, LEGEND_FRAME_ALPHA),
+                               outline=blend(rgba(theme.LEGEND_EDGE), background, LEGEND_FRAME_ALPHA),
+                               width=max(1, round(self.px(1.0))))
+
+        handle_start = x + em * LEGEND_BORDER_PAD
+        handle_end = handle_start + em * LEGEND_HANDLE_LENGTH
+        text_x = handle_end + em * LEGEND_HANDLE_PAD
+        row_y = y + em * LEGEND_BORDER_PAD + em / 2
+        for label, color, dashed, marker in entries:
+            if dashed:
+                self._draw_dashed(draw, handle_start, handle_end, row_y,
+                                  rgba(color, theme.TARGET_ALPHA), self.px(theme.TARGET_WIDTH))
+            else:
+                draw.line([(handle_start, row_y), (handle_end, row_y)],
+                          fill=rgba(color, theme.LINE_ALPHA),
+                          width=max(1, round(self.px(theme.LINE_WIDTH))))
+                if marker:
+                    r = self.px(theme.MARKER_SIZE) / 2
+                    center = (handle_start + handle_end) / 2
+                    draw.ellipse([center - r, row_y - r, center + r, row_y + r],
+                                 fill=blend(background, rgba(color), theme.LINE_ALPHA),
+                                 outline=rgba(color, theme.LINE_ALPHA),
+                                 width=max(1, round(self.px(MARKER_EDGE_WIDTH))))
+            draw.text((text_x, row_y), label, font=self.fonts[LEGEND_SIZE],
+                      fill=rgba(theme.LEGEND_TEXT), anchor='lm')
+            row_y += em * (1 + LEGEND_LABEL_SPACING)
@@ -0,0 +1,41 @@
+import contextlib
+import fcntl
+import os
+import tempfile
+
+
+def atomic_write(path, data, fsync=False):
+    """
+    Replace the file at path with data (bytes or str) through a uniquely
+    named temp file in the same directory, so a crash or a concurrent writer
+    in another process never leaves a torn file. With fsync the data is on
+    disk before the rename.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb' if isinstance(data, bytes) else 'w') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """
+    Hold an exclusive flock on the file at path, created if missing, so
+    processes and threads updating the same files take turns
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # Releases the lock
@@ -1,6 +1,6 @@
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QPushButton, QLabel, QComboBox, 
-                            QLineEdit, QTableWidget, QTableWidgetItem, 
+                            QLineEdit, QTableView, QAbstractItemView, 
                             QMessageBox, QInputDialog, QTabWidget, QCheckBox,
                             QScrollArea, QFrame)
 from PyQt6.QtCore import Qt, QTimer
@@ -10,24 +10,60 @@ import sys
 from habit_tracker import HabitTracker
 from wallpaper_generator import WallpaperGenerator
 import sqlite3
-import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import matplotlib.dates as mdates
 from matplotlib.figure import Figure
-from plot_utils import create_habit_progress_plot
+from plot_utils import create_habit_progress_plot, habit_line_gid, max_line_points
+from layout_cache import LayoutCache
+import theme
+from habit_repository import HabitRepository
+from habit_stats import HabitStatsTable
+from config import HABIT_MATRIX
 from cron_manager import CronManager
+from habit_table_model import HabitTableModel, HabitValueDelegate
+from edit_stats import EditStats
+from write_behind import WriteBehindQueue
+from densify import to_days
+from downsample import downsample_minmax
+from render_worker import LatestOnlyRenderer
 
 class HabitTrackerGUI(QMainWindow):
     def __init__(self):
         super().__init__()
         self.habit_tracker = HabitTracker()
-        self.wallpaper_generator = WallpaperGenerator(self.habit_tracker)
+        self.repository = HabitRepository(self.habit_tracker.conn, use_matrix=HABIT_MATRIX)
         self.cron_manager = CronManager()
         
         # Initialize checkbox_layout
         self.checkbox_layout = None
         self.progress_layout = None
         
+        # Combined plot currently shown, patched in place on edits
+        self.progress_canvas = None
+        self.edit_stats = EditStats()
+        
+        # Plots and wallpapers are rendered on worker threads with their own
+        # database connection; only the latest request's result is shown
+        self.progress_renderer = LatestOnlyRenderer(self)
+        self.stats_renderer = LatestOnlyRenderer(self)
+        self.wallpaper_renderer = LatestOnlyRenderer(self)
+        
+        # Log edits are buffered and written in one transaction shortly
+        # after the first unsaved edit, or when the window closes
+        self.write_queue = WriteBehindQueue(self.habit_tracker)
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(500)
+        self.flush_timer.timeout.connect(self.flush_pending_edits)
+        
+        # Writes from other processes (the CLI, imports) are picked up from
+        # the change journal, reloading only the habits they touched
+        self.change_token = self.habit_tracker.change_token()
+        self.change_timer = QTimer(self)
+        self.change_timer.setInterval(2000)
+        self.change_timer.timeout.connect(self.apply_external_changes)
+        self.change_timer.start()
+        
         self.init_ui()
         
     def init_ui(self):
@@ -61,14 +97,14 @@ class HabitTrackerGUI(QMainWindow):
         add_button = QPushButton('Add Habit')
         add_button.clicked.connect(self.add_habit)
         
-        update_button = QPushButton('Update Wallpaper')
-        update_button.clicked.connect(self.update_wallpaper)
+        self.update_wallpaper_button = QPushButton('Update Wallpaper')
+        self.update_wallpaper_button.clicked.connect(self.update_wallpaper)
         
         delete_button = QPushButton('Delete Selected Habit')
         delete_button.clicked.connect(self.delete_habit)
         
         button_layout.addWidget(add_button)
-        button_layout.addWidget(update_button)
+        button_layout.addWidget(self.update_wallpaper_button)
         button_layout.addWidget(delete_button)
         
         layout.addLayout(button_layout)
@@ -80,7 +116,7 @@ class HabitTrackerGUI(QMainWindow):
         self.update_cron_status()
         
         frequency_combo = QComboBox()
-        frequency_combo.addItems(['1 minute', '1 hour', '12 hours', '24 hours'])
+        frequency_combo.addItems(['1 minute', '1 hour', '12 hours', '24 hours', 'Live (daemon)'])
         
         set_cron_button = QPushButton('Set Auto-Update')
         set_cron_button.clicked.connect(lambda: self.set_cron_frequency(frequency_combo.currentText()))
@@ -95,28 +131,36 @@ class HabitTrackerGUI(QMainWindow):
         
         layout.addLayout(cron_layout)
         
-        # Create table for habits
-        self.table = QTableWidget()
-        # Name, Type, Target, Default Value, and 7 days
-        self.table.setColumnCount(11)  # Increased by 1 for Default Value
-        
-        # Set headers
-        headers = ['Name', 'Type', 'Target', 'Default']  # Added Default
-        today = date.today()
-        for i in range(7):
-            day = today - timedelta(days=6-i)
-            headers.append(day.strftime('%Y-%m-%d'))
-        
-        self.table.setHorizontalHeaderLabels(headers)
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        # Create table for habits: Name, Type, Target, Default Value and 7 days.
+        # Rows are loaded on demand and editors are created only while editing.
+        self.table_model = HabitTableModel(self.habit_tracker, stats=self.edit_stats,
+                                           write_queue=self.write_queue)
+        self.table_model.habitChanged.connect(self.on_habit_value_changed)
+        self.table_model.invalidInput.connect(
+            lambda message: QMessageBox.warning(self, 'Invalid Input', message))
+        self.table_model.errorOccurred.connect(
+            lambda message: QMessageBox.critical(self, 'Error', message))
+        
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        self.table.setItemDelegate(HabitValueDelegate(self.table))
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.DoubleClicked |
+                                   QAbstractItemView.EditTrigger.SelectedClicked |
+                                   QAbstractItemView.EditTrigger.EditKeyPressed)
         layout.addWidget(self.table)
         
         # Add label for instructions
-        instructions = QLabel("Select a habit from the table to delete it. Use dropdowns to log boolean habits.")
+        instructions = QLabel("Select a habit from the table to delete it. Double-click a day or default value to edit it.")
         instructions.setStyleSheet("color: gray;")
         layout.addWidget(instructions)
         
+        # Pending edits and how long the last save took
+        self.save_status_label = QLabel("All changes saved")
+        self.save_status_label.setStyleSheet("color: gray;")
+        layout.addWidget(self.save_status_label)
+        
         tab.setLayout(layout)
         self.refresh_table()
         return tab
@@ -151,6 +195,11 @@ class HabitTrackerGUI(QMainWindow):
         scroll.setMaximumHeight(100)  # Limit height of checkbox area
         layout.addWidget(scroll)
         
+        # Streaks, completion rates and averages of the selected habits
+        self.stats_label = QLabel()
+        self.stats_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        layout.addWidget(self.stats_label)
+        
         # Create progress view area
         self.progress_view = QWidget()
         self.progress_layout = QVBoxLayout()
@@ -164,35 +213,34 @@ class HabitTrackerGUI(QMainWindow):
         
         tab.setLayout(layout)
         self.refresh_habit_checkboxes()
-        self.refresh_progress_view()
         return tab
     
     def select_all_habits(self):
-        # Temporarily disconnect all checkbox signals
-        for i in range(self.checkbox_layout.count()):
-            checkbox = self.checkbox_layout.itemAt(i).widget()
-            checkbox.stateChanged.disconnect()
-            checkbox.setChecked(True)
-            checkbox.stateChanged.connect(self.refresh_progress_view)
-        
-        # Refresh progress view once after all changes
-        self.refresh_progress_view()
+        self.set_all_habits_checked(True)
 
     def deselect_all_habits(self):
-        # Temporarily disconnect all checkbox signals
+        self.set_all_habits_checked(False)
+
+    def set_all_habits_checked(self, checked):
+        # Block checkbox signals rather than reconnecting them, so
+        # connections stay stable
         for i in range(self.checkbox_layout.count()):
             checkbox = self.checkbox_layout.itemAt(i).widget()
-            checkbox.stateChanged.disconnect()
-            checkbox.setChecked(False)
-            checkbox.stateChanged.connect(self.refresh_progress_view)
+            checkbox.blockSignals(True)
+            checkbox.setChecked(checked)
+            checkbox.blockSignals(False)
         
         # Refresh progress view once after all changes
         self.refresh_progress_view()
 
     def refresh_habit_checkboxes(self):
-        # Clear existing checkboxes
+        # Clear existing checkboxes, remembering which were unchecked
+        unchecked = set()
         for i in reversed(range(self.checkbox_layout.count())):
-            self.checkbox_layout.itemAt(i).widget().setParent(None)
+            checkbox = self.checkbox_layout.itemAt(i).widget()
+            if not checkbox.isChecked():
+                unchecked.add(checkbox.objectName())
+            checkbox.setParent(None)
         
         # Add checkboxes for each habit
         self.habit_tracker.cursor.execute("SELECT id, name FROM habits ORDER BY name")
@@ -201,53 +249,28 @@ class HabitTrackerGUI(QMainWindow):
         for habit_id, name in habits:
             checkbox = QCheckBox(name)
             checkbox.setObjectName(str(habit_id))
+            checkbox.setChecked(str(habit_id) not in unchecked)  # New habits start checked
+            # Connect after checking, so creating N boxes does not redraw N times
             checkbox.stateChanged.connect(self.refresh_progress_view)
-            checkbox.setChecked(True)  # Set checked by default
             self.checkbox_layout.addWidget(checkbox)
         
-        # Force a refresh of the progress view after all checkboxes are created
-        if habits:  # Only refresh if there are habits
-            self.refresh_progress_view()
+        # Refresh the progress view once after all checkboxes are created
+        self.refresh_progress_view()
 
     def create_habit_plot(self, habit_id, habit_name, habit_type, target_value):
         # Create figure
         fig = Figure(figsize=(8, 3))
         ax = fig.add_subplot(111)
         
-        # Get habit's default value
-        self.habit_tracker.cursor.execute("""
-            SELECT default_value FROM habits WHERE id = ?
-        """, (habit_id,))
-        default_value = self.habit_tracker.cursor.fetchone()[0]
-        
-        # Get all logs for this habit
-        self.habit_tracker.cursor.execute("""
-            SELECT DISTINCT date, value 
-            FROM habit_logs 
-            WHERE habit_id = ?
-            GROUP BY date
-            ORDER BY date
-        """, (habit_id,))
-        logs = dict(self.habit_tracker.cursor.fetchall())
-        
-        if not logs:
-            # If no logs exist, start from today
-            start_date = date.today()
-        else:
-            # Start from the earliest log
-            start_date = datetime.strptime(min(logs.keys()), '%Y-%m-%d').date()
-        
-        end_date = date.today()
-        dates = []
-        values = []
+        series = self.repository.load_series([habit_id])
+        if not series:
+            return None
+        habit = series[0]
         
-        # Generate data points for each day from start to today
-        current = start_date
-        while current <= end_date:
-            dates.append(current)
-            current_str = current.strftime('%Y-%m-%d')
-            values.append(logs.get(current_str, default_value))  # Use default value if no log exists
-            current += timedelta(days=1)
+        # One data point per day from the earliest log (or today if there
+        # are no logs) to today, using the default value for missing days
+        dates, values = habit.densify(start=habit.start_date or date.today(),
+                                      end=date.today())
         
         # Plot data
         if habit_type == 'boolean':
@@ -275,267 +298,238 @@ class HabitTrackerGUI(QMainWindow):
         canvas = FigureCanvas(fig)
         return canvas
 
-    def create_combined_plot(self, selected_habits):
-        fig, ax = create_habit_progress_plot(self.habit_tracker, selected_habits)
+    # Layouts of recent progress plots; only used from the render worker
+    layout_cache = LayoutCache()
+    # Size the combined plot is built at, which also sets how far long
+    # histories are downsampled; the canvas may be resized later
+    PROGRESS_FIGSIZE = (12, 6)
+
+    @classmethod
+    def create_combined_figure(cls, repository, selected_habits, is_cancelled=lambda: False):
+        # Runs on a render worker, so it must not touch any widgets
+        series = repository.load_series(selected_habits)
+        if is_cancelled():
+            return None
+        fig, ax = create_habit_progress_plot(series, figsize=cls.PROGRESS_FIGSIZE, layout=False)
         
         # Add GUI-specific adjustments with reduced right margin
-        ax.legend(bbox_to_anchor=(1.02, 1),
-                 loc='upper left',
-                 borderaxespad=0,
-                 frameon=True,
-                 fancybox=True,
-                 shadow=True)
+        theme.legend(ax,
+                     bbox_to_anchor=(1.02, 1),
+                     loc='upper left',
+                     borderaxespad=0,
+                     frameon=True,
+                     fancybox=True,
+                     shadow=True)
         
         # Reduce right margin from 0.85 to 0.92
-        fig.tight_layout(rect=[0, 0, 0.92, 1])
+        cls.layout_cache.apply(fig, ax, [0, 0, 0.92, 1])
         
-        return FigureCanvas(fig)
+        return fig
 
-    def refresh_progress_view(self):
-        # Clear existing progress views
-        for i in reversed(range(self.progress_layout.count())):
-            item = self.progress_layout.itemAt(i)
-            if item and item.widget():
-                item.widget().setParent(None)
-            else:
-                self.progress_layout.removeItem(item)
-        
-        # Get selected habits
+    def selected_habit_ids(self):
         selected_habits = []
         for i in range(self.checkbox_layout.count()):
             checkbox = self.checkbox_layout.itemAt(i).widget()
             if checkbox.isChecked():
                 selected_habits.append(int(checkbox.objectName()))
+        return selected_habits
+
+    def refresh_progress_view(self):
+        self.edit_stats.count('refresh_progress_view')
+        
+        # The worker reads the plot from the database, so save buffered edits first
+        self.flush_pending_edits()
+        
+        # Get selected habits
+        selected_habits = self.selected_habit_ids()
+        
+        self.refresh_stats_label()
         
         if not selected_habits:
+            self.progress_renderer.cancel()
             no_selection_label = QLabel("No habits selected")
             no_selection_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.progress_layout.addWidget(no_selection_label)
+            self.show_progress_widget(no_selection_label)
             return
         
-        # Create and add combined plot
-        plot = self.create_combined_plot(selected_habits)
-        if plot:
-            self.progress_layout.addWidget(plot)
+        # The current plot stays visible until the new one is ready;
+        # a newer selection or edit cancels this render
+        self.progress_renderer.submit(
+            lambda habit_tracker, is_cancelled: self.create_combined_figure(
+                HabitRepository(habit_tracker.conn, use_matrix=HABIT_MATRIX),
+                selected_habits, is_cancelled),
+            self.show_progress_figure,
+            lambda message: QMessageBox.critical(self, 'Error', f'Error drawing progress: {message}'))
+
+    def refresh_stats_label(self):
+        # Recomputing stale stats reads each habit's history, so it runs on a
+        # worker too; the label keeps its text until the new one is ready
+        selected_habits = self.selected_habit_ids()
+        self.stats_renderer.submit(
+            lambda habit_tracker, is_cancelled: self.stats_text(habit_tracker.conn, selected_habits),
+            self.stats_label.setText)
+
+    @staticmethod
+    def stats_text(conn, selected_habits):
+        # Runs on a render worker. Read from the summary table, which only
+        # recomputes habits written since it was last read.
+        repository = HabitRepository(conn, use_matrix=HABIT_MATRIX)
+        series = repository.load_series(selected_habits)
+        HabitStatsTable(conn, repository).attach(series)
+        return '\n'.join(habit.stats.details(habit) for habit in series
+                         if habit.stats is not None)
+    
+    def show_progress_figure(self, fig):
+        if fig is None:
+            return
+        self.show_progress_widget(FigureCanvas(fig))
+
+    def show_progress_widget(self, widget):
+        # Clear existing progress views
+        for i in reversed(range(self.progress_layout.count())):
+            item = self.progress_layout.itemAt(i)
+            if item and item.widget():
+                item.widget().setParent(None)
+            else:
+                self.progress_layout.removeItem(item)
         
+        self.progress_canvas = widget if isinstance(widget, FigureCanvas) else None
+        self.progress_layout.addWidget(widget)
         self.progress_layout.addStretch()
 
+    def patch_progress_plot(self, habit_id):
+        """
+        Update one habit's line in the existing plot instead of rebuilding it.
+        Returns False if the plot needs a full rebuild instead.
+        """
+        if self.progress_canvas is None or self.progress_renderer.busy:
+            return False  # Nothing to patch, or a rebuild is already underway
+        
+        ax = self.progress_canvas.figure.axes[0]
+        line = next((l for l in ax.get_lines() if l.get_gid() == habit_line_gid(habit_id)), None)
+        if line is None:
+            return False  # Habit was not plotted yet, e.g. its first log
+        
+        series = self.repository.load_series([habit_id])
+        if not series:
+            return False
+        dates, values = series[0].densify(end=date.today())
+        
+        # Overlay edits that are not saved yet
+        pending = self.write_queue.pending_for(habit_id)
+        if pending:
+            offsets = (to_days([log_date for log_date, _ in pending]) - dates[0]).astype(int)
+            if offsets.min() < 0 or offsets.max() >= len(values):
+                return False
+            values = values.copy()  # May be a read-only view of the habit matrix
+            values[offsets] = [value for _, value in pending]
+        
+        # Reduce the series as the plot did; which days are kept can change
+        # with the values, but never the first and the last
+        dates, values = downsample_minmax(dates, values, max_line_points(self.PROGRESS_FIGSIZE[0]))
+        
+        # A new earliest log or a new day changes the x range
+        old_dates = line.get_xdata()
+        if old_dates[0] != dates[0] or old_dates[-1] != dates[-1]:
+            return False
+        
+        line.set_data(dates, values)
+        ax.relim()
+        ax.autoscale_view()
+        self.progress_canvas.draw_idle()
+        return True
+
+    def flush_pending_edits(self):
+        self.flush_timer.stop()
+        if not len(self.write_queue):
+            return True
+        try:
+            self.write_queue.flush()
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, 'Error', f'Error saving habit logs: {str(e)}')
+            self.update_save_status()
+            return False
+        self.update_save_status()
+        return True
+
+    def update_save_status(self):
+        pending = len(self.write_queue)
+        if pending:
+            self.save_status_label.setText(f"{pending} unsaved edit{'s' if pending != 1 else ''}...")
+            self.save_status_label.setStyleSheet("color: orange;")
+        elif self.write_queue.last_flush_seconds is not None:
+            self.save_status_label.setText(
+                f"All changes saved ({self.write_queue.last_flush_count} in "
+                f"{self.write_queue.last_flush_seconds * 1000:.1f} ms)")
+            self.save_status_label.setStyleSheet("color: gray;")
+
+    def closeEvent(self, event):
+        # Save buffered edits before the window goes away
+        self.flush_pending_edits()
+        # Drop plots nobody will see, but let a wallpaper render finish
+        self.progress_renderer.cancel()
+        self.stats_renderer.cancel()
+        self.wallpaper_renderer.pool.waitForDone()
+        super().closeEvent(event)
+
     def refresh_table(self):
-        self.table.setRowCount(0)
-        today = date.today()
-        
-        # Get all habits
-        self.habit_tracker.cursor.execute("""
-            SELECT id, name, type, target_value, default_value
-            FROM habits
-            ORDER BY name
-        """)
-        
-        habits = self.habit_tracker.cursor.fetchall()
-        
-        self.table.setRowCount(len(habits))
-        for row, (habit_id, name, habit_type, target, default_value) in enumerate(habits):
-            # Set Name
-            name_item = QTableWidgetItem(name)
-            name_item.setFlags(name_item.flags() & ~Qt.ItemFlag.ItemIsEditable)  # Make name read-only
-            self.table.setItem(row, 0, name_item)
-            
-            # Set Type
-            type_item = QTableWidgetItem(habit_type)
-            type_item.setFlags(type_item.flags() & ~Qt.ItemFlag.ItemIsEditable)  # Make type read-only
-            self.table.setItem(row, 1, type_item)
-            
-            # Set Target - Modified to show 'Yes' for boolean habits
-            if habit_type == 'boolean':
-                target_display = 'Yes'  # Boolean habits always target 'Yes'
-            else:
-                target_display = str(target) if target else ''
-            target_item = QTableWidgetItem(target_display)
-            target_item.setFlags(target_item.flags() & ~Qt.ItemFlag.ItemIsEditable)  # Make target read-only
-            self.table.setItem(row, 2, target_item)
-            
-            # Set Default Value - Show 'Yes'/'No' for boolean habits
-            if habit_type == 'boolean':
-                default_display = 'Yes' if default_value == 1 else 'No'
-                # Create combobox for boolean default
-                default_combo = QComboBox()
-                default_combo.addItems(['Yes', 'No'])
-                default_combo.setCurrentText(default_display)
-                default_combo.setProperty('habit_id', habit_id)
-                default_combo.setProperty('is_default', True)
-                default_combo.currentTextChanged.connect(self.on_default_value_changed)
-                self.table.setCellWidget(row, 3, default_combo)
-            else:
-                default_item = QTableWidgetItem(str(default_value))
-                default_item.setData(Qt.ItemDataRole.UserRole, {
-                    'habit_id': habit_id,
-                    'is_default': True
-                })
-                self.table.setItem(row, 3, default_item)
-            
-            # Get last 7 days of logs
-            for i in range(7):
-                col = i + 4  # offset for Name, Type, Target, and Default columns
-                current_date = today - timedelta(days=6-i)
-                
-                self.habit_tracker.cursor.execute("""
-                    SELECT value FROM habit_logs 
-                    WHERE habit_id = ? AND date = ?
-                """, (habit_id, current_date))
-                
-                log = self.habit_tracker.cursor.fetchone()
-                value = log[0] if log else default_value  # Use default value if no log exists
-                
-                if habit_type == 'boolean':
-                    # Create combobox for boolean habits
-                    combo = QComboBox()
-                    combo.addItems(['Yes', 'No'])
-                    combo.setProperty('habit_id', habit_id)
-                    combo.setProperty('date', current_date.strftime('%Y-%m-%d'))
-                    
-                    combo.setCurrentText('Yes' if value == 1 else 'No')
-                    
-                    combo.currentTextChanged.connect(self.on_boolean_value_changed)
-                    self.table.setCellWidget(row, col, combo)
-                else:
-                    # For numeric habits, create an editable item
-                    value_item = QTableWidgetItem(str(value) if value is not None else str(default_value))
-                    value_item.setData(Qt.ItemDataRole.UserRole, {
-                        'habit_id': habit_id,
-                        'date': current_date.strftime('%Y-%m-%d')
-                    })
-                    self.table.setItem(row, col, value_item)
-        
-        # Connect to item changed signal
-        self.table.itemChanged.connect(self.on_numeric_value_changed)
-        
+        self.flush_pending_edits()
+        self.table_model.refresh()
         self.table.resizeColumnsToContents()
         
         # Only refresh checkboxes if they exist
         if self.checkbox_layout is not None:
             self.refresh_habit_checkboxes()
 
-    def on_boolean_value_changed(self, text):
-        combo = self.sender()
-        habit_id = combo.property('habit_id')
-        date_str = combo.property('date')
-        
-        value = 1 if text == 'Yes' else 0
-        
-        try:
-            # First try to update existing record
-            self.habit_tracker.cursor.execute("""
-                UPDATE habit_logs 
-                SET value = ? 
-                WHERE habit_id = ? AND date = ?
-            """, (value, habit_id, date_str))
-            
-            # If no record was updated (cursor.rowcount == 0), insert new record
-            if self.habit_tracker.cursor.rowcount == 0:
-                self.habit_tracker.cursor.execute("""
-                    INSERT INTO habit_logs (habit_id, value, date)
-                    VALUES (?, ?, ?)
-                """, (habit_id, value, date_str))
-            
-            self.habit_tracker.conn.commit()
-            
-            # Only refresh the progress view
+    def on_habit_value_changed(self, habit_id):
+        # A log or default value was saved; the table cell is already updated,
+        # so only this habit's line in the progress view needs redrawing
+        self.edit_stats.count('on_habit_value_changed')
+        if len(self.write_queue):
+            if not self.flush_timer.isActive():
+                self.flush_timer.start()
+            self.update_save_status()
+        if habit_id in self.selected_habit_ids() and not self.patch_progress_plot(habit_id):
             self.refresh_progress_view()
-            
-        except sqlite3.Error as e:
-            QMessageBox.critical(self, 'Error', f'Error saving habit log: {str(e)}')
-
-    def on_default_value_changed(self, text):
-        sender = self.sender()
-        if not isinstance(sender, QComboBox):
-            return
-            
-        habit_id = sender.property('habit_id')
-        is_default = sender.property('is_default')
-        
-        if not is_default:
-            return
-            
-        value = 1 if text == 'Yes' else 0
         
-        try:
-            self.habit_tracker.cursor.execute("""
-                UPDATE habits 
-                SET default_value = ? 
-                WHERE id = ?
-            """, (value, habit_id))
-            
-            self.habit_tracker.conn.commit()
-            self.refresh_progress_view()
-            
-        except sqlite3.Error as e:
-            QMessageBox.critical(self, 'Error', f'Error updating default value: {str(e)}')
-            self.refresh_table()
+        # Show timings once the model has finished timing this edit
+        QTimer.singleShot(0, lambda: self.statusBar().showMessage(self.edit_stats.summary()))
 
-    def on_numeric_value_changed(self, item):
-        # Disconnect to prevent recursive signals
-        self.table.itemChanged.disconnect(self.on_numeric_value_changed)
-        
-        try:
-            # Get stored data
-            data = item.data(Qt.ItemDataRole.UserRole)
-            if not data:  # Skip if not a value cell
-                return
-            
-            habit_id = data['habit_id']
-            is_default = data.get('is_default', False)
-            
-            # Get and validate the new value
-            try:
-                new_text = item.text().strip()
-                if new_text == '':
-                    value = None
-                else:
-                    value = float(new_text)
-            except ValueError:
-                QMessageBox.warning(self, 'Invalid Input', 
-                                  'Please enter a valid number')
-                # Reset to previous value
-                self.refresh_table()
-                return
-            
-            if is_default:
-                # Update default value in habits table
-                if value is not None:
-                    self.habit_tracker.cursor.execute("""
-                        UPDATE habits 
-                        SET default_value = ? 
-                        WHERE id = ?
-                    """, (value, habit_id))
-            else:
-                # Update log value
-                date_str = data['date']
-                if value is not None:
-                    # First try to update existing record
-                    self.habit_tracker.cursor.execute("""
-                        UPDATE habit_logs 
-                        SET value = ? 
-                        WHERE habit_id = ? AND date = ?
-                    """, (value, habit_id, date_str))
-                    
-                    # If no record was updated, insert new record
-                    if self.habit_tracker.cursor.rowcount == 0:
-                        self.habit_tracker.cursor.execute("""
-                            INSERT INTO habit_logs (habit_id, value, date)
-                            VALUES (?, ?, ?)
-                        """, (habit_id, value, date_str))
-            
-            self.habit_tracker.conn.commit()
-            self.refresh_progress_view()
-            
-        except Exception as e:
-            QMessageBox.critical(self, 'Error', f'Error saving value: {str(e)}')
+    def apply_external_changes(self):
+        """
+        Bring the table and progress view up to date with changes recorded
+        since the last check. Our own writes show up here too; reloading
+        them is cheap, since only the changed rows and lines are redrawn,
+        and habit rows the table already shows are not redrawn at all.
+        """
+        changes = self.habit_tracker.changes_since(self.change_token)
+        self.change_token = changes.token
+        if not changes or changes.token is None:
+            return  # Nothing new, or a database without the journal
+        
+        selected = set(self.selected_habit_ids()) if self.checkbox_layout is not None else set()
+        edited = None if changes.full_reload else self.table_model.reload_habits(changes.habits)
+        if edited is None:
+            # Habits were added, renamed or deleted
             self.refresh_table()
+            if changes.full_reload or changes.habit_ids & selected:
+                self.refresh_progress_view()
+            return
+        if edited & selected:
+            # A target or default changed, which the whole plot depends on
+            self.table_model.reload_logs(changes.logs)
+            self.refresh_progress_view()
+            return
         
-        finally:
-            # Reconnect the signal
-            self.table.itemChanged.connect(self.on_numeric_value_changed)
-
+        self.table_model.reload_logs(changes.logs)
+        for habit_id in changes.logs.keys() & selected:
+            if not self.patch_progress_plot(habit_id):
+                self.refresh_progress_view()
+                break
+        else:
+            if changes.logs.keys() & selected:
+                self.refresh_stats_label()
+    
     def add_habit(self):
         name, ok = QInputDialog.getText(self, 'Add Habit', 'Enter habit name:')
         if ok and name:
@@ -585,7 +579,7 @@ class HabitTrackerGUI(QMainWindow):
                     "INSERT INTO habits (name, type, target_value, default_value) VALUES (?, ?, ?, ?)",
                     (name, habit_type, target_value, default_value)
                 )
-                self.habit_tracker.conn.commit()
+                self.habit_tracker.commit()
                 self.refresh_table()
                 QMessageBox.information(self, 'Success', f'Added habit: {name}')
                 
@@ -593,12 +587,12 @@ class HabitTrackerGUI(QMainWindow):
                 QMessageBox.critical(self, 'Error', f'Error adding habit: {str(e)}')
     
     def delete_habit(self):
-        row = self.table.currentRow()
+        row = self.table.currentIndex().row()
         if row < 0:
             QMessageBox.warning(self, 'Warning', 'Please select a habit to delete')
             return
             
-        habit_name = self.table.item(row, 0).text()
+        habit_name = self.table_model.habit_at(row)[1]
         
         reply = QMessageBox.question(
             self, 'Delete Habit', 
@@ -607,11 +601,13 @@ class HabitTrackerGUI(QMainWindow):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
+            # Save buffered edits first so none are written after the delete
+            self.flush_pending_edits()
             try:
                 self.habit_tracker.cursor.execute(
                     "DELETE FROM habits WHERE name = ?", (habit_name,)
                 )
-                self.habit_tracker.conn.commit()
+                self.habit_tracker.commit()
                 self.refresh_table()
                 QMessageBox.information(self, 'Success', f'Deleted habit: {habit_name}')
                 
@@ -619,16 +615,34 @@ class HabitTrackerGUI(QMainWindow):
                 QMessageBox.critical(self, 'Error', f'Error deleting habit: {str(e)}')
     
     def update_wallpaper(self):
-        try:
-            self.wallpaper_generator.update_wallpaper()
-            # Don't show success message for automatic updates
-            if self.sender() and isinstance(self.sender(), QPushButton):
+        self.flush_pending_edits()
+        # Don't show success message for automatic updates
+        show_message = self.sender() and isinstance(self.sender(), QPushButton)
+        
+        def finished(path):
+            self.update_wallpaper_button.setEnabled(True)
+            if show_message:
                 QMessageBox.information(self, 'Success', 'Wallpaper updated successfully!')
-        except Exception as e:
-            QMessageBox.critical(self, 'Error', f'Error updating wallpaper: {str(e)}')
+        
+        def failed(message):
+            self.update_wallpaper_button.setEnabled(True)
+            QMessageBox.critical(self, 'Error', f'Error updating wallpaper: {message}')
+        
+        self.update_wallpaper_button.setEnabled(False)
+        # Explicit requests always re-render and re-set the wallpaper
+        self.wallpaper_renderer.submit(
+            lambda habit_tracker, is_cancelled: WallpaperGenerator(habit_tracker).update_wallpaper(force=True),
+            finished, failed)
 
     def update_cron_status(self):
-        if self.cron_manager.is_job_active():
+        if self.cron_manager.is_daemon_installed():
+            if self.cron_manager.is_daemon_running():
+                self.cron_status_label.setText("Auto-update: Live")
+                self.cron_status_label.setStyleSheet("color: green;")
+            else:
+                self.cron_status_label.setText("Auto-update: Live (starting)")
+                self.cron_status_label.setStyleSheet("color: orange;")
+        elif self.cron_manager.is_job_active():
             freq = self.cron_manager.get_current_frequency()
             if freq == 1:
                 text = "Auto-update: Every minute"
@@ -645,6 +659,17 @@ class HabitTrackerGUI(QMainWindow):
             self.cron_status_label.setStyleSheet("color: red;")
     
     def set_cron_frequency(self, frequency_text):
+        if frequency_text == 'Live (daemon)':
+            try:
+                self.cron_manager.install_daemon()
+                self.update_cron_status()
+                QMessageBox.information(self, 'Success', 
+                                      'Wallpaper will update live as habits change')
+            except Exception as e:
+                QMessageBox.critical(self, 'Error', 
+                                   f'Failed to start wallpaper daemon: {str(e)}')
+            return
+        
         frequency_map = {
             '1 minute': 1,
             '1 hour': 60,
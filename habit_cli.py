@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Log habits from the command line without prompts.
+
+  habit_cli.py log <name> <value> [--date YYYY-MM-DD]
+  habit_cli.py bulk [file]
+  habit_cli.py check [--rebuild]
+  habit_cli.py stats [name]
+  habit_cli.py history <name> [--by week|month] [--last N]
+
+bulk reads CSV lines of name,value[,date] from the file or stdin and writes
+them all in one transaction. Values are numbers, or yes/no for Yes/No habits.
+Dates default to today; 'yesterday' is also accepted.
+
+check compares the dense snapshot the plots read (habits.db.matrix.npy)
+and the weekly and monthly rollup tables with the logs, and --rebuild
+rewrites them from scratch first.
+
+stats prints streaks, completion rates and averages of every habit, or of
+the named one, from the summary table the wallpaper and GUI also read.
+
+history prints a habit's logged days, completions, total and mean per ISO
+week or month from the rollup tables.
+
+Only the standard library and the database module are imported, so this
+starts quickly enough for shell aliases and scripts.
+"""
+import argparse
+import csv
+import sys
+from datetime import date, timedelta
+from database import connect, migrate, ensure_date_storage, upsert_logs, rebuild_rollups, MIGRATIONS
+from config import HABIT_MATRIX
+
+BOOLEAN_VALUES = {
+    'yes': 1, 'y': 1, 'true': 1, '1': 1,
+    'no': 0, 'n': 0, 'false': 0, '0': 0,
+}
+
+
+class CLIError(Exception):
+    pass
+
+
+def parse_date(text):
+    text = text.strip().lower()
+    if text in ('', 'today'):
+        return date.today()
+    if text == 'yesterday':
+        return date.today() - timedelta(days=1)
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise CLIError(f"Invalid date '{text}', expected YYYY-MM-DD")
+
+
+def parse_value(habit_type, text):
+    text = text.strip().lower()
+    if habit_type == 'boolean':
+        if text not in BOOLEAN_VALUES:
+            raise CLIError(f"Invalid value '{text}' for a Yes/No habit, expected yes or no")
+        return BOOLEAN_VALUES[text]
+    try:
+        return float(text)
+    except ValueError:
+        raise CLIError(f"Invalid value '{text}', expected a number")
+
+
+def positive_int(text):
+    # An argparse type, so a bad --last is reported with the usage line
+    try:
+        number = int(text)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"invalid count '{text}', expected a whole number of at least 1")
+    return number
+
+
+class HabitLookup:
+    """Habit ids and types by name, loaded with a single query"""
+
+    def __init__(self, conn):
+        self.habits = {}
+        for habit_id, name, habit_type in conn.execute("SELECT id, name, type FROM habits"):
+            self.habits.setdefault(name.lower(), []).append((habit_id, habit_type))
+
+    def find(self, name):
+        """(habit_id, type) for a habit name, ignoring case"""
+        matches = self.habits.get(name.strip().lower(), [])
+        if not matches:
+            raise CLIError(f"No habit named '{name}'")
+        if len(matches) > 1:
+            raise CLIError(f"More than one habit is named '{name}'")
+        return matches[0]
+
+
+def open_database():
+    conn = connect()
+    # Cheap check so the CLI also works before the GUI has created the tables
+    if conn.execute("PRAGMA user_version").fetchone()[0] < len(MIGRATIONS):
+        migrate(conn)
+    # Follow the mode recorded in the database, whatever DATE_STORAGE says
+    # here, and repair logs left in both forms
+    ensure_date_storage(conn)
+    return conn
+
+
+def log_command(conn, args):
+    habit_id, habit_type = HabitLookup(conn).find(args.name)
+    log_date = parse_date(args.date)
+    value = parse_value(habit_type, args.value)
+    upsert_logs(conn, [(habit_id, log_date, value)])
+
+    display = ('Yes' if value else 'No') if habit_type == 'boolean' else f'{value:g}'
+    print(f"Logged {args.name}: {display} on {log_date.isoformat()}")
+
+
+def bulk_command(conn, args):
+    habits = HabitLookup(conn)
+    logs = []
+    errors = []
+    for line_number, row in enumerate(csv.reader(args.file), start=1):
+        if not row or not ''.join(row).strip() or row[0].lstrip().startswith('#'):
+            continue  # Blank line or comment
+        try:
+            if len(row) not in (2, 3):
+                raise CLIError("Expected name,value[,date]")
+            habit_id, habit_type = habits.find(row[0])
+            value = parse_value(habit_type, row[1])
+            log_date = parse_date(row[2] if len(row) == 3 else '')
+        except CLIError as e:
+            errors.append(f"line {line_number}: {e}")
+            continue
+        logs.append((habit_id, log_date, value))
+
+    # All or nothing, so a typo does not leave half a file imported
+    if errors:
+        raise CLIError('Nothing was logged:\n  ' + '\n  '.join(errors))
+
+    upsert_logs(conn, logs)
+    print(f"Logged {len(logs)} value{'s' if len(logs) != 1 else ''}")
+
+
+def check_command(conn, args):
+    from habit_matrix import HabitMatrix  # Imports NumPy, so only load it when needed
+    from habit_rollups import check_rollups
+
+    matrix = HabitMatrix.for_database(conn)
+    if matrix is None:
+        raise CLIError("This database has no habit matrix")
+    if args.rebuild:
+        matrix.rebuild()
+        with conn:
+            rebuild_rollups(conn)
+    problems = matrix.check() + check_rollups(conn)
+    if problems:
+        raise CLIError('Habit matrix or rollups do not match the logs:\n  ' + '\n  '.join(problems))
+    print(f"Habit matrix and rollups match the logs of {len(matrix.header['habits'])} habits")
+
+
+def history_command(conn, args):
+    from habit_rollups import load_rollups
+
+    habit_id, habit_type = HabitLookup(conn).find(args.name)
+    periods = load_rollups(conn, habit_id, args.by)[-args.last:]
+    if not periods:
+        print(f"No logs of {args.name}")
+        return
+    print(f"{args.by.capitalize():<9} {'Logged':>6} {'Done':>6} {'Total':>9} {'Mean':>9}")
+    for period in periods:
+        print(f"{period.label(args.by):<9} {period.count:>6} {period.completions:>6} "
+              f"{period.total:>9.4g} {period.mean:>9.3g}")
+
+
+def stats_command(conn, args):
+    # These import NumPy, so only load them when needed
+    from habit_repository import HabitRepository
+    from habit_stats import HabitStatsTable
+
+    repository = HabitRepository(conn, use_matrix=HABIT_MATRIX)
+    if args.name:
+        series = repository.load_series([HabitLookup(conn).find(args.name)[0]])
+    else:
+        series = repository.load_all_series()
+    HabitStatsTable(conn, repository).attach(series)
+    for habit in series:
+        print(habit.stats.details(habit))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    log_parser = subparsers.add_parser('log', help='Log one value')
+    log_parser.add_argument('name', help='Habit name (case-insensitive)')
+    log_parser.add_argument('value', help='Number, or yes/no for Yes/No habits')
+    log_parser.add_argument('--date', default='today', help='YYYY-MM-DD, today or yesterday')
+    log_parser.set_defaults(func=log_command)
+
+    bulk_parser = subparsers.add_parser('bulk', help='Log name,value[,date] lines in one transaction')
+    bulk_parser.add_argument('file', nargs='?', type=argparse.FileType('r'), default=sys.stdin,
+                             help='CSV file to read (default: stdin)')
+    bulk_parser.set_defaults(func=bulk_command)
+
+    check_parser = subparsers.add_parser('check', help='Verify the habit matrix and rollups against the logs')
+    check_parser.add_argument('--rebuild', action='store_true', help='Rebuild them from the logs first')
+    check_parser.set_defaults(func=check_command)
+
+    stats_parser = subparsers.add_parser('stats', help='Show streaks, completion rates and averages')
+    stats_parser.add_argument('name', nargs='?', help='Only this habit (case-insensitive)')
+    stats_parser.set_defaults(func=stats_command)
+
+    history_parser = subparsers.add_parser('history', help='Totals per ISO week or month')
+    history_parser.add_argument('name', help='Habit name (case-insensitive)')
+    history_parser.add_argument('--by', choices=('week', 'month'), default='week')
+    history_parser.add_argument('--last', type=positive_int, default=12, help='Number of periods (default: 12)')
+    history_parser.set_defaults(func=history_command)
+
+    args = parser.parse_args(argv)
+    conn = open_database()
+    try:
+        args.func(conn, args)
+    except CLIError as e:
+        print(f"habit: {e}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
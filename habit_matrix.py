@@ -0,0 +1,313 @@
+import json
+import os
+import tempfile
+from datetime import date
+import numpy as np
+from database import EPOCH, LOG_DAY
+from change_journal import changes_since, current_token
+from densify import densify
+from file_utils import atomic_write, file_lock
+
+EPOCH_DATE64 = np.datetime64(EPOCH, 'D')
+
+
+class HabitMatrix:
+    """
+    Dense daily values of every habit in one memory-mapped .npy file next to
+    the database: a habits x days float64 matrix where each row holds what
+    densify() would return for that habit, from its first log to today, and
+    NaN before it. A small JSON header maps habit ids to rows and records
+    the change journal token the matrix is current as of.
+
+    refresh() brings it up to date by replaying the change journal, touching
+    only the rows and days that changed; readers then slice rows without
+    copying. Spare rows and days are allocated ahead, so the file is only
+    rewritten when a new habit or a new day no longer fits, or the journal
+    cannot say what changed.
+    """
+
+    FORMAT_VERSION = 1
+    SPARE_ROWS = 16
+    SPARE_DAYS = 366
+
+    def __init__(self, conn, path=None):
+        self.conn = conn
+        self.path = path
+        self.header = None
+        self._values = None
+
+    @classmethod
+    def for_database(cls, conn):
+        """
+        Matrix stored next to conn's database file, or None for an in-memory
+        database or one without the change journal to keep it current
+        """
+        db_path = conn.execute("PRAGMA database_list").fetchone()[2]
+        if not db_path or current_token(conn) is None:
+            return None
+        return cls(conn, f'{db_path}.matrix')
+
+    @property
+    def data_path(self):
+        return f'{self.path}.npy'
+
+    @property
+    def header_path(self):
+        return f'{self.path}.json'
+
+    # Reading
+
+    def series(self, habit_id):
+        """
+        (days, values) of one habit as datetime64[D] and float64 arrays,
+        or None if the habit is not in the matrix. values is a read-only
+        view of the memory map, so it also sees later in-place refreshes;
+        copy it to keep the values of this moment.
+        """
+        entry = self.header['habits'].get(str(habit_id))
+        if entry is None:
+            return None
+        row, start = entry['row'], entry['start']
+        if start is None:
+            return np.empty(0, dtype='datetime64[D]'), np.empty(0, dtype=np.float64)
+
+        first_day = self.header['first_day']
+        end_day = self.header['end_day']
+        values = self._values[row, start - first_day:end_day - first_day + 1]
+        days = np.arange(start, end_day + 1).astype('datetime64[D]')
+        return days, values
+
+    # Updating
+
+    def refresh(self):
+        """
+        Apply changes recorded since the matrix was last updated.
+        Returns True if the matrix changed.
+        """
+        with self._lock():
+            self.header = self._load_header()
+            if self.header is None:
+                self._rebuild()
+                return True
+
+            changes = changes_since(self.conn, self.header['token'])
+            today = (date.today() - EPOCH).days
+            if changes.full_reload or today - self.header['first_day'] >= self.header['capacity_days']:
+                self._rebuild()
+                return True
+            if not changes and today == self.header['end_day']:
+                self._open(readonly=True)
+                return False
+
+            self._open(readonly=False)
+            self._extend_to(today)
+            for habit_id in changes.habits:
+                if not self._reload_habit(habit_id):
+                    self._rebuild()
+                    return True
+            for habit_id, (first, last) in changes.logs.items():
+                if habit_id not in changes.habits and not self._update_logs(habit_id, first, last):
+                    self._rebuild()
+                    return True
+
+            self._values.flush()
+            self.header['token'] = changes.token
+            self._save_header()
+            self._open(readonly=True)
+            return True
+
+    def rebuild(self):
+        """Rewrite the matrix from scratch"""
+        with self._lock():
+            self._rebuild()
+
+    def check(self):
+        """
+        Refresh, then compare every row with densify() of the habit's logs
+        in the habit_logs table. Returns a list of problems, empty when they
+        agree, so a mistake in the incremental updates shows up here.
+        """
+        self.refresh()
+        problems = []
+        end = date.today()
+        habits = {habit_id: default for habit_id, default in
+                  self.conn.execute("SELECT id, default_value FROM habits")}
+
+        logs = self._logs_by_habit()
+        for habit_id, default_value in habits.items():
+            stored = self.series(habit_id)
+            if stored is None:
+                problems.append(f"habit {habit_id} is missing")
+                continue
+            log_days, log_values = logs.get(habit_id, ([], []))
+            days, values = densify(log_days, log_values, default_value, end=end)
+            if not (np.array_equal(stored[0], days)
+                    and np.array_equal(stored[1], values, equal_nan=True)):
+                problems.append(f"habit {habit_id} differs from its logs")
+        for habit_id in self.header['habits'].keys() - {str(habit_id) for habit_id in habits}:
+            problems.append(f"habit {habit_id} was deleted but is still in the matrix")
+        return problems
+
+    def _rebuild(self):
+        # Changes made while reading are after this token, so the next
+        # refresh applies them again rather than missing them
+        token = current_token(self.conn)
+        today = (date.today() - EPOCH).days
+        habits = self.conn.execute("SELECT id, default_value FROM habits ORDER BY id").fetchall()
+        logs = self._logs_by_habit()
+        starts = {habit_id: int(min(logs[habit_id][0])) for habit_id, _ in habits if habit_id in logs}
+        first_day = min(list(starts.values()) + [today])
+
+        capacity_days = today - first_day + 1 + self.SPARE_DAYS
+        shape = (len(habits) + self.SPARE_ROWS, capacity_days)
+
+        # Write a new file and swap it in, so readers of the old one are unaffected
+        directory = os.path.dirname(os.path.abspath(self.data_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.npy')
+        os.close(fd)
+        try:
+            values = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float64, shape=shape)
+            values[:] = np.nan
+            entries = {}
+            for row, (habit_id, default_value) in enumerate(habits):
+                start = starts.get(habit_id)
+                entries[str(habit_id)] = {'row': row, 'start': start, 'default': default_value}
+                if start is not None:
+                    log_days, log_values = logs[habit_id]
+                    values[row, start - first_day:today - first_day + 1] = densify(
+                        log_days, log_values, default_value,
+                        start=EPOCH_DATE64 + start, end=date.today())[1]
+            values.flush()
+            del values
+            os.replace(tmp_path, self.data_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        self.header = {
+            'version': self.FORMAT_VERSION,
+            'token': token,
+            'first_day': first_day,
+            'end_day': today,
+            'capacity_days': capacity_days,
+            'habits': entries,
+            'free_rows': list(range(len(habits), shape[0])),
+        }
+        self._save_header()
+        self._open(readonly=True)
+
+    def _extend_to(self, today):
+        """Fill the new days since the last refresh with each habit's default"""
+        end_day = self.header['end_day']
+        if today <= end_day:
+            return
+        first_day = self.header['first_day']
+        for entry in self.header['habits'].values():
+            if entry['start'] is not None:
+                self._values[entry['row'], end_day + 1 - first_day:today + 1 - first_day] = entry['default']
+        self.header['end_day'] = today
+
+    def _reload_habit(self, habit_id):
+        """Rewrite a habit's whole row after the habit was added, edited or deleted"""
+        habits = self.header['habits']
+        row = self.conn.execute("SELECT default_value FROM habits WHERE id = ?", (habit_id,)).fetchone()
+        entry = habits.get(str(habit_id))
+        if row is None:
+            # Deleted: its row becomes free
+            if entry is not None:
+                del habits[str(habit_id)]
+                self.header['free_rows'].append(entry['row'])
+            return True
+
+        if entry is None:
+            if not self.header['free_rows']:
+                return False  # Out of rows
+            entry = {'row': self.header['free_rows'].pop(0), 'start': None}
+            habits[str(habit_id)] = entry
+        entry['default'] = row[0]
+        return self._write_row(habit_id, entry)
+
+    def _update_logs(self, habit_id, first, last):
+        """Rewrite the days from first to last of a habit whose logs changed"""
+        entry = self.header['habits'].get(str(habit_id))
+        if entry is None:
+            return True  # Logs of a habit that no longer exists
+
+        start = self.conn.execute(f"SELECT MIN({LOG_DAY}) FROM habit_logs WHERE habit_id = ?",
+                                  (habit_id,)).fetchone()[0]
+        if start is None or start != entry['start']:
+            # The first log moved, or the habit has no logs (left) to update
+            return self._write_row(habit_id, entry)
+
+        first_day = self.header['first_day']
+        first = max((first - EPOCH).days, start)
+        last = min((last - EPOCH).days, self.header['end_day'])
+        if first > last:
+            return True
+        log_days, log_values = [], []
+        for day, value in self.conn.execute(f"""
+            SELECT {LOG_DAY}, value FROM habit_logs
+            WHERE habit_id = ? AND {LOG_DAY} BETWEEN ? AND ?
+        """, (habit_id, first, last)):
+            log_days.append(day)
+            log_values.append(value)
+        self._values[entry['row'], first - first_day:last - first_day + 1] = densify(
+            log_days, log_values, entry['default'],
+            start=EPOCH_DATE64 + first, end=EPOCH_DATE64 + last)[1]
+        return True
+
+    def _write_row(self, habit_id, entry):
+        log_days, log_values = self._logs_by_habit(habit_id).get(habit_id, ([], []))
+        start = int(min(log_days)) if log_days else None
+        if start is not None and start < self.header['first_day']:
+            return False  # Earlier than the first column
+        entry['start'] = start
+
+        first_day = self.header['first_day']
+        end_day = self.header['end_day']
+        row = self._values[entry['row']]
+        row[:] = np.nan
+        if start is not None:
+            row[start - first_day:end_day - first_day + 1] = densify(
+                log_days, log_values, entry['default'],
+                start=EPOCH_DATE64 + start, end=EPOCH_DATE64 + end_day)[1]
+        return True
+
+    def _logs_by_habit(self, habit_id=None):
+        """{habit_id: (epoch days, values)} of every log, or of one habit's"""
+        where, params = ('WHERE habit_id = ?', (habit_id,)) if habit_id is not None else ('', ())
+        logs = {}
+        for log_habit_id, day, value in self.conn.execute(
+                f"SELECT habit_id, {LOG_DAY}, value FROM habit_logs {where}", params):
+            days, values = logs.setdefault(log_habit_id, ([], []))
+            days.append(day)
+            values.append(value)
+        return logs
+
+    # Files
+
+    def _open(self, readonly):
+        self._values = np.load(self.data_path, mmap_mode='r' if readonly else 'r+')
+
+    def _lock(self):
+        # Processes and threads update the matrix one at a time
+        return file_lock(f'{self.path}.lock')
+
+    def _load_header(self):
+        try:
+            with open(self.header_path) as f:
+                header = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if header.get('version') != self.FORMAT_VERSION or not os.path.exists(self.data_path):
+            return None
+        return header
+
+    def _save_header(self):
+        # Written after the values are flushed; a crash in between leaves the
+        # old token, and the same changes are simply applied again
+        atomic_write(self.header_path, json.dumps(self.header))
+
@@ -0,0 +1,152 @@
+import hashlib
+import json
+from database import date_from_db
+
+
+class HabitSeries:
+    """Metadata and logged values for a single habit, ready for plotting."""
+
+    def __init__(self, habit_id, name, habit_type, target_value, default_value):
+        self.habit_id = habit_id
+        self.name = name
+        self.habit_type = habit_type
+        self.target_value = target_value
+        self.default_value = default_value
+        # Parallel lists of logged dates and values, sorted by date. Dates are
+        # kept in their stored form (ISO text or epoch days), which densify
+        # consumes directly
+        self.log_dates = []
+        self.log_values = []
+        # (days, values) from a HabitMatrix, used instead of the logs when set
+        self.dense = None
+        # HabitStats, when the caller wants them shown (see HabitStatsTable.attach)
+        self.stats = None
+
+    @property
+    def start_date(self):
+        """Date of the first log, or None if the habit has never been logged"""
+        if self.dense is not None:
+            days = self.dense[0]
+            return days[0].item() if len(days) else None
+        if not self.log_dates:
+            return None
+        return date_from_db(self.log_dates[0])
+
+    def densify(self, start=None, end=None):
+        """Dense (days, values) arrays with default_value filling the gaps"""
+        # Imports NumPy, so only load it when needed
+        if self.dense is not None:
+            from densify import window
+            return window(*self.dense, self.default_value, start=start, end=end)
+        from densify import densify
+        return densify(self.log_dates, self.log_values, self.default_value,
+                       start=start, end=end)
+
+    def legend_label(self):
+        """Legend label of the habit's data line, with a summary of its stats if attached"""
+        if self.stats is None:
+            return f'{self.name} (Actual)'
+        return f'{self.name} ({self.stats.summary(self)})'
+
+    def data_digest(self):
+        """Hash of the habit's logged data, which changes whenever the data does"""
+        digest = hashlib.sha256()
+        if self.dense is not None:
+            days, values = self.dense
+            digest.update(str(days[:1]).encode())
+            digest.update(values.tobytes())
+        else:
+            digest.update(json.dumps([self.log_dates, self.log_values]).encode())
+        return digest.hexdigest()
+
+
+class HabitRepository:
+    """
+    Loads habits and their logs in bulk, using a fixed number of queries
+    regardless of how many habits are requested.
+    With use_matrix, values are sliced from the HabitMatrix snapshot next
+    to the database instead of reading logs.
+    """
+
+    # Stay well below SQLite's host parameter limit for IN (...) lists
+    MAX_PARAMS = 900
+
+    def __init__(self, conn, use_matrix=False):
+        self.conn = conn
+        self.use_matrix = use_matrix
+        self.matrix = None
+
+    def load_series(self, habit_ids):
+        """Load series for the given habits, preserving the order of habit_ids"""
+        habit_ids = list(dict.fromkeys(habit_ids))
+        if not habit_ids:
+            return []
+
+        series = {}
+        for chunk in self._chunks(habit_ids):
+            placeholders = ', '.join('?' * len(chunk))
+            rows = self.conn.execute(f"""
+                SELECT id, name, type, target_value, default_value
+                FROM habits WHERE id IN ({placeholders})
+            """, chunk).fetchall()
+            for row in rows:
+                series[row[0]] = HabitSeries(*row)
+
+            if self._load_dense(series):
+                continue
+            self._load_logs(series, f"""
+                SELECT habit_id, date, value
+                FROM habit_logs
+                WHERE habit_id IN ({placeholders})
+                ORDER BY habit_id, date
+            """, chunk)
+
+        return [series[habit_id] for habit_id in habit_ids if habit_id in series]
+
+    def load_all_series(self):
+        """Load series for every habit, ordered by name"""
+        rows = self.conn.execute("""
+            SELECT id, name, type, target_value, default_value
+            FROM habits ORDER BY name
+        """).fetchall()
+        series = {row[0]: HabitSeries(*row) for row in rows}
+
+        if self._load_dense(series):
+            return [series[row[0]] for row in rows]
+        self._load_logs(series, """
+            SELECT habit_id, date, value
+            FROM habit_logs
+            ORDER BY habit_id, date
+        """)
+
+        return [series[row[0]] for row in rows]
+
+    def _load_dense(self, series):
+        """Fill series from the matrix; False if there is none or it lacks a habit"""
+        if not self.use_matrix or not series:
+            return False
+        if self.matrix is None:
+            from habit_matrix import HabitMatrix  # Imports NumPy, so only load it when needed
+            self.matrix = HabitMatrix.for_database(self.conn)
+            if self.matrix is None:
+                self.use_matrix = False
+                return False
+        self.matrix.refresh()
+        dense = {habit_id: self.matrix.series(habit_id) for habit_id in series}
+        if any(values is None for values in dense.values()):
+            return False  # Added after the refresh; read its logs instead
+        for habit_id, habit in series.items():
+            habit.dense = dense[habit_id]
+        return True
+
+    def _load_logs(self, series, query, params=()):
+        for habit_id, log_date, value in self.conn.execute(query, params):
+            habit = series.get(habit_id)
+            if habit is None:
+                continue  # Orphaned log of a deleted habit
+            habit.log_dates.append(log_date)
+            habit.log_values.append(value)
+
+    def _chunks(self, habit_ids):
+        for i in range(0, len(habit_ids), self.MAX_PARAMS):
+            yield habit_ids[i:i + self.MAX_PARAMS]
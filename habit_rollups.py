@@ -0,0 +1,80 @@
+import math
+from datetime import date
+from database import ROLLUP_TABLES, rollup_query
+
+
+class PeriodTotals:
+    """A habit's logged values in one week or month, from the rollup tables"""
+
+    def __init__(self, start, total, count, completions):
+        self.start = start
+        self.total = total
+        self.count = count
+        self.completions = completions
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def label(self, period):
+        """'2024-W09' for a week, '2024-03' for a month"""
+        if period == 'week':
+            year, week, _ = self.start.isocalendar()
+            return f'{year}-W{week:02d}'
+        return self.start.strftime('%Y-%m')
+
+
+def load_rollups(conn, habit_id, period, start=None, end=None):
+    """
+    PeriodTotals of one habit per 'week' or 'month', oldest first,
+    optionally only periods starting between the start and end dates
+    """
+    table = _table(period)
+    where, params = 'habit_id = ?', [habit_id]
+    if start is not None:
+        where += ' AND period_start >= ?'
+        params.append(start.isoformat())
+    if end is not None:
+        where += ' AND period_start <= ?'
+        params.append(end.isoformat())
+    return [PeriodTotals(date.fromisoformat(period_start), total, count, completions)
+            for period_start, total, count, completions in conn.execute(f"""
+                SELECT period_start, total, count, completions FROM {table}
+                WHERE {where} ORDER BY period_start
+            """, params)]
+
+
+def check_rollups(conn):
+    """
+    Compare both rollup tables with the same aggregates computed from
+    habit_logs on the fly. Returns a list of problems, empty when they agree.
+    Totals are compared allowing for rounding, since the triggers add and
+    subtract values one at a time.
+    """
+    problems = []
+    for period, (table, _) in ROLLUP_TABLES.items():
+        stored = {(habit_id, period_start): rest for habit_id, period_start, *rest in
+                  conn.execute(f"SELECT habit_id, period_start, total, count, completions FROM {table}")}
+        expected = {(habit_id, period_start): rest for habit_id, period_start, *rest in
+                    conn.execute(rollup_query(period))}
+        for key in sorted(stored.keys() | expected.keys()):
+            habit_id, period_start = key
+            if key not in expected:
+                problems.append(f"{table}: habit {habit_id}, {period_start} has no logs")
+            elif key not in stored:
+                problems.append(f"{table}: habit {habit_id}, {period_start} is missing")
+            else:
+                (total, count, completions), (expected_total, expected_count, expected_completions) = \
+                    stored[key], expected[key]
+                if (count != expected_count or completions != expected_completions
+                        or not math.isclose(total, expected_total, rel_tol=1e-9, abs_tol=1e-9)):
+                    problems.append(f"{table}: habit {habit_id}, {period_start} is "
+                                    f"{total:g}/{count}/{completions}, "
+                                    f"expected {expected_total:g}/{expected_count}/{expected_completions}")
+    return problems
+
+
+def _table(period):
+    if period not in ROLLUP_TABLES:
+        raise ValueError(f"Unknown period '{period}'. Choose from: {', '.join(ROLLUP_TABLES)}")
+    return ROLLUP_TABLES[period][0]
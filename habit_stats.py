@@ -0,0 +1,296 @@
+from datetime import date
+from change_journal import changes_since, current_token
+from database import EPOCH, LOG_DAY
+
+# Trailing windows, in days, for completion rates and average values. The
+# habit_stats table has a rate and a mean column for each.
+WINDOWS = (7, 30, 90)
+
+# Stay well below SQLite's host parameter limit for IN (...) lists
+MAX_PARAMS = 900
+
+
+class HabitStats:
+    """
+    Streaks, completion rates and average values of one habit as of a day.
+
+    A day counts as done when its value reaches the habit's target, or for
+    habits without one, when it is above zero. current_streak runs up to
+    today, or up to yesterday while today is not done yet. rates and means
+    map each window in WINDOWS to the share of done days and the average
+    value over that many days, counting only days since the first log, or
+    None if there are none.
+    """
+
+    def __init__(self, habit_id, current_streak, longest_streak, rates, means):
+        self.habit_id = habit_id
+        self.current_streak = current_streak
+        self.longest_streak = longest_streak
+        self.rates = rates
+        self.means = means
+
+    def summary(self, habit):
+        """A few words for a legend or title: streak and rate, or average vs target"""
+        if habit.habit_type == 'boolean':
+            if self.rates[30] is None:
+                return 'not logged yet'
+            return f'{self.current_streak}-day streak, {self.rates[30]:.0%} of 30 days'
+        if self.means[7] is None:
+            return 'not logged yet'
+        text = f'7-day avg {self.means[7]:.3g}'
+        if habit.target_value:
+            text += f' of {habit.target_value:g}'
+        return text
+
+    def details(self, habit):
+        """One line with every stat, for the GUI and the CLI"""
+        streak = f'streak {self.current_streak} (best {self.longest_streak})'
+        if habit.habit_type == 'boolean':
+            rates = ', '.join(f'{days}d {_percent(self.rates[days])}' for days in WINDOWS)
+            return f'{habit.name}: {streak} · done {rates}'
+        means = ', '.join(f'{days}d {_number(self.means[days])}' for days in WINDOWS)
+        if habit.target_value:
+            return f'{habit.name}: avg {means} vs target {habit.target_value:g} · {streak}'
+        return f'{habit.name}: avg {means} · {streak}'
+
+
+def _percent(value):
+    return '–' if value is None else f'{value:.0%}'
+
+
+def _number(value):
+    return '–' if value is None else f'{value:.3g}'
+
+
+def _goal(habit_type, target_value):
+    # Value a day must reach to be done, or None when any value above zero
+    # does: the same rule as the rollups
+    return target_value or (1 if habit_type == 'boolean' else None)
+
+
+def compute_stats(series, end=None):
+    """
+    {habit_id: HabitStats} for HabitSeries as of end (default today).
+    All habits are computed together on one habits x days array, right
+    aligned at end with NaN before each habit's first log: streaks come from
+    running counts of done days, and every window from prefix sums, so the
+    cost does not depend on the number of windows.
+    """
+    import numpy as np  # Writers only use stats_from_logs, so load NumPy here
+
+    series = list(series)
+    if not series:
+        return {}
+    end = date.today() if end is None else end
+
+    dense = [habit.densify(end=end)[1] for habit in series]
+    width = max([len(values) for values in dense] + [max(WINDOWS) + 1])
+    values = np.full((len(series), width), np.nan)
+    for row, habit_values in enumerate(dense):
+        if len(habit_values):
+            values[row, width - len(habit_values):] = habit_values
+    valid = ~np.isnan(values)
+
+    # Boolean habits are done at their target (1 for yes); numeric habits at
+    # theirs, or when above zero if they have none. NaN is never done.
+    goals = np.array([_goal(habit.habit_type, habit.target_value) for habit in series],
+                     dtype=np.float64)
+    done = np.where(np.isnan(goals)[:, None], values > 0, values >= goals[:, None])
+
+    # Length of the run of done days ending at each day: the running count
+    # of done days minus its value at the latest day that was not done
+    counts = np.cumsum(done, axis=1)
+    runs = counts - np.maximum.accumulate(np.where(done, 0, counts), axis=1)
+    longest = runs.max(axis=1)
+    current = np.where(done[:, -1], runs[:, -1], runs[:, -2])
+
+    def trailing(sums, days):
+        return sums[:, -1] - sums[:, -days - 1]
+
+    day_sums = np.cumsum(valid, axis=1)
+    done_sums = counts
+    value_sums = np.nancumsum(values, axis=1)
+    rates, means = {}, {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for days in WINDOWS:
+            logged = trailing(day_sums, days)
+            rates[days] = trailing(done_sums, days) / logged
+            means[days] = trailing(value_sums, days) / logged
+
+    def optional(value):
+        return None if np.isnan(value) else float(value)
+
+    return {
+        habit.habit_id: HabitStats(
+            habit.habit_id, int(current[row]), int(longest[row]),
+            {days: optional(rates[days][row]) for days in WINDOWS},
+            {days: optional(means[days][row]) for days in WINDOWS})
+        for row, habit in enumerate(series)
+    }
+
+
+def stats_from_logs(habit_id, logs, habit_type, target_value, default_value, end_day):
+    """
+    HabitStats of one habit from its logs as {epoch day: value}, as of the
+    epoch day end_day, with the same results as compute_stats. Plain
+    Python over the habit's days, so writers can keep the habit_stats table
+    current without loading NumPy.
+    """
+    goal = _goal(habit_type, target_value)
+
+    def value_on(day):
+        value = logs.get(day)
+        return default_value if value is None else value
+
+    def is_done(value):
+        return value is not None and (value > 0 if goal is None else value >= goal)
+
+    first = min(logs, default=end_day + 1)
+    run = previous_run = longest = 0
+    for day in range(first, end_day + 1):
+        # value_on and is_done inline, since this runs for every day of history
+        value = logs.get(day)
+        if value is None:
+            value = default_value
+        previous_run = run
+        if value is not None and (value > 0 if goal is None else value >= goal):
+            run += 1
+            if run > longest:
+                longest = run
+        else:
+            run = 0
+
+    # Days without a value (no log and no default) are not counted
+    rates, means = {}, {}
+    for days in WINDOWS:
+        values = [value for value in map(value_on, range(max(first, end_day - days + 1), end_day + 1))
+                  if value is not None]
+        rates[days] = sum(map(is_done, values)) / len(values) if values else None
+        means[days] = sum(values) / len(values) if values else None
+
+    return HabitStats(habit_id, run or previous_run, longest, rates, means)
+
+
+class HabitStatsTable:
+    """
+    The habit_stats summary table, kept current by the writers.
+
+    Each row holds a habit's stats, the day they are as of and the journal
+    token they are current at. Every write path calls update() inside its
+    transaction, which recomputes the habits written since the rows were
+    stored, so reading stats costs a query rather than a scan of each
+    habit's history. Reads never write: rows from an earlier day, or behind
+    the journal after a write that skipped update(), are computed in memory
+    instead, and stored by the next write to that habit.
+    """
+
+    def __init__(self, conn, repository=None):
+        self.conn = conn
+        self.repository = repository  # Only load() needs it, to compute stale rows
+
+    def available(self):
+        """Whether the database has the summary table and the journal that keeps it current"""
+        if current_token(self.conn) is None:
+            return False
+        return self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'habit_stats'"
+        ).fetchone() is not None
+
+    def update(self):
+        """
+        Recompute the rows of habits written since they were stored, and of
+        habits without one, as of today, and drop those of deleted habits.
+        Call it after writing and before committing; it does not commit, so
+        the rows are part of the same transaction as the writes.
+        """
+        if not self.available():
+            return
+        token = current_token(self.conn)
+        habits = {row[0]: row[1:] for row in
+                  self.conn.execute("SELECT id, type, target_value, default_value FROM habits")}
+        stored = dict(self.conn.execute("SELECT habit_id, token FROM habit_stats"))
+
+        stale = sorted(self._behind(stored, token, habits.keys()))
+        deleted = stored.keys() - habits.keys()
+        logs = {habit_id: {} for habit_id in stale}
+        for i in range(0, len(stale), MAX_PARAMS):
+            chunk = stale[i:i + MAX_PARAMS]
+            for habit_id, day, value in self.conn.execute(f"""
+                SELECT habit_id, {LOG_DAY}, value FROM habit_logs
+                WHERE habit_id IN ({', '.join('?' * len(chunk))})
+            """, chunk):
+                logs[habit_id][day] = value
+
+        today = date.today()
+        end_day = (today - EPOCH).days
+        stats = [stats_from_logs(habit_id, logs[habit_id], *habits[habit_id], end_day)
+                 for habit_id in stale]
+        self.conn.executemany(f"""
+            INSERT OR REPLACE INTO habit_stats
+            (habit_id, as_of, token, current_streak, longest_streak,
+             {', '.join(f'rate_{days}' for days in WINDOWS)},
+             {', '.join(f'mean_{days}' for days in WINDOWS)})
+            VALUES ({', '.join('?' * (5 + 2 * len(WINDOWS)))})
+        """, [(s.habit_id, today.isoformat(), token, s.current_streak, s.longest_streak,
+               *(s.rates[days] for days in WINDOWS), *(s.means[days] for days in WINDOWS))
+              for s in stats])
+        self.conn.executemany("DELETE FROM habit_stats WHERE habit_id = ?",
+                              [(habit_id,) for habit_id in deleted])
+        # Rows that were not stale are current at this token too
+        self.conn.execute("UPDATE habit_stats SET token = ? WHERE token != ?", (token, token))
+
+    def _behind(self, stored, token, habit_ids):
+        # Habits without a row, or written after the oldest stored token
+        behind = set(habit_ids) - stored.keys()
+        oldest = min(stored.values(), default=token)
+        if oldest != token:
+            changes = changes_since(self.conn, oldest)
+            behind |= set(habit_ids) if changes.full_reload else changes.habit_ids & set(habit_ids)
+        return behind
+
+    def _stored(self, habit_ids):
+        """
+        ({habit_id: HabitStats} of the current rows of habit_ids, set of
+        habit ids whose row is missing or stale)
+        """
+        token = current_token(self.conn)
+        today = date.today().isoformat()
+        stats, tokens = {}, {}
+        for row in self.conn.execute(f"""
+            SELECT habit_id, as_of, token, current_streak, longest_streak,
+                   {', '.join(f'rate_{days}' for days in WINDOWS)},
+                   {', '.join(f'mean_{days}' for days in WINDOWS)}
+            FROM habit_stats
+        """):
+            tokens[row[0]] = row[2]
+            if row[1] == today:
+                rates = row[5:5 + len(WINDOWS)]
+                means = row[5 + len(WINDOWS):]
+                stats[row[0]] = HabitStats(row[0], row[3], row[4],
+                                           dict(zip(WINDOWS, rates)), dict(zip(WINDOWS, means)))
+        stale = self._behind(tokens, token, habit_ids) | (set(habit_ids) - stats.keys())
+        return {habit_id: stats[habit_id] for habit_id in habit_ids
+                if habit_id in stats and habit_id not in stale}, stale
+
+    def load(self, habit_ids=None):
+        """{habit_id: HabitStats} of the given habits, or of all"""
+        if habit_ids is None:
+            habit_ids = [row[0] for row in self.conn.execute("SELECT id FROM habits")]
+        stats, stale = self._stored(habit_ids)
+        if stale:
+            stats.update(compute_stats(self.repository.load_series(sorted(stale))))
+        return {habit_id: stats[habit_id] for habit_id in habit_ids if habit_id in stats}
+
+    def attach(self, series):
+        """
+        Set .stats on each HabitSeries. Stale rows, and every habit of a
+        database without the summary table (one that was never migrated),
+        are computed from the series instead.
+        """
+        if self.available():
+            stats, stale = self._stored([habit.habit_id for habit in series])
+            stats.update(compute_stats([habit for habit in series if habit.habit_id in stale]))
+        else:
+            stats = compute_stats(series)
+        for habit in series:
+            habit.stats = stats.get(habit.habit_id)
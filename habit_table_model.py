@@ -0,0 +1,301 @@
+import sqlite3
+from datetime import date, timedelta
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from PyQt6.QtWidgets import QStyledItemDelegate, QComboBox
+from database import date_to_db, date_storage_mode
+
+FIXED_HEADERS = ['Name', 'Type', 'Target', 'Default']
+DEFAULT_COLUMN = 3
+FIRST_DAY_COLUMN = len(FIXED_HEADERS)
+
+
+class HabitTableModel(QAbstractTableModel):
+    """
+    Habits with their logs for the last few days.
+
+    Habits are loaded in batches as the view scrolls (canFetchMore/fetchMore),
+    each batch with one query for its rows and one windowed query for their
+    logs, so refreshing costs the same no matter how many habits exist.
+    """
+
+    # Emitted after a log or default value is saved, with the habit id
+    habitChanged = pyqtSignal(int)
+    # Emitted with a message when an edited value is not a valid number
+    invalidInput = pyqtSignal(str)
+    # Emitted with a message when an edit cannot be saved
+    errorOccurred = pyqtSignal(str)
+
+    BATCH_SIZE = 100
+
+    def __init__(self, habit_tracker, day_count=7, stats=None, write_queue=None, parent=None):
+        super().__init__(parent)
+        self.habit_tracker = habit_tracker
+        self.stats = stats
+        # When set, log edits are buffered here instead of written immediately
+        self.write_queue = write_queue
+        self.day_count = day_count
+        self.days = []
+        self.habits = []   # [habit_id, name, type, target_value, default_value]
+        self.logs = {}     # (habit_id, date) -> value
+        self._has_more = False
+
+    # Loading
+
+    def refresh(self):
+        """Drop loaded rows and start again from the first batch"""
+        self.beginResetModel()
+        today = date.today()
+        self.days = [today - timedelta(days=self.day_count - 1 - i) for i in range(self.day_count)]
+        self.habits = []
+        self.logs = {}
+        self._has_more = True
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self._has_more
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+
+        rows = self.habit_tracker.conn.execute("""
+            SELECT id, name, type, target_value, default_value
+            FROM habits
+            ORDER BY name, id
+            LIMIT ? OFFSET ?
+        """, (self.BATCH_SIZE, len(self.habits))).fetchall()
+        self._has_more = len(rows) == self.BATCH_SIZE
+        if not rows:
+            return
+
+        self._load_logs([row[0] for row in rows])
+
+        first = len(self.habits)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.habits.extend(list(row) for row in rows)
+        self.endInsertRows()
+
+    def reload_logs(self, changed):
+        """
+        Re-read the logs of loaded habits that changed elsewhere, given as
+        {habit_id: (first date, last date)}, and repaint their rows.
+        Habits whose changes are outside the visible days are skipped.
+        """
+        if not self.days:
+            return
+        rows = {habit[0]: row for row, habit in enumerate(self.habits)
+                if habit[0] in changed
+                and changed[habit[0]][0] <= self.days[-1] and changed[habit[0]][1] >= self.days[0]}
+        if not rows:
+            return
+
+        for habit_id in rows:
+            for day in self.days:
+                self.logs.pop((habit_id, day), None)
+        self._load_logs(list(rows))
+        for row in rows.values():
+            self.dataChanged.emit(self.index(row, FIRST_DAY_COLUMN),
+                                  self.index(row, self.columnCount() - 1))
+
+    def reload_habits(self, habit_ids):
+        """
+        Re-read loaded habits whose own row changed elsewhere and repaint the
+        rows that differ. Returns the ids of those habits, or None when
+        habits were added, deleted or renamed, so the rows must be refreshed.
+        Changes the table already shows, like its own edits, repaint nothing.
+        """
+        if not habit_ids:
+            return set()
+        habit_ids = list(habit_ids)
+        stored = {row[0]: list(row) for row in self.habit_tracker.conn.execute(f"""
+            SELECT id, name, type, target_value, default_value
+            FROM habits
+            WHERE id IN ({', '.join('?' * len(habit_ids))})
+        """, habit_ids)}
+        rows = {habit[0]: row for row, habit in enumerate(self.habits)}
+
+        changed = set()
+        for habit_id in habit_ids:
+            if (habit_id in stored) != (habit_id in rows):
+                return None  # Added or deleted
+            if habit_id not in rows:
+                continue
+            habit = self.habits[rows[habit_id]]
+            if habit[1] != stored[habit_id][1]:
+                return None  # Renamed, which can move the row
+            if habit != stored[habit_id]:
+                changed.add(habit_id)
+
+        for habit_id in changed:
+            row = rows[habit_id]
+            self.habits[row] = stored[habit_id]
+            self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+        return changed
+
+    def _load_logs(self, habit_ids):
+        # Pivot these habits' logs in the visible date window into a dict
+        placeholders = ', '.join('?' * len(habit_ids))
+        mode = date_storage_mode(self.habit_tracker.conn)
+        days_by_db_date = {date_to_db(day, mode): day for day in self.days}
+        for habit_id, db_date, value in self.habit_tracker.conn.execute(f"""
+            SELECT habit_id, date, value
+            FROM habit_logs
+            WHERE habit_id IN ({placeholders}) AND date BETWEEN ? AND ?
+        """, habit_ids + [date_to_db(self.days[0], mode), date_to_db(self.days[-1], mode)]):
+            day = days_by_db_date.get(db_date)
+            if day is not None:
+                self.logs[(habit_id, day)] = value
+
+        # Edits not yet flushed take precedence over what is stored
+        if self.write_queue is not None:
+            batch = set(habit_ids)
+            for (habit_id, day), value in self.write_queue.pending.items():
+                if habit_id in batch and day in days_by_db_date.values():
+                    self.logs[(habit_id, day)] = value
+
+    # Read access
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.habits)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else FIRST_DAY_COLUMN + len(self.days)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation != Qt.Orientation.Horizontal or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if section < FIRST_DAY_COLUMN:
+            return FIXED_HEADERS[section]
+        return self.days[section - FIRST_DAY_COLUMN].strftime('%Y-%m-%d')
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() >= DEFAULT_COLUMN:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return None
+
+        habit_id, name, habit_type, target, default_value = self.habits[index.row()]
+        column = index.column()
+
+        if column == 0:
+            return name
+        if column == 1:
+            return habit_type
+        if column == 2:
+            # Boolean habits always target 'Yes'
+            if habit_type == 'boolean':
+                return 'Yes'
+            return str(target) if target else ''
+        if column == DEFAULT_COLUMN:
+            value = default_value
+        else:
+            value = self.logs.get((habit_id, self.day_at(column)))
+            if value is None:
+                value = default_value  # Use default value if no log exists
+
+        if habit_type == 'boolean':
+            return 'Yes' if value == 1 else 'No'
+        return str(value)
+
+    def habit_at(self, row):
+        """(habit_id, name, type, target_value, default_value) for a row"""
+        return tuple(self.habits[row])
+
+    def day_at(self, column):
+        return self.days[column - FIRST_DAY_COLUMN]
+
+    def is_boolean(self, index):
+        return self.habits[index.row()][2] == 'boolean'
+
+    # Editing
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole:
+            return False
+        if value == self.data(index, role):
+            return False  # Unchanged; nothing to save
+
+        habit = self.habits[index.row()]
+        habit_id, habit_type = habit[0], habit[2]
+
+        if habit_type == 'boolean':
+            value = 1 if value == 'Yes' else 0
+        else:
+            text = str(value).strip()
+            if text == '':
+                return False  # Leave the stored value alone
+            try:
+                value = float(text)
+            except ValueError:
+                self.invalidInput.emit('Please enter a valid number')
+                return False
+
+        if self.stats:
+            self.stats.start_edit()
+        try:
+            if index.column() == DEFAULT_COLUMN:
+                self.habit_tracker.cursor.execute("""
+                    UPDATE habits
+                    SET default_value = ?
+                    WHERE id = ?
+                """, (value, habit_id))
+                self.habit_tracker.commit()
+                habit[4] = value
+                # Every day without a log shows the default, so repaint the row
+                self.dataChanged.emit(self.index(index.row(), DEFAULT_COLUMN),
+                                      self.index(index.row(), self.columnCount() - 1))
+            else:
+                day = self.day_at(index.column())
+                if self.write_queue is not None:
+                    self.write_queue.put(habit_id, day, value)
+                else:
+                    self.habit_tracker.set_log(habit_id, day, value)
+                self.logs[(habit_id, day)] = value
+                self.dataChanged.emit(index, index)
+        except sqlite3.Error as e:
+            self.errorOccurred.emit(f'Error saving value: {str(e)}')
+            return False
+
+        # Listeners run synchronously, so the timing includes their plot updates
+        self.habitChanged.emit(habit_id)
+        if self.stats:
+            self.stats.finish_edit()
+        return True
+
+
+class HabitValueDelegate(QStyledItemDelegate):
+    """
+    Creates editors only while a cell is being edited: a Yes/No combo box
+    for boolean habits and the default line edit for numeric ones.
+    """
+
+    def createEditor(self, parent, option, index):
+        if not index.model().is_boolean(index):
+            return super().createEditor(parent, option, index)
+
+        combo = QComboBox(parent)
+        combo.addItems(['Yes', 'No'])
+        # Save as soon as a value is picked, like the old per-cell combo boxes
+        combo.activated.connect(lambda: self._commit_and_close(combo))
+        return combo
+
+    def setEditorData(self, editor, index):
+        if isinstance(editor, QComboBox):
+            editor.setCurrentText(index.data(Qt.ItemDataRole.EditRole))
+        else:
+            super().setEditorData(editor, index)
+
+    def setModelData(self, editor, model, index):
+        if isinstance(editor, QComboBox):
+            model.setData(index, editor.currentText())
+        else:
+            super().setModelData(editor, model, index)
+
+    def _commit_and_close(self, editor):
+        self.commitData.emit(editor)
+        self.closeEditor.emit(editor)
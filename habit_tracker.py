@@ -1,10 +1,12 @@
 import sqlite3
 from datetime import datetime, date
-from config import DB_NAME
+from database import connect, date_to_db, date_from_db, date_storage_mode, upsert_logs
+import change_journal
+from habit_stats import HabitStatsTable
 
 class HabitTracker:
     def __init__(self):
-        self.conn = sqlite3.connect(DB_NAME)
+        self.conn = connect()
         self.cursor = self.conn.cursor()
 
     def add_habit(self):
@@ -35,7 +37,7 @@ class HabitTracker:
                 "INSERT INTO habits (name, type, target_value) VALUES (?, ?, ?)",
                 (name, habit_type, target_value)
             )
-            self.conn.commit()
+            self.commit()
             print(f"Successfully added habit: {name}")
         except sqlite3.Error as e:
             print(f"Error adding habit: {e}")
@@ -67,7 +69,7 @@ class HabitTracker:
         today = date.today()
         self.cursor.execute(
             "SELECT * FROM habit_logs WHERE habit_id = ? AND date = ?",
-            (habit_id, today)
+            (habit_id, date_to_db(today, date_storage_mode(self.conn)))
         )
         if self.cursor.fetchone():
             overwrite = input("Entry already exists for today. Overwrite? (y/n): ")
@@ -90,13 +92,10 @@ class HabitTracker:
                 except ValueError:
                     print("Please enter a valid number.")
 
-        # Insert or update log
+        # Insert or update log. An upsert rather than INSERT OR REPLACE, so
+        # the update triggers see the old value
         try:
-            self.cursor.execute("""
-                INSERT OR REPLACE INTO habit_logs (habit_id, value, date)
-                VALUES (?, ?, ?)
-            """, (habit_id, value, today))
-            self.conn.commit()
+            upsert_logs(self.conn, [(habit_id, today, value)])
             print("Successfully logged habit!")
         except sqlite3.Error as e:
             print(f"Error logging habit: {e}")
@@ -122,7 +121,7 @@ class HabitTracker:
             
             if log_date:
                 value_display = "Yes" if value == 1 and type == 'boolean' else "No" if value == 0 and type == 'boolean' else value
-                print(f"  {log_date}: {value_display}")
+                print(f"  {date_from_db(log_date)}: {value_display}")
 
     def delete_habit(self):
         self.cursor.execute("SELECT id, name, type FROM habits")
@@ -153,10 +152,57 @@ class HabitTracker:
             try:
                 self.cursor.execute("DELETE FROM habit_logs WHERE habit_id = ?", (habit_id,))
                 self.cursor.execute("DELETE FROM habits WHERE id = ?", (habit_id,))
-                self.conn.commit()
+                self.commit()
                 print("Habit deleted successfully!")
             except sqlite3.Error as e:
                 print(f"Error deleting habit: {e}")
 
+    def get_log(self, habit_id, log_date):
+        """Logged value for a habit on a date, or None if there is no log"""
+        row = self.conn.execute(
+            "SELECT value FROM habit_logs WHERE habit_id = ? AND date = ?",
+            (habit_id, date_to_db(log_date, date_storage_mode(self.conn)))
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_log(self, habit_id, log_date, value):
+        """Create or update the log for a habit on a date and commit"""
+        db_date = date_to_db(log_date, date_storage_mode(self.conn))
+        # First try to update existing record
+        self.cursor.execute("""
+            UPDATE habit_logs 
+            SET value = ? 
+            WHERE habit_id = ? AND date = ?
+        """, (value, habit_id, db_date))
+        
+        # If no record was updated, insert new record
+        if self.cursor.rowcount == 0:
+            self.cursor.execute("""
+                INSERT INTO habit_logs (habit_id, value, date)
+                VALUES (?, ?, ?)
+            """, (habit_id, value, db_date))
+        
+        self.commit()
+
+    def set_logs(self, logs):
+        """Create or update many (habit_id, log_date, value) logs in one transaction"""
+        upsert_logs(self.conn, logs)
+
+    def commit(self):
+        """Commit the writes made through cursor, with the stats of the habits they touched"""
+        HabitStatsTable(self.conn).update()
+        self.conn.commit()
+
+    def change_token(self):
+        """Token for the current state, to pass to changes_since later; None before migration"""
+        return change_journal.current_token(self.conn)
+
+    def changes_since(self, token):
+        """ChangeSet of the habits and log dates written after token"""
+        return change_journal.changes_since(self.conn, token)
+
+    def close(self):
+        self.conn.close()
+
     def __del__(self):
         self.conn.close() 
\ No newline at end of file
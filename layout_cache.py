@@ -0,0 +1,98 @@
+import json
+import threading
+from file_utils import atomic_write
+from render_cache import RenderCache
+
+
+class LayoutCache:
+    """
+    Subplot margins found by tight_layout, keyed by everything they depend
+    on: figure size, layout rect, legend entries, y range, the date label
+    format and a bucket of the date range. tight_layout measures every tick label and the legend;
+    while the key stays the same its result is reused instead.
+    Kept in memory, and on disk when a path is given. Safe to share
+    between threads rendering at the same time.
+    """
+
+    # The date range is bucketed by week, so a new day does not force a
+    # new layout; labels of the same format all have the same width
+    DATE_BUCKET_DAYS = 7
+
+    def __init__(self, path=None, max_entries=32):
+        self.path = path
+        self.max_entries = max_entries
+        self._state = self._load()
+        self._lock = threading.Lock()
+
+    def key(self, fig, ax, rect):
+        legend = ax.get_legend()
+        legend_texts = legend.get_texts() if legend else []
+        x_min, x_max = ax.get_xlim()
+        y_min, y_max = ax.get_ylim()
+        return RenderCache.fingerprint(
+            [round(v, 3) for v in fig.get_size_inches()],
+            fig.dpi,
+            rect,
+            [text.get_text() for text in legend_texts],
+            legend_texts[0].get_fontsize() if legend_texts else None,
+            [round(y_min, 6), round(y_max, 6)],
+            type(ax.xaxis.get_major_locator()).__name__,
+            getattr(ax.xaxis.get_major_formatter(), 'fmt', None),
+            int(x_max - x_min) // self.DATE_BUCKET_DAYS,
+        )
+
+    def apply(self, fig, ax, rect):
+        """
+        Lay out fig within rect, reusing a cached layout when one matches.
+        Returns True on a cache hit.
+        """
+        key = self.key(fig, ax, rect)
+        params = self._state['entries'].get(key)
+        if params is not None:
+            fig.subplots_adjust(**params)
+            with self._lock:
+                self._state['hits'] += 1
+                self._save()
+            return True
+
+        fig.tight_layout(rect=rect)
+        subplotpars = fig.subplotpars
+        with self._lock:
+            entries = self._state['entries']
+            entries[key] = {
+                'left': subplotpars.left,
+                'bottom': subplotpars.bottom,
+                'right': subplotpars.right,
+                'top': subplotpars.top,
+            }
+            # Entries are kept in insertion order; drop the oldest beyond the bound
+            for old_key in list(entries)[:max(0, len(entries) - self.max_entries)]:
+                del entries[old_key]
+            self._state['misses'] += 1
+            self._save()
+        return False
+
+    def stats(self):
+        return {
+            'hits': self._state['hits'],
+            'misses': self._state['misses'],
+            'entries': len(self._state['entries']),
+        }
+
+    def _load(self):
+        if self.path:
+            try:
+                with open(self.path) as f:
+                    state = json.load(f)
+                if isinstance(state.get('entries'), dict):
+                    state.setdefault('hits', 0)
+                    state.setdefault('misses', 0)
+                    return state
+            except (OSError, ValueError):
+                pass
+        return {'entries': {}, 'hits': 0, 'misses': 0}
+
+    def _save(self):
+        if not self.path:
+            return
+        atomic_write(self.path, json.dumps(self._state))
@@ -1,102 +1,108 @@
 from matplotlib.figure import Figure
 import matplotlib.dates as mdates
-from datetime import datetime, date, timedelta
-import matplotlib.pyplot as plt
+from datetime import date, timedelta
+from downsample import downsample_minmax
+from date_ticks import tick_spec
+import theme
 
-def create_habit_progress_plot(habit_tracker, selected_habits, figsize=(12, 6), dpi=100):
+def habit_line_gid(habit_id):
+    """Identifier of a habit's data line, so it can be found and patched later"""
+    return f'habit-{habit_id}'
+
+def max_line_points(fig_width):
+    """
+    Level of detail for a figure fig_width inches wide: never plot more
+    points than lines fit side by side
+    """
+    return int(fig_width * 72 / theme.LINE_WIDTH)
+
+def date_axis(days_shown):
     """
-    Create a plot showing progress for selected habits.
+    Locator and formatter for an x axis spanning days_shown days, keeping
+    the number of date labels at about 31 or fewer
+    """
+    unit, interval, fmt = tick_spec(days_shown)
+    if unit == 'day':
+        locator = mdates.DayLocator(interval=interval)
+    elif unit == 'week':
+        locator = mdates.WeekLocator(byweekday=mdates.MO, interval=interval)
+    elif unit == 'month':
+        locator = mdates.MonthLocator(bymonth=range(1, 13, interval))
+    else:
+        locator = mdates.YearLocator(base=interval)
+    return locator, mdates.DateFormatter(fmt)
+
+def create_habit_progress_plot(series, figsize=(12, 6), dpi=100, layout=True, color_index=0):
+    """
+    Create a plot showing progress for the given habit series.
+    Series come from HabitRepository, so no queries are issued here.
     Used by both GUI and wallpaper generator.
+    Only the returned Figure is touched, never pyplot or rcParams, so
+    figures can be built on several threads at once.
+    Pass layout=False when the caller moves the legend and lays out the
+    figure itself, to skip a tight_layout pass whose result is discarded.
+    Long histories are reduced to about one point per line width across
+    the figure, the finest detail a line can show, so drawing time does not
+    grow with the amount of history.
+    color_index is the color of the first series, so a habit plotted on
+    its own can keep the color it has in the combined plot.
     """
     # Create figure with dark background
-    plt.style.use('dark_background')
     fig = Figure(figsize=figsize, dpi=dpi)
     
     # Set consistent dark background for both figure and plot area
-    background_color = '#1E1E1E'
+    background_color = theme.BACKGROUND
     fig.patch.set_facecolor(background_color)
     
     ax = fig.add_subplot(111)
     ax.set_facecolor(background_color)  # Match the main background
     
-    # Adjust figure margins
-    fig.tight_layout(pad=3.0)
-    
-    # Soft, muted colors for habits with good contrast
-    colors = [
-        '#81A1C1',  # Soft blue
-        '#B48EAD',  # Soft purple
-        '#A3BE8C',  # Soft green
-        '#EBCB8B',  # Soft yellow
-        '#D08770',  # Soft orange
-        '#88C0D0',  # Light blue
-        '#BF616A',  # Soft red
-    ]
-    
     # Reduced offset for subtle separation
-    offset = 0.02
+    offset = theme.TARGET_OFFSET
     
     # Find the earliest start date among all habits
     start_date = date.today()
     end_date = date.today()
     
     # Get global start date for x-axis range
-    for habit_id in selected_habits:
-        habit_tracker.cursor.execute("""
-            SELECT MIN(date) FROM habit_logs WHERE habit_id = ?
-        """, (habit_id,))
-        first_date = habit_tracker.cursor.fetchone()[0]
-        if first_date:
-            start_date = min(start_date, datetime.strptime(first_date, '%Y-%m-%d').date())
+    for habit in series:
+        if habit.start_date:
+            start_date = min(start_date, habit.start_date)
+    
+    max_points = max_line_points(figsize[0])
+    marker_pixels = theme.MARKER_SIZE * dpi / 72
+    width_pixels = fig.get_figwidth() * dpi
     
     # Plot each habit
-    for i, habit_id in enumerate(selected_habits):
-        color = colors[i % len(colors)]
-        
-        # Get habit info including default_value
-        habit_tracker.cursor.execute("""
-            SELECT name, type, target_value, default_value 
-            FROM habits WHERE id = ?
-        """, (habit_id,))
-        habit_name, habit_type, target_value, default_value = habit_tracker.cursor.fetchone()
-        
-        # Get logs for this habit
-        habit_tracker.cursor.execute("""
-            SELECT DISTINCT date, value 
-            FROM habit_logs 
-            WHERE habit_id = ?
-            GROUP BY date
-            ORDER BY date
-        """, (habit_id,))
-        logs = dict(habit_tracker.cursor.fetchall())
+    for i, habit in enumerate(series):
+        color = theme.habit_color(color_index + i)
+        habit_name = habit.name
+        label = habit.legend_label()
+        habit_type = habit.habit_type
+        target_value = habit.target_value
         
-        # Get habit's own start date
-        habit_start = None
-        if logs:
-            habit_start = datetime.strptime(min(logs.keys()), '%Y-%m-%d').date()
-        else:
-            continue  # Skip habits with no logs
+        # Skip habits with no logs
+        if habit.start_date is None:
+            continue
         
-        dates = []
-        values = []
-        current = habit_start  # Start from habit's own start date
-        while current <= end_date:
-            dates.append(current)
-            current_str = current.strftime('%Y-%m-%d')
-            # Fix: Use default_value when no log exists
-            value = logs.get(current_str)
-            values.append(value if value is not None else default_value)
-            current += timedelta(days=1)
+        # One value per day from the habit's own start date, with
+        # default_value filling days without a log
+        dates, values = habit.densify(end=end_date)
+        if len(dates) == 0:
+            continue  # Every log is after the end date
+        dates, values = downsample_minmax(dates, values, max_points)
+        marker = 'o' if width_pixels / len(dates) >= theme.MARKER_SPACING * marker_pixels else None
         
         # Plot data with updated styling
         if habit_type == 'boolean':
             ax.step(dates, values, where='mid', 
-                   label=f'{habit_name} (Actual)',
+                   label=label,
+                   gid=habit_line_gid(habit.habit_id),
                    color=color, 
-                   alpha=0.8,
-                   linewidth=2.5,
-                   marker='o',
-                   markersize=5,
+                   alpha=theme.LINE_ALPHA,
+                   linewidth=theme.LINE_WIDTH,
+                   marker=marker,
+                   markersize=theme.MARKER_SIZE,
                    markerfacecolor=background_color,  # Match background
                    markeredgecolor=color)
             if target_value:
@@ -104,16 +110,17 @@ def create_habit_progress_plot(habit_tracker, selected_habits, figsize=(12, 6),
                           color=color, 
                           linestyle='--', 
                           label=f'{habit_name} (Target)',
-                          alpha=0.4,
-                          linewidth=1.5)
+                          alpha=theme.TARGET_ALPHA,
+                          linewidth=theme.TARGET_WIDTH)
         else:
             ax.plot(dates, values, 
-                   label=f'{habit_name} (Actual)',
+                   label=label,
+                   gid=habit_line_gid(habit.habit_id),
                    color=color, 
-                   alpha=0.8,
-                   linewidth=2.5,
-                   marker='o',
-                   markersize=5,
+                   alpha=theme.LINE_ALPHA,
+                   linewidth=theme.LINE_WIDTH,
+                   marker=marker,
+                   markersize=theme.MARKER_SIZE,
                    markerfacecolor=background_color,  # Match background
                    markeredgecolor=color)
             if target_value:
@@ -121,8 +128,8 @@ def create_habit_progress_plot(habit_tracker, selected_habits, figsize=(12, 6),
                           color=color, 
                           linestyle='--', 
                           label=f'{habit_name} (Target)',
-                          alpha=0.4,
-                          linewidth=1.5)
+                          alpha=theme.TARGET_ALPHA,
+                          linewidth=theme.TARGET_WIDTH)
     
     # Set x-axis range to show all habits
     ax.set_xlim(start_date - timedelta(days=0.5), end_date + timedelta(days=0.5))
@@ -131,39 +138,40 @@ def create_habit_progress_plot(habit_tracker, selected_habits, figsize=(12, 6),
     ax.set_title('Habit Progress', 
                 fontsize=16, 
                 pad=20, 
-                color='#D8DEE9')  # Light gray text
+                color=theme.TEXT)  # Light gray text
     ax.set_xlabel('Date', 
                  fontsize=12, 
-                 color='#D8DEE9')
+                 color=theme.TEXT)
     ax.set_ylabel('Value', 
                  fontsize=12, 
-                 color='#D8DEE9')
+                 color=theme.TEXT)
     
     # Grid styling
     ax.grid(True, 
             alpha=0.08,  # Slightly reduced opacity
-            color='#D8DEE9', 
+            color=theme.TEXT, 
             linestyle='-', 
             linewidth=0.5)
     
     # Tick styling
     ax.tick_params(axis='both', 
-                  colors='#D8DEE9',  # Light gray text
+                  colors=theme.TEXT,  # Light gray text
                   labelsize=10)
     
     # Spine styling
     for spine in ax.spines.values():
-        spine.set_color('#404040')  # Darker gray for borders
+        spine.set_color(theme.BORDER)  # Darker gray for borders
     
     # Legend styling
     ax.legend(facecolor=background_color,
-             edgecolor='#404040',
-             labelcolor='#D8DEE9',
+             edgecolor=theme.BORDER,
+             labelcolor=theme.TEXT,
              framealpha=0.9)
     
-    # Format x-axis dates
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-    ax.xaxis.set_major_locator(mdates.DayLocator(interval=2))
+    # Format x-axis dates, with coarser ticks for longer ranges
+    locator, formatter = date_axis((end_date - start_date).days + 1)
+    ax.xaxis.set_major_formatter(formatter)
+    ax.xaxis.set_major_locator(locator)
     
     # Rotate and align the tick labels so they look better
     fig.autofmt_xdate()
@@ -172,6 +180,32 @@ def create_habit_progress_plot(habit_tracker, selected_habits, figsize=(12, 6),
     ax.margins(x=0.02)
     
     # Update the layout to ensure everything fits
-    fig.tight_layout(rect=[0.02, 0.02, 0.92, 0.98])
+    if layout:
+        fig.tight_layout(rect=[0.02, 0.02, 0.92, 0.98])
     
-    return fig, ax 
\ No newline at end of file
+    return fig, ax 
+
+def create_habit_tile(habit, color_index, figsize, dpi):
+    """
+    A small plot of a single habit for the tiled wallpaper: the habit's
+    name and, if attached, a summary of its stats as the title, no legend
+    or axis labels, and a few short date labels that fit a narrow axis.
+    """
+    fig, ax = create_habit_progress_plot([habit], figsize=figsize, dpi=dpi,
+                                         layout=False, color_index=color_index)
+    ax.get_legend().remove()
+    title = habit.name if habit.stats is None else f'{habit.name} · {habit.stats.summary(habit)}'
+    ax.set_title(title, fontsize=12, pad=6, color=theme.TEXT)
+    ax.set_xlabel('')
+    ax.set_ylabel('')
+    ax.tick_params(axis='both', labelsize=8)
+    
+    locator = mdates.AutoDateLocator(minticks=3, maxticks=6)
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    for label in ax.get_xticklabels():
+        label.set_rotation(0)
+        label.set_horizontalalignment('center')
+    
+    fig.tight_layout(pad=0.8)
+    return fig, ax
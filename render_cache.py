@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import time
+from file_utils import atomic_write, file_lock
+
+# How stale an entry's last use may get before a hit records it again
+TOUCH_INTERVAL = 60 * 60
+
+
+class RenderCache:
+    """
+    On-disk map from input fingerprints to rendered wallpapers.
+    Lets a run whose inputs have not changed skip rendering entirely.
+
+    Several processes share the index (the daemon, cron runs, the GUI), so
+    it is reread before each use, and changes are made under a file lock to
+    the index as it is on disk. A hit on the current wallpaper writes
+    nothing, which is what almost every run is. Hits and misses are
+    counted per instance.
+    """
+
+    def __init__(self, path, max_entries=16, max_age_days=7):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 24 * 60 * 60
+        self.hits = 0
+        self.misses = 0
+        self._state = self._load()
+
+    @staticmethod
+    def fingerprint(*parts):
+        """Stable hash of JSON-serializable inputs"""
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @property
+    def last(self):
+        """Fingerprint of the most recent render by any process, or None"""
+        self._state = self._load()
+        return self._state['last']
+
+    def lookup(self, fingerprint):
+        """Return the cached wallpaper path for fingerprint, or None on a miss"""
+        self._state = self._load()
+        entry = self._state['entries'].get(fingerprint)
+        if not entry or not os.path.exists(entry['path']):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        now = time.time()
+        if self._state['last'] != fingerprint or now - entry['last_used'] > TOUCH_INTERVAL:
+            def touch(state):
+                if fingerprint in state['entries']:
+                    state['entries'][fingerprint]['last_used'] = now
+                    state['last'] = fingerprint
+            self._update(touch)
+        return entry['path']
+
+    def store(self, fingerprint, path):
+        """Record a freshly rendered wallpaper for fingerprint"""
+        now = time.time()
+
+        def add(state):
+            state['entries'][fingerprint] = {
+                'path': path,
+                'created': now,
+                'last_used': now,
+            }
+            state['last'] = fingerprint
+            self._evict(state, now)
+        self._update(add)
+
+    def stats(self):
+        """Hits and misses of this instance, and current size of the cache"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._state['entries']),
+        }
+
+    def _evict(self, state, now):
+        entries = state['entries']
+
+        # Drop entries that are too old or whose wallpaper is gone
+        for fingerprint, entry in list(entries.items()):
+            if now - entry['last_used'] > self.max_age or not os.path.exists(entry['path']):
+                del entries[fingerprint]
+
+        # Then the least recently used ones beyond the size bound
+        if len(entries) > self.max_entries:
+            by_age = sorted(entries, key=lambda fp: entries[fp]['last_used'])
+            for fingerprint in by_age[:len(entries) - self.max_entries]:
+                del entries[fingerprint]
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            if isinstance(state.get('entries'), dict):
+                state.setdefault('last', None)
+                return state
+        except (OSError, ValueError):
+            pass
+        return {'entries': {}, 'last': None}
+
+    def _update(self, change):
+        """Apply change(state) to the index as it is on disk, and write it back"""
+        with file_lock(f'{self.path}.lock'):
+            self._state = self._load()
+            change(self._state)
+            atomic_write(self.path, json.dumps(self._state))
@@ -0,0 +1,81 @@
+import traceback
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from habit_tracker import HabitTracker
+
+
+class RenderSignals(QObject):
+    finished = pyqtSignal(int, object)  # generation, result
+    failed = pyqtSignal(int, str)       # generation, error message
+
+
+class RenderTask(QRunnable):
+    """
+    Runs func(habit_tracker, is_cancelled) on a pool thread.
+    The task opens its own HabitTracker, since SQLite connections cannot be
+    shared across threads.
+    """
+
+    def __init__(self, generation, func, is_current):
+        super().__init__()
+        self.generation = generation
+        self.func = func
+        self.is_current = is_current
+        self.signals = RenderSignals()
+
+    def is_cancelled(self):
+        return not self.is_current(self.generation)
+
+    def run(self):
+        if self.is_cancelled():
+            return
+
+        habit_tracker = HabitTracker()
+        try:
+            result = self.func(habit_tracker, self.is_cancelled)
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        finally:
+            habit_tracker.close()
+
+        if not self.is_cancelled():
+            self.signals.finished.emit(self.generation, result)
+
+
+class LatestOnlyRenderer(QObject):
+    """
+    Runs render jobs off the UI thread, one at a time. Submitting a job
+    cancels older ones: queued jobs are dropped, running jobs can check
+    is_cancelled() to stop early, and only the newest job's result is
+    delivered.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.generation = 0
+
+    @property
+    def busy(self):
+        return self.pool.activeThreadCount() > 0
+
+    def submit(self, func, on_finished, on_failed=None):
+        self.cancel()
+        generation = self.generation
+
+        task = RenderTask(generation, func, lambda g: g == self.generation)
+        # Results arrive through queued signals, so handlers run on the UI thread
+        task.signals.finished.connect(
+            lambda g, result: on_finished(result) if g == self.generation else None)
+        if on_failed:
+            task.signals.failed.connect(
+                lambda g, message: on_failed(message) if g == self.generation else None)
+        self.pool.start(task)
+        return generation
+
+    def cancel(self):
+        """Invalidate every submitted job"""
+        self.generation += 1
+        self.pool.clear()
@@ -0,0 +1,32 @@
+import os
+import sys
+import pytest
+
+# The modules live at the top of the repository, next to main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Set before config is imported, and taking precedence over .env, so a
+# developer's ENV=test cannot turn on RESET_TABLES
+os.environ['ENV'] = 'prod'
+
+from database import connect, migrate
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """A migrated database in a temporary directory"""
+    conn = connect(str(tmp_path / 'habits.db'))
+    migrate(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def add_habit(conn):
+    """Insert a habit and return its id"""
+    def add(name, habit_type='numeric', target_value=1, default_value=0):
+        cursor = conn.execute(
+            "INSERT INTO habits (name, type, target_value, default_value) VALUES (?, ?, ?, ?)",
+            (name, habit_type, target_value, default_value))
+        conn.commit()
+        return cursor.lastrowid
+    return add
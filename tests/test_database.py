@@ -0,0 +1,91 @@
+import random
+from datetime import date, timedelta
+from change_journal import changes_since, current_token
+from database import MIGRATIONS, JOURNAL_KEEP, connect, migrate, rebuild_rollups, upsert_logs
+from habit_rollups import check_rollups
+
+
+def test_migrate_fresh_database(conn):
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'habits', 'habit_logs', 'changes', 'habit_stats', 'settings',
+            'habit_log_weeks', 'habit_log_months'} <= tables
+    migrate(conn)  # Nothing left to apply
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+
+
+def test_migrate_database_from_before_the_unique_constraint(tmp_path):
+    conn = connect(str(tmp_path / 'habits.db'))
+    with conn:
+        conn.execute("CREATE TABLE habits (id INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+                     "type TEXT NOT NULL, target_value REAL, default_value REAL NOT NULL, "
+                     "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        conn.execute("CREATE TABLE habit_logs (id INTEGER PRIMARY KEY, habit_id INTEGER, "
+                     "value REAL, date DATE)")
+        conn.execute("INSERT INTO habits (name, type, target_value, default_value) "
+                     "VALUES ('Read', 'boolean', 1, 0)")
+        conn.executemany("INSERT INTO habit_logs (habit_id, value, date) VALUES (1, ?, ?)",
+                         [(1, '2024-03-01'), (0, '2024-03-01'), (1, '2024-03-02')])
+        conn.execute("PRAGMA user_version = 1")
+
+    migrate(conn)
+    assert conn.execute("SELECT value, date FROM habit_logs ORDER BY date").fetchall() == \
+        [(1, '2024-03-01'), (1, '2024-03-02')]
+    assert check_rollups(conn) == []
+    conn.close()
+
+
+def test_changes_since(conn, add_habit):
+    first = add_habit('Read')
+    second = add_habit('Run')
+    assert changes_since(conn, None).full_reload
+
+    token = current_token(conn)
+    assert not changes_since(conn, token)
+    upsert_logs(conn, [(first, date(2024, 3, 5), 1.0), (first, date(2024, 3, 1), 2.0)])
+    with conn:
+        conn.execute("UPDATE habits SET default_value = 1 WHERE id = ?", (second,))
+
+    changes = changes_since(conn, token)
+    assert not changes.full_reload
+    assert changes.habits == {second}
+    assert changes.logs == {first: (date(2024, 3, 1), date(2024, 3, 5))}
+    assert changes.token == current_token(conn)
+
+    # Rewriting the same value is not a change
+    upsert_logs(conn, [(first, date(2024, 3, 5), 1.0)])
+    assert not changes_since(conn, changes.token)
+
+
+def test_changes_since_a_pruned_token(conn, add_habit):
+    habit_id = add_habit('Read')
+    token = current_token(conn)
+    start = date(2000, 1, 1)
+    with conn:
+        conn.executemany("INSERT INTO habit_logs (habit_id, value, date) VALUES (?, 1, ?)",
+                         [(habit_id, (start + timedelta(days=day)).isoformat())
+                          for day in range(JOURNAL_KEEP + 1000)])
+    assert changes_since(conn, token).full_reload
+
+
+def test_rollups_follow_every_write(conn, add_habit):
+    habits = [add_habit('Read', 'boolean', None), add_habit('Run', 'numeric', 5),
+              add_habit('Walk', 'numeric', None)]
+    rng = random.Random(4)
+    today = date.today()
+    for _ in range(30):
+        upsert_logs(conn, [(rng.choice(habits), today - timedelta(days=rng.randrange(60)),
+                            rng.choice([None, 0, 1, 2.5, 6])) for _ in range(5)])
+        with conn:
+            conn.execute("DELETE FROM habit_logs WHERE id = ?", (rng.randint(1, 50),))
+            conn.execute("INSERT OR REPLACE INTO habit_logs (habit_id, value, date) VALUES (?, ?, ?)",
+                         (rng.choice(habits), rng.random(),
+                          (today - timedelta(days=rng.randrange(60))).isoformat()))
+        assert check_rollups(conn) == []
+
+    with conn:
+        conn.execute("DELETE FROM habit_log_weeks")
+    assert check_rollups(conn) != []
+    with conn:
+        rebuild_rollups(conn)
+    assert check_rollups(conn) == []
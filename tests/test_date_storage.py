@@ -0,0 +1,53 @@
+from datetime import date
+from database import (convert_date_storage, date_storage_mode, ensure_date_storage,
+                      upsert_logs)
+from habit_rollups import check_rollups
+
+
+def stored_types(conn):
+    return {row[0] for row in conn.execute("SELECT DISTINCT typeof(date) FROM habit_logs")}
+
+
+def test_writers_follow_the_recorded_mode(conn, add_habit):
+    habit_id = add_habit('Read')
+    upsert_logs(conn, [(habit_id, date(2024, 2, 28), 1.0)])
+    convert_date_storage(conn, 'epoch_day')
+    assert date_storage_mode(conn) == 'epoch_day'
+
+    # DATE_STORAGE of this process is 'text'; the database's mode wins
+    upsert_logs(conn, [(habit_id, date(2024, 3, 1), 2.0)])
+    assert stored_types(conn) == {'integer'}
+    assert check_rollups(conn) == []
+
+    convert_date_storage(conn, 'text')
+    assert stored_types(conn) == {'text'}
+    assert conn.execute("SELECT date FROM habit_logs ORDER BY date").fetchall() == \
+        [('2024-02-28',), ('2024-03-01',)]
+
+
+def test_mixed_logs_keep_the_later_row(conn, add_habit):
+    habit_id = add_habit('Read')
+    upsert_logs(conn, [(habit_id, date(2024, 3, 1), 1.0), (habit_id, date(2024, 3, 2), 1.0)])
+    # As a writer from before the mode was recorded would have left them
+    with conn:
+        conn.execute("INSERT INTO habit_logs (habit_id, value, date) VALUES (?, 5.0, ?)",
+                     (habit_id, (date(2024, 3, 1) - date(1970, 1, 1)).days))
+        conn.execute("DELETE FROM settings WHERE key = 'dates_verified'")
+
+    assert ensure_date_storage(conn)
+    assert stored_types(conn) == {'text'}
+    assert conn.execute("SELECT date, value FROM habit_logs ORDER BY date").fetchall() == \
+        [('2024-03-01', 5.0), ('2024-03-02', 1.0)]
+    assert check_rollups(conn) == []
+
+
+def test_verified_database_is_not_scanned(conn, add_habit):
+    habit_id = add_habit('Read')
+    upsert_logs(conn, [(habit_id, date(2024, 3, 1), 1.0)])
+    assert not ensure_date_storage(conn)  # First check scans and records the result
+
+    statements = []
+    conn.set_trace_callback(statements.append)
+    assert not ensure_date_storage(conn)
+    conn.set_trace_callback(None)
+    assert not any('habit_logs' in statement for statement in statements)
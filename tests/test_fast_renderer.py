@@ -0,0 +1,21 @@
+from datetime import date, timedelta
+from habit_repository import HabitSeries
+from fast_renderer import PillowRenderer
+
+
+def habit(habit_id, name, days_ago, habit_type='boolean'):
+    series = HabitSeries(habit_id, name, habit_type, 1, 0)
+    series.log_dates = [(date.today() - timedelta(days=days_ago)).isoformat()]
+    series.log_values = [1.0]
+    return series
+
+
+def test_habit_with_only_future_logs():
+    renderer = PillowRenderer(800, 600, 100, 0.05)
+    assert renderer.render([habit(1, 'Later', -3), habit(2, 'Now', 3)]).size == (800, 600)
+    assert renderer.render([habit(1, 'Later', -3)]).size == (800, 600)
+
+
+def test_legend_wider_than_the_image():
+    renderer = PillowRenderer(1920, 1080, 100, 0.05)
+    assert renderer.render([habit(1, 'N' * 200, 30)]).size == (1920, 1080)
@@ -0,0 +1,21 @@
+import os
+from file_utils import atomic_write
+
+
+def test_atomic_write_replaces_and_leaves_no_temp_files(tmp_path):
+    path = tmp_path / 'index.json'
+    atomic_write(str(path), '{"a": 1}')
+    atomic_write(str(path), b'{"a": 2}', fsync=True)
+    assert path.read_text() == '{"a": 2}'
+    assert os.listdir(tmp_path) == ['index.json']
+
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = tmp_path / 'index.json'
+    atomic_write(str(path), 'old')
+    try:
+        atomic_write(str(path), object())
+    except TypeError:
+        pass
+    assert path.read_text() == 'old'
+    assert os.listdir(tmp_path) == ['index.json']
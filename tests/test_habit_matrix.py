@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+from database import upsert_logs
+from habit_matrix import HabitMatrix
+
+
+def test_refresh_applies_log_changes(conn, add_habit):
+    habit_id = add_habit('Read')
+    today = date.today()
+    upsert_logs(conn, [(habit_id, today - timedelta(days=3), 2.0)])
+    matrix = HabitMatrix.for_database(conn)
+    assert matrix.check() == []
+
+    upsert_logs(conn, [(habit_id, today - timedelta(days=1), 5.0),
+                       (habit_id, today - timedelta(days=10), 1.0)])
+    with conn:
+        conn.execute("DELETE FROM habit_logs WHERE value = 2.0")
+    assert matrix.refresh()
+    assert matrix.check() == []
+
+
+def test_log_added_and_deleted_between_refreshes(conn, add_habit):
+    # The habit has no logs at either refresh, but the journal has a change
+    habit_id = add_habit('Read')
+    matrix = HabitMatrix.for_database(conn)
+    matrix.refresh()
+
+    upsert_logs(conn, [(habit_id, date.today(), 1.0)])
+    with conn:
+        conn.execute("DELETE FROM habit_logs WHERE habit_id = ?", (habit_id,))
+    matrix.refresh()
+    assert matrix.check() == []
+    assert len(matrix.series(habit_id)[0]) == 0
+
+
+def test_added_and_deleted_habits(conn, add_habit):
+    first = add_habit('Read')
+    matrix = HabitMatrix.for_database(conn)
+    matrix.refresh()
+
+    second = add_habit('Run')
+    upsert_logs(conn, [(second, date.today(), 3.0)])
+    with conn:
+        conn.execute("DELETE FROM habits WHERE id = ?", (first,))
+    matrix.refresh()
+    assert matrix.check() == []
+    assert matrix.series(first) is None
@@ -0,0 +1,83 @@
+import random
+from datetime import date, timedelta
+import pytest
+from database import EPOCH, upsert_logs
+from habit_repository import HabitRepository, HabitSeries
+from habit_stats import WINDOWS, HabitStatsTable, compute_stats, stats_from_logs
+
+
+def as_tuple(stats):
+    return (stats.current_streak, stats.longest_streak,
+            [pytest.approx(stats.rates[days], nan_ok=True) for days in WINDOWS],
+            [pytest.approx(stats.means[days], nan_ok=True) for days in WINDOWS])
+
+
+def written(statements):
+    return [s for s in statements if s.lstrip().split()[0].upper() in ('INSERT', 'UPDATE', 'DELETE')]
+
+
+@pytest.mark.parametrize('habit_type, target_value, default_value', [
+    ('boolean', None, 0), ('boolean', None, None), ('numeric', 3, 1), ('numeric', None, None),
+])
+def test_stats_from_logs_matches_compute_stats(habit_type, target_value, default_value):
+    rng = random.Random(5)
+    today = date.today()
+    for _ in range(20):
+        logs = {}
+        for _ in range(rng.randrange(60)):
+            day = today + timedelta(days=rng.randint(-150, 2))  # Some after today
+            logs[day] = rng.choice([None, 0, 1, 2, 3, 4.5])
+        series = HabitSeries(1, 'Habit', habit_type, target_value, default_value)
+        for day in sorted(logs):
+            series.log_dates.append(day)
+            series.log_values.append(logs[day])
+
+        expected = compute_stats([series])[1]
+        stats = stats_from_logs(1, {(day - EPOCH).days: value for day, value in logs.items()},
+                                habit_type, target_value, default_value, (today - EPOCH).days)
+        assert as_tuple(stats) == as_tuple(expected)
+
+
+def test_writes_update_the_stats_in_their_transaction(conn, add_habit):
+    habit_id = add_habit('Run', habit_type='boolean')
+    today = date.today()
+    upsert_logs(conn, [(habit_id, today - timedelta(days=day), 1) for day in range(3)])
+
+    row = conn.execute("SELECT as_of, current_streak, rate_7 FROM habit_stats WHERE habit_id = ?",
+                       (habit_id,)).fetchone()
+    assert row == (today.isoformat(), 3, 1.0)
+
+    # Nothing is left for a reader to store
+    statements = []
+    conn.set_trace_callback(statements.append)
+    stats = HabitStatsTable(conn, HabitRepository(conn)).load()
+    conn.set_trace_callback(None)
+    assert stats[habit_id].current_streak == 3
+    assert written(statements) == []
+
+
+def test_reads_compute_stale_rows_without_writing(conn, add_habit):
+    habit_id = add_habit('Run', habit_type='boolean')
+    other_id = add_habit('Read', habit_type='boolean')
+    today = date.today()
+    upsert_logs(conn, [(habit_id, today, 1), (other_id, today, 1)])
+    # A new day, and a write that did not update the table
+    with conn:
+        conn.execute("UPDATE habit_stats SET as_of = '2000-01-01' WHERE habit_id = ?", (habit_id,))
+        conn.execute("DELETE FROM habit_logs WHERE habit_id = ?", (other_id,))
+    before = conn.execute("SELECT * FROM habit_stats ORDER BY habit_id").fetchall()
+
+    statements = []
+    conn.set_trace_callback(statements.append)
+    table = HabitStatsTable(conn, HabitRepository(conn))
+    stats = table.load()
+    series = HabitRepository(conn).load_all_series()
+    table.attach(series)
+    conn.set_trace_callback(None)
+
+    assert written(statements) == []
+    assert conn.execute("SELECT * FROM habit_stats ORDER BY habit_id").fetchall() == before
+    assert stats[habit_id].current_streak == 1
+    assert stats[other_id].current_streak == 0
+    assert {habit.habit_id: habit.stats.current_streak for habit in series} == \
+        {habit_id: 1, other_id: 0}
@@ -0,0 +1,76 @@
+import random
+from datetime import date, timedelta
+import pytest
+from database import upsert_logs
+from habit_matrix import HabitMatrix
+from habit_repository import HabitRepository
+from habit_rollups import check_rollups
+from habit_stats import WINDOWS, compute_stats
+from habit_tracker import HabitTracker
+
+
+@pytest.fixture
+def tracker(conn, tmp_path, monkeypatch):
+    """A HabitTracker on the conn fixture's database"""
+    monkeypatch.chdir(tmp_path)  # HabitTracker opens habits.db in the working directory
+    tracker = HabitTracker()
+    yield tracker
+    tracker.close()
+
+
+def answers(monkeypatch, *replies):
+    replies = iter(replies)
+    monkeypatch.setattr('builtins.input', lambda prompt='': next(replies))
+
+
+def stored_stats(conn):
+    return {row[0]: row[1:] for row in conn.execute(f"""
+        SELECT habit_id, as_of, current_streak, longest_streak,
+               {', '.join(f'rate_{days}' for days in WINDOWS)},
+               {', '.join(f'mean_{days}' for days in WINDOWS)}
+        FROM habit_stats
+    """)}
+
+
+def assert_derived_tables_match(conn, matrix):
+    assert check_rollups(conn) == []
+    assert matrix.check() == []
+    today = date.today().isoformat()
+    expected = {habit_id: (today, s.current_streak, s.longest_streak,
+                           *(pytest.approx(s.rates[days]) for days in WINDOWS),
+                           *(pytest.approx(s.means[days]) for days in WINDOWS))
+                for habit_id, s in compute_stats(HabitRepository(conn).load_all_series()).items()}
+    assert stored_stats(conn) == expected
+
+
+def test_every_write_path_keeps_derived_tables_current(tracker, add_habit, monkeypatch):
+    conn = tracker.conn
+    today = date.today()
+    rng = random.Random(5)
+    habits = [add_habit(f'Habit {i}', 'boolean', 1) for i in range(4)]
+    upsert_logs(conn, [(habit_id, today - timedelta(days=day), rng.randint(0, 1))
+                       for habit_id in habits for day in range(0, 120, 2)])
+    matrix = HabitMatrix.for_database(conn)
+    matrix.rebuild()
+    assert_derived_tables_match(conn, matrix)
+
+    for _ in range(5):
+        habit_id = rng.choice(habits)
+        tracker.set_log(habit_id, today - timedelta(days=rng.randrange(120)), rng.randint(0, 1))
+        assert_derived_tables_match(conn, matrix)
+
+        tracker.set_logs([(rng.choice(habits), today - timedelta(days=rng.randrange(30)),
+                           rng.randint(0, 1)) for _ in range(5)])
+        assert_derived_tables_match(conn, matrix)
+
+        # Logs today twice, the second time overwriting the first
+        for reply in ('y', 'n'):
+            answers(monkeypatch, str(habit_id), 'y', reply)
+            tracker.log_habit()
+        assert tracker.get_log(habit_id, today) == 0
+        assert_derived_tables_match(conn, matrix)
+
+    answers(monkeypatch, str(habits[-1]), 'y')
+    tracker.delete_habit()
+    assert conn.execute("SELECT COUNT(*) FROM habits WHERE id = ?", (habits[-1],)).fetchone()[0] == 0
+    assert_derived_tables_match(conn, matrix)
@@ -0,0 +1,30 @@
+from datetime import date, timedelta
+import numpy as np
+from downsample import downsample_minmax
+from habit_repository import HabitSeries
+from plot_utils import create_habit_progress_plot, habit_line_gid, max_line_points
+
+
+def long_habit(days):
+    series = HabitSeries(1, 'Long', 'numeric', 5, 0)
+    series.log_dates = [(date.today() - timedelta(days=i)).isoformat() for i in range(days)][::-1]
+    series.log_values = [float(i % 7) for i in range(days)]
+    return series
+
+
+def test_downsampling_is_repeatable_from_the_figure_size():
+    # patch_progress_plot reduces a habit's series again to update its line
+    habit = long_habit(900)
+    fig, ax = create_habit_progress_plot([habit], figsize=(12, 6), layout=False)
+    line = next(l for l in ax.get_lines() if l.get_gid() == habit_line_gid(1))
+    days, values = downsample_minmax(*habit.densify(end=date.today()), max_line_points(12))
+    assert len(days) < 900
+    assert np.array_equal(line.get_xdata(), days)
+    assert np.array_equal(line.get_ydata(), values)
+
+
+def test_habit_with_only_future_logs_is_skipped():
+    habit = long_habit(1)
+    habit.log_dates = [(date.today() + timedelta(days=3)).isoformat()]
+    fig, ax = create_habit_progress_plot([habit], layout=False)
+    assert ax.get_lines() == []
@@ -0,0 +1,32 @@
+import os
+from render_cache import RenderCache
+
+
+def wallpaper(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b'png')
+    return str(path)
+
+
+def test_instances_keep_each_others_entries(tmp_path):
+    index = str(tmp_path / 'render_cache.json')
+    daemon, cli = RenderCache(index), RenderCache(index)
+    daemon.store('a', wallpaper(tmp_path, 'a.png'))
+    cli.store('b', wallpaper(tmp_path, 'b.png'))
+    daemon.store('c', wallpaper(tmp_path, 'c.png'))
+
+    cache = RenderCache(index)
+    assert [cache.lookup(fp) is not None for fp in 'abc'] == [True, True, True]
+    assert daemon.last == 'c'
+
+
+def test_hit_on_the_current_wallpaper_writes_nothing(tmp_path):
+    index = str(tmp_path / 'render_cache.json')
+    cache = RenderCache(index)
+    cache.store('a', wallpaper(tmp_path, 'a.png'))
+    before = os.stat(index).st_ino
+
+    assert cache.lookup('a') is not None
+    assert cache.lookup('missing') is None
+    assert os.stat(index).st_ino == before
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'entries': 1}
@@ -0,0 +1,36 @@
+import os
+from PIL import Image
+from tile_cache import TileCache
+
+
+def tile():
+    return Image.new('RGBA', (4, 4), (255, 0, 0, 255))
+
+
+def test_instances_keep_each_others_tiles(tmp_path):
+    daemon, gui = TileCache(str(tmp_path)), TileCache(str(tmp_path))
+    daemon.put('a', tile())
+    gui.put('b', tile())
+    daemon.put('c', tile())
+
+    cache = TileCache(str(tmp_path))
+    assert all(cache.get(key) is not None for key in 'abc')
+    assert cache.stats() == {'hits': 3, 'misses': 0, 'entries': 3}
+
+
+def test_eviction_removes_the_files_of_every_instance(tmp_path):
+    first, second = TileCache(str(tmp_path), max_entries=2), TileCache(str(tmp_path), max_entries=2)
+    for i, cache in enumerate([first, second, first, second]):
+        cache.put(f'key{i}', tile())
+    tiles = sorted(name for name in os.listdir(tmp_path) if name.startswith('tile_'))
+    assert tiles == ['tile_key2.png', 'tile_key3.png']
+
+
+def test_hit_on_a_recent_tile_writes_nothing(tmp_path):
+    cache = TileCache(str(tmp_path))
+    cache.put('a', tile())
+    index = os.path.join(str(tmp_path), TileCache.INDEX_NAME)
+    before = os.stat(index).st_ino
+    assert cache.get('a') is not None
+    assert cache.get('missing') is None
+    assert os.stat(index).st_ino == before
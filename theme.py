@@ -0,0 +1,55 @@
+"""
+Colors and line styles for habit plots, shared by the matplotlib and Pillow
+renderers. They are passed to each artist explicitly instead of through
+matplotlib's global style, so figures can be built on any thread without
+affecting each other.
+"""
+
+# Figure and plot area background
+BACKGROUND = '#1E1E1E'
+# Titles, axis labels and tick labels
+TEXT = '#D8DEE9'
+# Spines and legend frame
+BORDER = '#404040'
+
+# Soft, muted colors for habits with good contrast
+HABIT_COLORS = [
+    '#81A1C1',  # Soft blue
+    '#B48EAD',  # Soft purple
+    '#A3BE8C',  # Soft green
+    '#EBCB8B',  # Soft yellow
+    '#D08770',  # Soft orange
+    '#88C0D0',  # Light blue
+    '#BF616A',  # Soft red
+]
+
+# Habit lines, in points
+LINE_WIDTH = 2.5
+LINE_ALPHA = 0.8
+MARKER_SIZE = 5
+# Markers are drawn only while points are at least this many marker
+# widths apart; denser series are drawn as plain lines
+MARKER_SPACING = 3
+# Dashed target lines
+TARGET_WIDTH = 1.5
+TARGET_ALPHA = 0.4
+# Boolean targets are all at 1, so each is nudged up to keep them apart
+TARGET_OFFSET = 0.02
+
+# Legends placed by the GUI and the wallpaper, matching how they looked
+# under the 'dark_background' style
+LEGEND_FACE = 'black'
+LEGEND_EDGE = '0.8'
+LEGEND_TEXT = 'white'
+
+
+def habit_color(index):
+    return HABIT_COLORS[index % len(HABIT_COLORS)]
+
+
+def legend(ax, **kwargs):
+    """ax.legend() with the theme's colors unless given explicitly"""
+    kwargs.setdefault('facecolor', LEGEND_FACE)
+    kwargs.setdefault('edgecolor', LEGEND_EDGE)
+    kwargs.setdefault('labelcolor', LEGEND_TEXT)
+    return ax.legend(**kwargs)
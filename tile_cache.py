@@ -0,0 +1,113 @@
+import contextlib
+import io
+import json
+import os
+import time
+from file_utils import atomic_write, file_lock
+
+# How stale a tile's last use may get before a hit records it again
+TOUCH_INTERVAL = 60 * 60
+
+
+class TileCache:
+    """
+    Rendered wallpaper tiles on disk, one PNG per key, so a tiled wallpaper
+    only re-renders the habits whose data changed. An index records when
+    each tile was last used; the least recently used ones beyond
+    max_entries are deleted.
+
+    Like RenderCache, changes are made under a file lock to the index as it
+    is on disk, so processes sharing the directory keep each other's tiles,
+    and hits and misses are counted per instance.
+    """
+
+    INDEX_NAME = 'index.json'
+    LOCK_NAME = 'index.lock'
+
+    def __init__(self, directory, max_entries=128):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._state = self._load()
+
+    def get(self, key):
+        """The cached tile for key as an RGBA image, or None on a miss"""
+        from PIL import Image
+
+        # Entries can be evicted by another process at any time, so a tile
+        # that cannot be read is a miss
+        try:
+            with Image.open(self._path(key)) as tile:
+                img = tile.convert('RGBA')
+        except OSError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        now = time.time()
+        entry = self._state['entries'].get(key)
+        if entry is None or now - entry['last_used'] > TOUCH_INTERVAL:
+            with self._locked():
+                # Also indexes a tile left without an entry, so it is evicted
+                # in turn rather than kept forever
+                self._state['entries'][key] = {'last_used': now}
+                self._evict()
+                self._save()
+        return img
+
+    def put(self, key, img):
+        """Store a freshly rendered tile for key"""
+        # Tiles are re-read, not published, so favour encode speed over size
+        buffer = io.BytesIO()
+        img.save(buffer, 'PNG', compress_level=1)
+
+        with self._locked():
+            atomic_write(self._path(key), buffer.getvalue())
+            self._state['entries'][key] = {'last_used': time.time()}
+            self._evict()
+            self._save()
+
+    def stats(self):
+        """Hits and misses of this instance, and current size of the cache"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._state['entries']),
+        }
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'tile_{key[:32]}.png')
+
+    def _evict(self):
+        entries = self._state['entries']
+        if len(entries) <= self.max_entries:
+            return
+        by_age = sorted(entries, key=lambda key: entries[key]['last_used'])
+        for key in by_age[:len(entries) - self.max_entries]:
+            del entries[key]
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.directory, self.INDEX_NAME)) as f:
+                state = json.load(f)
+            if isinstance(state.get('entries'), dict):
+                return state
+        except (OSError, ValueError):
+            pass
+        return {'entries': {}}
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Hold the directory's lock, with the index reloaded from disk"""
+        with file_lock(os.path.join(self.directory, self.LOCK_NAME)):
+            self._state = self._load()
+            yield
+
+    def _save(self):
+        atomic_write(os.path.join(self.directory, self.INDEX_NAME), json.dumps(self._state))
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import argparse
 import os
 import sys
 
@@ -10,9 +11,30 @@ from habit_tracker import HabitTracker
 from wallpaper_generator import WallpaperGenerator
 
 def main():
+    parser = argparse.ArgumentParser(description='Render and set the habit wallpaper')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-render even if nothing changed since the last run')
+    parser.add_argument('--stats', action='store_true',
+                        help='Print render cache and encoder statistics')
+    args = parser.parse_args()
+    
     habit_tracker = HabitTracker()
     wallpaper_generator = WallpaperGenerator(habit_tracker)
-    wallpaper_generator.update_wallpaper()
+    wallpaper_generator.update_wallpaper(force=args.force)
+    
+    if args.stats:
+        stats = wallpaper_generator.render_cache.stats()
+        print(f"Render cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} entries")
+        stats = wallpaper_generator.layout_cache.stats()
+        print(f"Layout cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} entries")
+        if wallpaper_generator.tile_cache:
+            stats = wallpaper_generator.tile_cache.stats()
+            print(f"Tile cache: {stats['hits']} hits, {stats['misses']} misses, "
+                  f"{stats['entries']} entries")
+        if wallpaper_generator.encoder.last_stats:
+            print(f"Encoder: {wallpaper_generator.encoder.last_stats}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Long-lived wallpaper updater.
+
+Keeps a warm HabitTracker and WallpaperGenerator in memory and re-renders
+only when the database changes or the date rolls over, instead of starting
+a fresh interpreter on every cron tick.
+"""
+import argparse
+import fcntl
+import math
+import os
+import select
+import signal
+import subprocess
+import sys
+import time
+from datetime import date
+
+# Add project directory to Python path
+project_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_dir)
+
+LOCK_PATH = os.path.join(project_dir, 'wallpaper_daemon.lock')
+LOG_PATH = os.path.join(project_dir, 'wallpaper_daemon.log')
+
+
+def running_pid():
+    """Return the pid of the running daemon, or None if it is not running"""
+    try:
+        fd = os.open(LOCK_PATH, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+
+    try:
+        # The daemon holds an exclusive lock for as long as it runs
+        fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        return None
+    except BlockingIOError:
+        content = os.read(fd, 32).decode().strip()
+        return int(content) if content.isdigit() else None
+    finally:
+        os.close(fd)
+
+
+def ensure_running(poll_interval=5):
+    """Start the daemon in the background unless it is already running"""
+    if running_pid() is not None:
+        return False
+
+    command = [sys.executable, os.path.abspath(__file__), '--interval', str(poll_interval)]
+    with open(LOG_PATH, 'a') as log, open(os.devnull) as devnull:
+        subprocess.Popen(command,
+                         cwd=os.getcwd(),
+                         stdin=devnull,
+                         stdout=log,
+                         stderr=log,
+                         start_new_session=True)
+    return True
+
+
+def stop(timeout=30):
+    """
+    Stop the running daemon and wait until it has released its lock, so a
+    new one can start right away. The daemon finishes a poll in progress
+    first; if it has not exited after timeout seconds it is killed.
+    Returns False if it was not running.
+    """
+    pid = running_pid()
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + timeout
+        while running_pid() == pid:
+            if time.monotonic() > deadline:
+                os.kill(pid, signal.SIGKILL)
+                deadline = math.inf
+            time.sleep(0.05)
+    except ProcessLookupError:
+        pass  # Exited meanwhile
+    return True
+
+
+class WallpaperDaemon:
+    def __init__(self, poll_interval=5):
+        # Imported here so the --ensure and --stop paths stay cheap
+        from habit_tracker import HabitTracker
+        from wallpaper_generator import WallpaperGenerator
+
+        self.habit_tracker = HabitTracker()
+        self.wallpaper_generator = WallpaperGenerator(self.habit_tracker)
+        self.poll_interval = poll_interval
+        self._last_state = None
+        self._running = False
+
+    def current_state(self):
+        """
+        Changes whenever another connection commits to the database
+        or the date changes.
+        """
+        data_version = self.habit_tracker.conn.execute("PRAGMA data_version").fetchone()[0]
+        return data_version, date.today()
+
+    def poll(self):
+        """Re-render if anything changed since the last poll. Returns True if it did."""
+        state = self.current_state()
+        if state == self._last_state:
+            return False
+
+        try:
+            self.wallpaper_generator.update_wallpaper()
+        except Exception as e:
+            # Keep running; the next change gets another attempt
+            print(f"Error updating wallpaper: {e}", file=sys.stderr, flush=True)
+        self._last_state = state
+        return True
+
+    def run(self):
+        lock_fd = os.open(LOCK_PATH, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(lock_fd)
+            print("Wallpaper daemon is already running", file=sys.stderr)
+            return 1
+
+        os.ftruncate(lock_fd, 0)
+        os.write(lock_fd, str(os.getpid()).encode())
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        # Signals also write a byte to this pipe, which ends the wait between
+        # polls, so stop() does not have to wait out a whole interval
+        wake_fd, signal_fd = os.pipe()
+        os.set_blocking(signal_fd, False)
+        signal.set_wakeup_fd(signal_fd)
+
+        self._running = True
+        try:
+            while self._running:
+                self.poll()
+                select.select([wake_fd], [], [], self.poll_interval)
+        finally:
+            signal.set_wakeup_fd(-1)
+            os.close(wake_fd)
+            os.close(signal_fd)
+            os.close(lock_fd)
+        return 0
+
+    def _handle_stop(self, signum, frame):
+        self._running = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Keep the habit wallpaper up to date')
+    parser.add_argument('--interval', type=float, default=5,
+                        help='Seconds between checks for changes (default: 5)')
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument('--ensure', action='store_true',
+                        help='Start the daemon in the background if it is not running')
+    action.add_argument('--stop', action='store_true',
+                        help='Stop the running daemon')
+    args = parser.parse_args()
+
+    if args.ensure:
+        ensure_running(args.interval)
+        return 0
+    if args.stop:
+        return 0 if stop() else 1
+
+    return WallpaperDaemon(poll_interval=args.interval).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
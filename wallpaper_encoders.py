@@ -0,0 +1,138 @@
+import io
+import time
+
+
+class EncodeStats:
+    """Time taken and bytes produced by one encode"""
+
+    def __init__(self, encoder, seconds, size):
+        self.encoder = encoder
+        self.seconds = seconds
+        self.size = size
+
+    def __repr__(self):
+        return f'{self.encoder}: {self.seconds * 1000:.1f} ms, {self.size} bytes'
+
+
+class WallpaperEncoder:
+    """Base class for output formats. Subclasses implement _save."""
+
+    name = None
+    extension = None
+
+    def __init__(self):
+        self.last_stats = None
+
+    @property
+    def spec(self):
+        """String that identifies this encoder and its settings"""
+        return self.name
+
+    def encode(self, img):
+        """Encode an RGBA image and return the file contents as bytes"""
+        start = time.perf_counter()
+        buffer = io.BytesIO()
+        self._save(img, buffer)
+        data = buffer.getvalue()
+        self.last_stats = EncodeStats(self.spec, time.perf_counter() - start, len(data))
+        return data
+
+    def _save(self, img, fp):
+        raise NotImplementedError
+
+
+class PNGEncoder(WallpaperEncoder):
+    """Lossless PNG; lower compression levels trade size for speed"""
+
+    name = 'png'
+    extension = 'png'
+
+    def __init__(self, compress_level=6):
+        super().__init__()
+        self.compress_level = int(compress_level)
+
+    @property
+    def spec(self):
+        return f'{self.name}:{self.compress_level}'
+
+    def _save(self, img, fp):
+        img.save(fp, 'PNG', compress_level=self.compress_level)
+
+
+class PalettePNGEncoder(WallpaperEncoder):
+    """
+    PNG quantized to a small palette. The chart only uses a handful of
+    theme colors plus their antialiased blends, so this is near-lossless.
+    """
+
+    name = 'png-palette'
+    extension = 'png'
+
+    def __init__(self, colors=64):
+        super().__init__()
+        self.colors = int(colors)
+
+    @property
+    def spec(self):
+        return f'{self.name}:{self.colors}'
+
+    def _save(self, img, fp):
+        from PIL import Image  # Only needed here; keeps importing encoders cheap
+        quantized = img.convert('RGB').quantize(colors=self.colors,
+                                                method=Image.Quantize.FASTOCTREE)
+        quantized.save(fp, 'PNG', compress_level=6)
+
+
+class WebPEncoder(WallpaperEncoder):
+    """Lossy WebP, or lossless when quality is 100"""
+
+    name = 'webp'
+    extension = 'webp'
+
+    def __init__(self, quality=90):
+        super().__init__()
+        self.quality = int(quality)
+
+    @property
+    def spec(self):
+        return f'{self.name}:{self.quality}'
+
+    def _save(self, img, fp):
+        img.save(fp, 'WEBP', quality=self.quality, lossless=self.quality >= 100, method=4)
+
+
+class JPEGEncoder(WallpaperEncoder):
+    """Lossy JPEG; fast to encode but blurs thin lines at low quality"""
+
+    name = 'jpeg'
+    extension = 'jpg'
+
+    def __init__(self, quality=90):
+        super().__init__()
+        self.quality = int(quality)
+
+    @property
+    def spec(self):
+        return f'{self.name}:{self.quality}'
+
+    def _save(self, img, fp):
+        img.convert('RGB').save(fp, 'JPEG', quality=self.quality)
+
+
+ENCODERS = {
+    encoder.name: encoder
+    for encoder in (PNGEncoder, PalettePNGEncoder, WebPEncoder, JPEGEncoder)
+}
+
+
+def get_encoder(spec):
+    """
+    Create an encoder from a spec such as 'png', 'png:1', 'png-palette:32',
+    'webp:80' or 'jpeg:90'. The optional number is the compression level,
+    palette size or quality, depending on the format.
+    """
+    name, _, option = spec.strip().lower().partition(':')
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown wallpaper format '{name}'. "
+                         f"Choose from: {', '.join(ENCODERS)}")
+    return ENCODERS[name](option) if option else ENCODERS[name]()
@@ -1,14 +1,47 @@
+import math
 import os
-from PIL import Image
-import matplotlib.pyplot as plt
-from datetime import datetime
-from plot_utils import create_habit_progress_plot
+from datetime import date
+from habit_repository import HabitRepository
+from render_cache import RenderCache
+from layout_cache import LayoutCache
+from tile_cache import TileCache
+from wallpaper_store import WallpaperStore
+from wallpaper_encoders import get_encoder
+from config import WALLPAPER_FORMAT, WALLPAPER_RENDERER, WALLPAPER_LAYOUT, HABIT_MATRIX
+
+RENDERERS = ('matplotlib', 'pillow')
+LAYOUTS = ('combined', 'tiles')
+
+# matplotlib, NumPy and PIL are imported only when rendering, so runs that
+# exit early (no habits, or a cached render) start quickly
 
 class WallpaperGenerator:
-    def __init__(self, habit_tracker):
+    # Bump whenever a code change alters the rendered image, so cached
+    # renders from older versions are not reused
+    RENDER_VERSION = 4
+    
+    # Width to height ratio the tiled layout aims for when choosing its grid
+    TILE_ASPECT = 2.0
+    
+    def __init__(self, habit_tracker, encoder=None, renderer=None, layout=None):
         self.habit_tracker = habit_tracker
+        self.encoder = encoder or get_encoder(WALLPAPER_FORMAT)
+        self.renderer = renderer or WALLPAPER_RENDERER
+        if self.renderer not in RENDERERS:
+            raise ValueError(f"Unknown WALLPAPER_RENDERER '{self.renderer}'. "
+                             f"Choose from: {', '.join(RENDERERS)}")
+        self.layout = layout or WALLPAPER_LAYOUT
+        if self.layout not in LAYOUTS:
+            raise ValueError(f"Unknown WALLPAPER_LAYOUT '{self.layout}'. "
+                             f"Choose from: {', '.join(LAYOUTS)}")
+        self.repository = HabitRepository(habit_tracker.conn, use_matrix=HABIT_MATRIX)
         self.wallpaper_dir = 'wallpapers'
-        os.makedirs(self.wallpaper_dir, exist_ok=True)
+        self.store = WallpaperStore(self.wallpaper_dir)
+        self.render_cache = RenderCache(os.path.join(self.wallpaper_dir, 'render_cache.json'))
+        self.layout_cache = LayoutCache(os.path.join(self.wallpaper_dir, 'layout_cache.json'))
+        self.tile_cache = None
+        if self.layout == 'tiles':
+            self.tile_cache = TileCache(os.path.join(self.wallpaper_dir, 'tiles'))
         
         # Fixed resolution for wallpaper
         self.width = 3546
@@ -22,67 +55,220 @@ class WallpaperGenerator:
         self.dpi = 200
         self.figsize = (self.width/self.dpi, self.height/self.dpi)
     
-    def update_wallpaper(self):
-        # Get all habits
-        self.habit_tracker.cursor.execute("SELECT id FROM habits ORDER BY name")
-        habits = self.habit_tracker.cursor.fetchall()
-        habit_ids = [h[0] for h in habits]
+    def fingerprint(self):
+        """
+        Cheap hash of everything the wallpaper depends on: habit rows, the
+        data version, today's date and the layout parameters.
+        Returns None when there are no habits to render.
+        """
+        habits = self.habit_tracker.conn.execute("""
+            SELECT id, name, type, target_value, default_value
+            FROM habits ORDER BY name
+        """).fetchall()
+        if not habits:
+            return None
         
-        if not habit_ids:
-            return
+        return RenderCache.fingerprint(
+            habits,
+            self._data_version(),
+            date.today().isoformat(),
+            [self.width, self.height, self.dpi, self.padding_percent],
+            self.encoder.spec,
+            self.renderer,
+            self.layout,
+            self.RENDER_VERSION
+        )
+    
+    def _data_version(self):
+        """
+        The change journal's latest sequence number, which advances on every
+        write to habits or logs. Databases without the journal fall back to
+        the size and mtime of the database file and its WAL.
+        """
+        token = self.habit_tracker.change_token()
+        if token is not None:
+            return token
+        
+        db_path = self.habit_tracker.conn.execute("PRAGMA database_list").fetchone()[2]
+        version = []
+        for path in (db_path, f'{db_path}-wal'):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stat = None
+            # Opening the database recreates an empty WAL, which holds no
+            # data, so only its presence with content counts
+            if stat is None or stat.st_size == 0:
+                version.append(None)
+            else:
+                version.append([stat.st_size, stat.st_mtime_ns])
+        return version
+    
+    def update_wallpaper(self, force=False):
+        """
+        Render and set the wallpaper, returning its path.
+        Exits early without rendering when the inputs match a cached render,
+        unless force is set.
+        """
+        fingerprint = self.fingerprint()
+        if fingerprint is None:
+            return None
+        
+        if not force:
+            is_current = fingerprint == self.render_cache.last
+            cached_path = self.render_cache.lookup(fingerprint)
+            if cached_path:
+                if not is_current:
+                    self.store.touch(cached_path)
+                    self.set_wallpaper(cached_path)
+                return cached_path
+        
+        # Get all habits with their logs, and their stats from the summary table
+        series = self.repository.load_all_series()
+        
+        if not series:
+            return None
+        from habit_stats import HabitStatsTable
+        HabitStatsTable(self.habit_tracker.conn, self.repository).attach(series)
+        
+        # Render straight to pixels and encode once
+        img = self.render(series)
+        data = self.encoder.encode(img)
+        
+        # Identical renders map to the same file; old ones are pruned by the store
+        wallpaper_path = self.store.put(data, self.encoder.extension)
+        
+        self.render_cache.store(fingerprint, wallpaper_path)
+        self.set_wallpaper(wallpaper_path)
+        return wallpaper_path
+    
+    def render(self, series):
+        """The wallpaper as an RGBA image, drawn by the configured renderer and layout"""
+        if self.layout == 'tiles':
+            return self.render_tiles(series)
+        if self.renderer == 'pillow':
+            from fast_renderer import PillowRenderer
+            renderer = PillowRenderer(self.width, self.height, self.dpi, self.padding_percent)
+            return renderer.render(series)
+        return self.render_image(self.create_figure(series))
+    
+    def create_figure(self, series):
+        """
+        The wallpaper Figure for the given habit series. Safe to call from
+        several threads at once, as it never touches pyplot or global state.
+        """
+        from plot_utils import create_habit_progress_plot
+        import theme
         
         # Create the plot using shared logic
         fig, ax = create_habit_progress_plot(
-            self.habit_tracker,
-            habit_ids,
+            series,
             figsize=self.figsize,
-            dpi=self.dpi
+            dpi=self.dpi,
+            layout=False
         )
         
         # Adjust legend position and size for wallpaper
-        ax.legend(bbox_to_anchor=(1.02, 0.5),  # Center legend vertically
-                 loc='center left',
-                 borderaxespad=0,
-                 frameon=True,
-                 fancybox=True,
-                 shadow=True,
-                 fontsize=12)
-        
-        # Adjust layout to ensure content stays in safe area (middle 60%)
-        fig.tight_layout(rect=[0.02,                    # Left padding
-                              self.padding_percent,      # Bottom padding (20%)
-                              0.92,                      # Right padding for legend (reduced)
-                              1 - self.padding_percent]) # Top padding (20%)
-        
-        # Clean up old wallpapers
-        for file in os.listdir(self.wallpaper_dir):
-            if file.startswith('wallpaper_') and file.endswith('.png'):
-                try:
-                    os.remove(os.path.join(self.wallpaper_dir, file))
-                except:
-                    pass
-        
-        # Save new wallpaper with timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        wallpaper_path = os.path.join(self.wallpaper_dir, f'wallpaper_{timestamp}.png')
-        
-        # Save with dark background
-        fig.patch.set_facecolor('#1E1E1E')
-        fig.savefig(wallpaper_path, 
-                   dpi=self.dpi,
-                   bbox_inches=None,
-                   facecolor='#1E1E1E',  # Ensure dark background is saved
-                   edgecolor='none',
-                   pad_inches=0)
-        plt.close(fig)
-        
-        # Ensure exact resolution with PIL
-        img = Image.open(wallpaper_path)
-        if img.size != (self.width, self.height):
-            img = img.resize((self.width, self.height), Image.Resampling.LANCZOS)
-            # Convert to RGBA to ensure transparency is handled correctly
-            img = img.convert('RGBA')
-            img.save(wallpaper_path)
+        theme.legend(ax,
+                     bbox_to_anchor=(1.02, 0.5),  # Center legend vertically
+                     loc='center left',
+                     borderaxespad=0,
+                     frameon=True,
+                     fancybox=True,
+                     shadow=True,
+                     fontsize=12)
+        
+        # Adjust layout to ensure content stays in safe area (middle 60%),
+        # reusing the previous layout when labels and ranges are unchanged
+        self.layout_cache.apply(fig, ax, [0.02,                     # Left padding
+                                          self.padding_percent,      # Bottom padding (20%)
+                                          0.92,                      # Right padding for legend (reduced)
+                                          1 - self.padding_percent]) # Top padding (20%)
+        
+        fig.patch.set_facecolor(theme.BACKGROUND)
+        return fig
+    
+    def tile_grid(self, count):
+        """
+        (columns, rows, tile width, tile height) for count tiles filling the
+        safe area, with the column count that gives tiles closest to TILE_ASPECT
+        """
+        area_width = self.width * 0.96
+        area_height = self.safe_height
+        
+        def aspect_error(columns):
+            rows = math.ceil(count / columns)
+            return abs(math.log(area_width / columns * rows / area_height / self.TILE_ASPECT))
+        
+        columns = min(range(1, count + 1), key=aspect_error)
+        rows = math.ceil(count / columns)
+        return columns, rows, int(area_width // columns), int(area_height // rows)
+    
+    def tile_key(self, habit, color_index, size):
+        """Fingerprint of everything one habit's tile depends on"""
+        return RenderCache.fingerprint(
+            [habit.habit_id, habit.name, habit.habit_type, habit.target_value, habit.default_value],
+            habit.data_digest(),
+            color_index,
+            date.today().isoformat(),
+            [size, self.dpi],
+            self.RENDER_VERSION
+        )
+    
+    def render_tiles(self, series):
+        """
+        The wallpaper as a grid of one tile per habit in the safe area.
+        Tiles come from the tile cache when their habit's data, the date and
+        the grid are unchanged, so usually only the habit just logged is
+        re-rendered. Tiles are always drawn with matplotlib.
+        """
+        from PIL import Image
+        from plot_utils import create_habit_tile
+        import theme
         
+        columns, rows, tile_width, tile_height = self.tile_grid(len(series))
+        size = (tile_width, tile_height)
+        left = (self.width - columns * tile_width) // 2
+        top = (self.height - rows * tile_height) // 2
+        
+        img = Image.new('RGBA', (self.width, self.height), theme.BACKGROUND)
+        for i, habit in enumerate(series):
+            # Colors follow the habit's position, as in the combined plot
+            color_index = i % len(theme.HABIT_COLORS)
+            key = self.tile_key(habit, color_index, size)
+            tile = self.tile_cache.get(key)
+            if tile is None:
+                fig, _ = create_habit_tile(habit, color_index,
+                                           (tile_width / self.dpi, tile_height / self.dpi), self.dpi)
+                fig.patch.set_facecolor(theme.BACKGROUND)
+                tile = self.render_image(fig, size)
+                self.tile_cache.put(key, tile)
+            
+            row, column = divmod(i, columns)
+            img.paste(tile, (left + column * tile_width, top + row * tile_height))
+        return img
+    
+    def render_image(self, fig, size=None):
+        """
+        Draw fig into an Agg canvas of the given size (by default the
+        wallpaper's) and return an RGBA image that shares the canvas buffer
+        instead of copying it.
+        """
+        from PIL import Image
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        
+        size = size or (self.width, self.height)
+        canvas = FigureCanvasAgg(fig)
+        canvas.draw()
+        canvas_size = canvas.get_width_height()
+        img = Image.frombuffer('RGBA', canvas_size, canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1)
+        
+        # figsize is chosen so this only happens if width/dpi does not
+        # round-trip exactly through floating point
+        if canvas_size != tuple(size):
+            img = img.resize(tuple(size), Image.Resampling.LANCZOS)
+        return img
+    
+    def set_wallpaper(self, wallpaper_path):
         # Set wallpaper using system command
         os.system(f"osascript -e 'tell application \"System Events\" to set picture of every desktop to \"{os.path.abspath(wallpaper_path)}\"'") 
\ No newline at end of file
@@ -0,0 +1,146 @@
+import contextlib
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from file_utils import atomic_write, file_lock
+
+# Timestamped names written before wallpapers were content-addressed
+LEGACY_NAME = re.compile(r'^wallpaper_\d{8}_\d{6}\.\w+$')
+
+
+class WallpaperStore:
+    """
+    Content-addressed wallpaper files with atomic writes and a retention policy.
+
+    Files are named by the hash of their contents, so an identical render
+    reuses the existing file. An index of stored files and a pointer to the
+    current wallpaper are kept next to them, so no directory listing is needed.
+    Several processes can share a store: each change rereads the index under
+    a file lock, so a long-lived daemon never overwrites newer entries.
+    """
+
+    INDEX_NAME = 'index.json'
+    CURRENT_NAME = 'current'
+    LOCK_NAME = 'index.lock'
+
+    def __init__(self, directory, keep_last=10, keep_days=7, max_bytes=100 * 1024 * 1024):
+        self.directory = directory
+        self.keep_last = keep_last
+        self.keep_days = keep_days
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._index = self._load_index()
+
+    @property
+    def current(self):
+        """Path of the current wallpaper, or None if there is none"""
+        name = self._read_current_name()
+        if not name or not os.path.exists(self._path(name)):
+            return None
+        return self._path(name)
+
+    def put(self, data, extension):
+        """Store encoded wallpaper bytes, make them current and return their path"""
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        name = f'wallpaper_{digest}.{extension}'
+        path = self._path(name)
+
+        with self._locked():
+            if not os.path.exists(path):
+                atomic_write(path, data, fsync=True)
+
+            now = time.time()
+            entry = self._index.setdefault(name, {'size': len(data), 'created': now})
+            entry['last_used'] = now
+
+            self._set_current(name)
+            self._apply_retention(now)
+        return path
+
+    def touch(self, path):
+        """Make an already stored wallpaper current again"""
+        name = os.path.basename(path)
+        with self._locked():
+            if name in self._index:
+                self._index[name]['last_used'] = time.time()
+            self._set_current(name)
+            self._save_index()
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Hold the store's lock, with the index reloaded from disk"""
+        with file_lock(self._path(self.LOCK_NAME)):
+            self._index = self._load_index()
+            yield
+
+    def _apply_retention(self, now):
+        current = self._read_current_name()
+        by_recency = sorted(self._index, key=lambda n: self._index[n]['last_used'], reverse=True)
+
+        # Keep the last N wallpapers, or any used within the last D days
+        cutoff = now - self.keep_days * 24 * 60 * 60
+        keep = [name for i, name in enumerate(by_recency)
+                if name == current or i < self.keep_last
+                or self._index[name]['last_used'] >= cutoff]
+
+        # Then drop the oldest until the total fits the byte budget
+        total = sum(self._index[name]['size'] for name in keep)
+        for name in reversed(keep[:]):
+            if total <= self.max_bytes:
+                break
+            if name != current:
+                keep.remove(name)
+                total -= self._index[name]['size']
+
+        for name in set(self._index) - set(keep):
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # Leave it in the index so removal is retried next time
+                print(f"Could not remove old wallpaper {name}: {e}", file=sys.stderr)
+                continue
+            del self._index[name]
+
+        self._save_index()
+
+    def _set_current(self, name):
+        atomic_write(self._path(self.CURRENT_NAME), name.encode('utf-8'), fsync=True)
+
+    def _read_current_name(self):
+        try:
+            with open(self._path(self.CURRENT_NAME)) as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _load_index(self):
+        try:
+            with open(self._path(self.INDEX_NAME)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            # First run with this store: clear out timestamped wallpapers
+            # left by earlier versions, once
+            self._remove_legacy_files()
+            return {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        data = json.dumps(self._index).encode('utf-8')
+        atomic_write(self._path(self.INDEX_NAME), data, fsync=True)
+
+    def _remove_legacy_files(self):
+        for name in os.listdir(self.directory):
+            if LEGACY_NAME.match(name):
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    pass
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
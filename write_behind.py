@@ -0,0 +1,41 @@
+import time
+
+
+class WriteBehindQueue:
+    """
+    Buffers log edits in memory in front of HabitTracker.
+
+    Repeated edits to the same habit and day are coalesced, and flush()
+    writes everything pending as one upsert batch in a single transaction.
+    """
+
+    def __init__(self, habit_tracker):
+        self.habit_tracker = habit_tracker
+        self.pending = {}  # (habit_id, date) -> value
+        self.last_flush_count = 0
+        self.last_flush_seconds = None
+
+    def __len__(self):
+        return len(self.pending)
+
+    def put(self, habit_id, log_date, value):
+        self.pending[(habit_id, log_date)] = value
+
+    def pending_for(self, habit_id):
+        """Pending (date, value) pairs for one habit"""
+        return [(log_date, value) for (pending_id, log_date), value in self.pending.items()
+                if pending_id == habit_id]
+
+    def flush(self):
+        """Write all pending edits. On error they stay pending and the error is raised."""
+        if not self.pending:
+            return 0
+
+        start = time.perf_counter()
+        logs = [(habit_id, log_date, value) for (habit_id, log_date), value in self.pending.items()]
+        self.habit_tracker.set_logs(logs)
+        self.pending.clear()
+
+        self.last_flush_count = len(logs)
+        self.last_flush_seconds = time.perf_counter() - start
+        return len(logs)